@@ -2,6 +2,22 @@
 import pandas as pd
 import numpy as np
 
+# 原始列名 -> 标准列名
+col_map = {
+    'Time': 'time', 'TIME': 'time', 'min_time': 'time',
+    'Date': 'date', 'datetime': 'date',
+    'code': 'asset', 'Ticker': 'asset',
+    'Open': 'open', 'High': 'high', 'Low': 'low', 'Close': 'close',
+    'Volume': 'volume', 'Vol': 'volume', 'vol': 'volume',
+    'Turnover': 'turnover', 'Amount': 'amount', 'Amt': 'amount'
+}
+
+
+def raw_columns_for(target, columns) -> list:
+    """原始数据里会被 adapt_format 改名成 target 的列 (包括本来就叫 target 的)"""
+    return [c for c in columns if col_map.get(c, c) == target]
+
+
 def adapt_format(df):
     """
     【终极版】自动识别 + 排序 + 强力清洗 0 值 (防 inf)
@@ -17,14 +33,7 @@ def adapt_format(df):
 
     # ----------------------------------------------------
     # (把你原本的 Col Map 和 rename 代码放在这)
-    col_map = {
-        'Time': 'time', 'TIME': 'time', 'min_time': 'time',
-        'Date': 'date', 'datetime': 'date',
-        'code': 'asset', 'Ticker': 'asset',
-        'Open': 'open', 'High': 'high', 'Low': 'low', 'Close': 'close',
-        'Volume': 'volume', 'Vol': 'volume', 'vol': 'volume',
-        'Turnover': 'turnover', 'Amount': 'amount', 'Amt': 'amount'
-    }
+    # 原始列名 -> 标准列名见模块级 col_map (分块读取时也用它找原始日期列)
     df = df.rename(columns=col_map)
 
     # ... (把你原本的时间合并代码放在这) ...
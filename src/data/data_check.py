@@ -1,9 +1,51 @@
 # src/data/data_check.py
 import pandas as pd
+import numpy as np
 
 required_col = {'date','asset'}
 
-def check_df(df):
+# A 股分钟线交易时段 (左开右闭：K 线按收盘时刻标记，09:31 ~ 11:30、13:01 ~ 15:00)
+A_SHARE_SESSIONS = {
+    'morning': ('09:30', '11:30'),
+    'afternoon': ('13:00', '15:00'),
+}
+
+
+def bars_per_day(sessions=A_SHARE_SESSIONS, freq='1min') -> int:
+    """每个交易日有多少根 freq 周期的 K 线 (A 股 1 分钟线为 240)"""
+    step = pd.Timedelta(freq)
+    return sum((pd.Timedelta(end + ':00') - pd.Timedelta(start + ':00')) // step
+               for start, end in sessions.values())
+
+
+def _wall_time(dates: pd.Series) -> np.ndarray:
+    """datetime64 数组 (带时区的转成当地钟表时间，交易时段按当地时间判断)"""
+    if getattr(dates.dt, 'tz', None) is not None:
+        dates = dates.dt.tz_localize(None)
+    return dates.to_numpy()
+
+
+def is_sorted(codes: np.ndarray, date: np.ndarray) -> bool:
+    """
+    一次 O(n) 向量化扫描判断是否已按 ['asset', 'date'] 排好序 (相同 asset 内 date 不下降)
+    :param codes: pd.factorize(asset, sort=True) 的编码，大小关系与 asset 的排序一致
+    """
+    if len(codes) < 2:
+        return True
+    step = np.diff(codes)
+    return bool((step >= 0).all() and (date[1:][step == 0] >= date[:-1][step == 0]).all())
+
+
+def validate_df(df, sessions=A_SHARE_SESSIONS, freq='1min', drop_duplicates=True):
+    """
+    数据体检：只在没排好序时才排序，顺带统计重复、非交易时段、缺失 K 线
+    :param sessions: 时段名 -> (开始, 结束)，左开右闭；None 表示不检查时段和缺失
+    :param freq: K 线周期，用来推算每个交易日应有多少根
+    :param drop_duplicates: 重复的 (asset, date) 是否只保留最后一条
+    :return: (df, report)
+             report: dict，rows / assets / days / was_sorted / duplicates / out_of_session / missing_bars
+                     以及 by_asset (每只股票的应有 / 实有 / 缺失 K 线数，只含有缺失的股票)
+    """
     missing = required_col - set(df.columns)
     if missing:
         raise ValueError(f"missing required columns: {missing}")
@@ -11,8 +53,79 @@ def check_df(df):
     if not pd.api.types.is_datetime64_any_dtype(df['date']):
         raise TypeError('date column must be datetime')
 
-    df = df.sort_values(['asset', 'date']).reset_index(drop=True)
-    
-    print('Yo, your data is fucking awesome bro')
+    # 1. 排序：adapt_format 之后通常已经有序，此时不再做 O(n log n) 的全表排序
+    # asset 先编码成整数 (哈希，O(n))，之后的比较都在整数上做
+    codes, uniques = pd.factorize(df['asset'], sort=True)
+    date = _wall_time(df['date'])
+    was_sorted = is_sorted(codes, date)
+    if not was_sorted:
+        order = np.lexsort((date, codes))
+        df, codes, date = df.iloc[order], codes[order], date[order]
+    df = df.reset_index(drop=True)
+
+    # 2. 重复：排好序后重复行一定相邻
+    dup = np.zeros(len(df), dtype=bool)
+    if len(df) > 1:
+        # 标记前一条 (保留同一 (asset, date) 的最后一条)
+        dup[:-1] = (codes[1:] == codes[:-1]) & (date[1:] == date[:-1])
+    n_dup = int(dup.sum())
+    if drop_duplicates and n_dup:
+        df = df[~dup].reset_index(drop=True)
+        codes, date = codes[~dup], date[~dup]
+
+    day = date.astype('datetime64[D]')
+    report = {
+        'rows': len(df),
+        'assets': int((np.bincount(codes[codes >= 0], minlength=len(uniques)) > 0).sum()),
+        'days': len(pd.unique(day)),
+        'was_sorted': was_sorted,
+        'duplicates': n_dup,
+        'out_of_session': 0,
+        'missing_bars': 0,
+        'by_asset': pd.DataFrame(columns=['expected', 'actual', 'missing']),
+    }
+    if sessions is None or df.empty:
+        return df, report
+
+    # 3. 交易时段：按当天时刻落在哪个区间
+    tod = date - day
+    in_session = np.zeros(len(df), dtype=bool)
+    for start, end in sessions.values():
+        lo, hi = pd.Timedelta(start + ':00'), pd.Timedelta(end + ':00')
+        in_session |= (tod > lo.to_timedelta64()) & (tod <= hi.to_timedelta64())
+    report['out_of_session'] = int((~in_session).sum())
+
+    # 4. 缺失 K 线：每只股票从第一个到最后一个交易日 (全表的交易日历)，应有 天数 × 每天根数
+    # 已按 (asset, date) 排序：每只股票的首末交易日就在它那一段的首行和末行
+    calendar = np.sort(pd.unique(day))
+    day_idx = np.searchsorted(calendar, day)
+    head = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    tail = np.r_[head[1:] - 1, len(codes) - 1]
+    first = np.zeros(len(uniques), dtype=np.int64)
+    last = np.full(len(uniques), -1, dtype=np.int64)
+    first[codes[head]] = day_idx[head]
+    last[codes[tail]] = day_idx[tail]
+    expected = (last - first + 1) * bars_per_day(sessions, freq)
+    actual = np.bincount(codes[in_session], minlength=len(uniques))
+    by_asset = pd.DataFrame({'expected': expected, 'actual': actual, 'missing': expected - actual},
+                            index=pd.Index(uniques, name='asset'))
+    report['missing_bars'] = int(np.maximum(by_asset['missing'], 0).sum())
+    report['by_asset'] = by_asset[by_asset['missing'] > 0].sort_values('missing', ascending=False)
+    return df, report
+
+
+def format_report(report) -> str:
+    """一行式的体检摘要"""
+    return (f"{report['rows']} 行 / {report['assets']} 只股票 / {report['days']} 天 | "
+            f"{'已有序' if report['was_sorted'] else '已重新排序'} | "
+            f"重复 {report['duplicates']} | 非交易时段 {report['out_of_session']} | "
+            f"缺失 K 线 {report['missing_bars']} ({len(report['by_asset'])} 只股票)")
+
 
-    return df
\ No newline at end of file
+def check_df(df, **kwargs):
+    """
+    兼容旧接口：体检 + 打印摘要，只返回 df (参数同 validate_df)
+    """
+    df, report = validate_df(df, **kwargs)
+    print(f"   [Check] {format_report(report)}")
+    return df
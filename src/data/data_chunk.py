@@ -0,0 +1,49 @@
+# src/data/data_chunk.py
+import pandas as pd
+import numpy as np
+
+from src.data.data_adapt import raw_columns_for
+
+
+def parquet_columns(path, engine='fastparquet') -> list:
+    """只读 parquet 的 schema 拿到列名，不解码数据"""
+    if engine == 'fastparquet':
+        import fastparquet
+        return list(fastparquet.ParquetFile(path).columns)
+    import pyarrow.parquet as pq
+    return list(pq.read_schema(path).names)
+
+
+def iter_parquet_chunks(path, date_col=None, chunk_days=5, engine='fastparquet'):
+    """
+    按交易日把 parquet 切块读取 (生成器，迭代到哪块才解码哪块)
+    - 先只读 date 列拿到全部交易日，再按 chunk_days 个交易日一块
+    - 读取时把日期范围作为 filters 下推 (能跳过不相关的 row group)，
+      读回来后再按日期精确过滤一次，保证不同引擎下结果一致
+    date 列可以是 int (如 20250102) 也可以是 datetime
+    :param date_col: 原始文件里的日期列名，None 表示按 adapt_format 的列名映射自动找 (Date / datetime / date)
+    """
+    if date_col is None:
+        found = raw_columns_for('date', parquet_columns(path, engine))
+        if not found:
+            raise ValueError(f"no date column in {path}, expected one of 'date' or an alias mapped to it")
+        date_col = found[0]
+
+    dates = pd.read_parquet(path, engine=engine, columns=[date_col])[date_col]
+    is_dt = pd.api.types.is_datetime64_any_dtype(dates)
+    days = dates.dt.normalize() if is_dt else dates
+    days = np.sort(days.dropna().unique())
+    del dates
+
+    for i in range(0, len(days), chunk_days):
+        block = days[i:i + chunk_days]
+        lo, hi = block[0], block[-1]
+        if is_dt:
+            hi = pd.Timestamp(hi) + pd.Timedelta(days=1)
+            filters = [(date_col, '>=', pd.Timestamp(lo)), (date_col, '<', hi)]
+        else:
+            filters = [(date_col, '>=', lo), (date_col, '<=', hi)]
+
+        chunk = pd.read_parquet(path, engine=engine, filters=filters)
+        key = chunk[date_col].dt.normalize() if is_dt else chunk[date_col]
+        yield chunk[key.isin(block)].reset_index(drop=True)
@@ -0,0 +1,103 @@
+# src/data/data_grid.py
+import pandas as pd
+import numpy as np
+
+from src.data.data_check import A_SHARE_SESSIONS
+
+price_cols = ['open', 'high', 'low', 'close']
+
+
+def session_grid(days, sessions=A_SHARE_SESSIONS, freq='1min') -> pd.DatetimeIndex:
+    """
+    交易日历网格：每个交易日、每个时段内的全部 K 线时刻 (左开右闭，如 09:31 ~ 11:30、13:01 ~ 15:00)
+    """
+    step = pd.Timedelta(freq)
+    offsets = np.concatenate([
+        pd.timedelta_range(pd.Timedelta(start + ':00') + step, pd.Timedelta(end + ':00'), freq=freq).to_numpy()
+        for start, end in sessions.values()
+    ])
+    days = pd.DatetimeIndex(days).normalize().to_numpy()
+    return pd.DatetimeIndex((days[:, None] + offsets[None, :]).ravel())
+
+
+def align_to_calendar(df, sessions=A_SHARE_SESSIONS, freq='1min', ffill_limit=5, days=None, end=None):
+    """
+    把每只股票对齐到交易日历网格上 (从它的第一根到最后一根 K 线)，缺的分钟补出来
+    - 停牌 / 没成交的分钟：连续缺失不超过 ffill_limit 根的用上一根补
+      价格 (OHLC) 都取上一根的收盘价，量额沿用上一根 (同 adapt_format 对 0 值的处理，避免除 0)
+    - 超过 ffill_limit 的部分保留为 NaN 行，网格依然是稠密的
+    - 非数值列 (如行业) 视为静态属性，不受 ffill_limit 限制
+    - 新增 is_valid 列：True 表示这根 K 线是原始数据里真实存在的
+    全程向量化：先算每只股票在网格上的区间，再把原始行按位置散布到输出数组，
+    分段前向填充用"最近一个有效行号"的累积最大值实现 (每段第一行一定有效，不会跨股票)
+    :param df: 已按 ['asset', 'date'] 排序且无重复 (validate_df 之后)，date 为不带时区的时间
+    :param ffill_limit: 最多连续补几根，None 表示不限
+    :param days: 交易日列表，默认用数据里出现过的所有交易日
+    :param end: 每只股票的区间至少延伸到这个时刻 (分块计算时传本块最后一个时间，
+                跨块的停牌缺口在本块就补出来，和整表对齐的结果一致)
+    :return: (df_grid, report)
+    """
+    if days is None:
+        days = np.sort(df['date'].dt.normalize().unique())
+    grid = session_grid(days, sessions, freq)
+
+    # 1. 原始行在网格上的位置，不在交易时段内的丢弃
+    pos = grid.get_indexer(df['date'])
+    on_grid = pos >= 0
+    report = {'rows_in': len(df), 'out_of_session': int((~on_grid).sum())}
+    df, pos = df[on_grid], pos[on_grid]
+
+    codes, assets = pd.factorize(df['asset'])
+    n = len(df)
+    if n == 0:
+        report.update(rows_out=0, filled=0, missing=0)
+        return df.assign(is_valid=np.ones(0, dtype=bool)).reset_index(drop=True), report
+
+    # 2. 每只股票在网格上的区间 [first, last]，输出表里每段的起点 offset
+    head = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    tail = np.r_[head[1:] - 1, n - 1]
+    first = pos[head]
+    last = pos[tail]
+    if end is not None:
+        last = np.maximum(last, grid.searchsorted(pd.Timestamp(end), side='right') - 1)
+    lengths = last - first + 1
+    offset = np.r_[0, np.cumsum(lengths)[:-1]]
+    seg = np.repeat(np.arange(len(head)), lengths)
+    n_out = int(lengths.sum())
+    out_pos = first[seg] + np.arange(n_out) - offset[seg]
+
+    # 3. 原始行散布到输出位置
+    seg_of_row = np.repeat(np.arange(len(head)), tail - head + 1)
+    target = offset[seg_of_row] + pos - first[seg_of_row]
+    valid = np.zeros(n_out, dtype=bool)
+    valid[target] = True
+
+    # 4. 分段前向填充：src = 最近一个有效行，gap = 距离它多少根
+    idx = np.arange(n_out)
+    src = np.maximum.accumulate(np.where(valid, idx, 0))
+    gap = idx - src
+    fill = ~valid if ffill_limit is None else ~valid & (gap <= ffill_limit)
+
+    out = {'date': grid[out_pos], 'asset': assets[codes[head]][seg]}
+    close = None
+    if 'close' in df.columns:
+        close = np.full(n_out, np.nan)
+        close[target] = df['close'].to_numpy(dtype=np.float64)
+    for col in df.columns:
+        if col in ('date', 'asset'):
+            continue
+        values = df[col].to_numpy()
+        if not pd.api.types.is_numeric_dtype(df[col]) or pd.api.types.is_bool_dtype(df[col]):
+            # 静态属性：整段沿用
+            out[col] = pd.array(values, dtype=df[col].dtype)[np.searchsorted(target, src)]
+            continue
+        col_out = np.full(n_out, np.nan)
+        col_out[target] = values
+        carry = close if (col in price_cols and close is not None) else col_out
+        col_out[fill] = carry[src[fill]]
+        out[col] = col_out
+
+    df_grid = pd.DataFrame(out)
+    df_grid['is_valid'] = valid
+    report.update(rows_out=n_out, filled=int(fill.sum()), missing=int((~valid & ~fill).sum()))
+    return df_grid, report
@@ -0,0 +1,72 @@
+# src/data/data_resample.py
+import pandas as pd
+import numpy as np
+
+# 各列的聚合方式 (价格取 OHLC，量额求和)
+agg_rules = {
+    'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last',
+    'volume': 'sum', 'turnover': 'sum', 'amount': 'sum',
+}
+
+
+def resample_bars(df, freq):
+    """
+    把分钟线按 asset 聚合成 freq 周期的 K 线 (如 '5min' / '15min' / '30min' / '1D')
+    要求 df 已按 ['asset', 'date'] 排序 (adapt_format + check_df 之后)
+    - 桶用 ceil 切分：09:31~09:35 归到 09:35 这根 (右闭右标签，A股分钟线习惯)
+    - 输出的 date 是桶内最后一根分钟的时间，也就是这根大 K 线"可用"的时刻
+    """
+    cols = [c for c in agg_rules if c in df.columns]
+    bucket = df['date'].dt.ceil(freq)
+
+    # sort=False + 数据已排好序 => 每个 (asset, bucket) 连续出现，顺序与原表一致
+    grouped = df.groupby([df['asset'], bucket], sort=False)
+    bars = grouped[cols].agg({c: agg_rules[c] for c in cols})
+    bars['date'] = grouped['date'].last()
+    bars = bars.reset_index(level=0).reset_index(drop=True)
+    return bars[['date', 'asset'] + cols]
+
+
+def align_to_grid(df, bars, values, freq):
+    """
+    把大周期上算出的因子值对齐回分钟网格 (无未来函数)
+    每一分钟只能用"最后一根分钟 <= 当前时刻"的已完成大 K 线：
+    - 当前分钟正好是某根大 K 线的最后一分钟 -> 用这根
+    - 否则 (这根大 K 线还没走完) -> 用同一只股票的上一根
+    """
+    bucket = df['date'].dt.ceil(freq)
+
+    # 每一分钟属于第几根大 K 线 (与 resample_bars 的输出行号一一对应)
+    codes = df.groupby([df['asset'], bucket], sort=False).ngroup().to_numpy()
+    is_done = df['date'].to_numpy() == bars['date'].to_numpy()[codes]
+    pos = np.where(is_done, codes, codes - 1)
+
+    # 上一根如果属于另一只股票，说明还没有任何已完成的 K 线
+    bar_assets = bars['asset'].to_numpy()
+    valid = pos >= 0
+    valid[valid] = bar_assets[pos[valid]] == df['asset'].to_numpy()[valid]
+
+    vals = np.asarray(values, dtype=np.float64)
+    out = np.full(len(df), np.nan)
+    out[valid] = vals[pos[valid]]
+    return pd.Series(out, index=df.index)
+
+
+class ResampleCache:
+    """
+    多周期 K 线缓存：每个周期只聚合一次，后面所有因子共用
+    """
+    def __init__(self, df, verbose=True):
+        self.df = df
+        self.verbose = verbose
+        self._panels = {}
+
+    def get(self, freq):
+        if freq not in self._panels:
+            if self.verbose:
+                print(f"   [Resample] 生成 {freq} K线...")
+            self._panels[freq] = resample_bars(self.df, freq)
+        return self._panels[freq]
+
+    def align(self, freq, values):
+        return align_to_grid(self.df, self.get(freq), values, freq)
@@ -1,8 +1,10 @@
 # 文件路径: main.py
 import pandas as pd
+import numpy as np
 import warnings
 import sys
 import os
+import time
 
 # 1. 获取当前脚本的绝对路径
 current_path = os.path.dirname(os.path.abspath(__file__))
@@ -14,184 +16,536 @@ if project_root not in sys.path:
 
 # 1. 导入数据工具
 from src.data.data_adapt import adapt_format
-from src.data.data_check import check_df
+from src.data.data_check import check_df, validate_df, format_report, bars_per_day, A_SHARE_SESSIONS
+from src.data.data_resample import ResampleCache
+from src.data.data_chunk import iter_parquet_chunks
+from src.data.data_grid import align_to_calendar
 
 # 2. 导入因子工厂
-from src.factors.base import FACTOR_REGISTRY 
+from src.factors.base import FACTOR_REGISTRY, FactorBase
 import src.factors.definitions  # 必须导入以触发注册
+from src.factors import backend as factor_backend
+from src.factors.matrix import FactorMatrix
+from src.factors.rolling import segment_starts, segment_rolling
 
 # 3. 导入处理器
 from src.processor.cleaner import FactorCleaner
 from src.processor.evaluate import FactorEvaluator
+from src.processor.backtest import FactorBacktester
+from src.processor.combine import FactorCombiner
+from src.processor.pipeline import PipelineRunner
+from src.processor.checkpoint import StageCheckpoint, make_key, file_signature, factor_fingerprint, module_fingerprint
+from src.processor.live import LiveAlphaEngine, LiveAlphaService, ResampledStream, tail_csv_bars
 
 # 忽略 pandas 的一些未来版本警告
 warnings.filterwarnings('ignore')
 
-def main():
-    print("量化因子挖掘启动...\n")
-
-    # ==========================================
-    # Step 1: 数据准备 (Data Preparation)
-    # ==========================================
-    print("[1/5] 读取与检查数据...")
-    # 假设你的分钟数据路径
-    data_path = '/Users/huoxubo/Quant/data/2025_stock_min_price.pq' # 请确保文件名正确
-    try:
-        df = pd.read_parquet(data_path, engine="fastparquet")
-    except FileNotFoundError:
-        print(f"❌ 错误：找不到文件 {data_path}")
-        return
-
-# 【新增】只取前 20000 行做测试！
-    print("⚠️ 调试模式：仅使用前 1,000,000 行数据...")
-    df = df.head(100000).copy() 
-
-    # 适配与检查
-    print("   正在转换格式 (adapt_format)...")
-    df = adapt_format(df)
-    
-    print("   正在检查排序 (check_df)...")
-    df = check_df(df)
-    print(df.head())
-    # ...
-    print(f"✅ 数据加载完成: {len(df)} 行, {df['asset'].nunique()} 只股票")
+# 假设你的分钟数据路径
+DATA_PATH = '/Users/huoxubo/Quant/data/2025_stock_min_price.pq' # 请确保文件名正确
+ALPHA_PATH = "data/alpha_factors.csv"
+
+# 流水线模式：按交易日分块，读取 / 计算+清洗 / 写出 三段并行 (全量数据时打开)
+PIPELINE_MODE = False
+PIPELINE_CHUNK_DAYS = 5    # 每块多少个交易日
+PIPELINE_HALO_BARS = None  # 每块向前多带的历史 K 线数，None 表示按因子声明的 lookback 自动算
+
+# 实时模式：追踪一个不断追加的分钟 K 线 CSV，在本机 HTTP / Unix socket 上提供最新 alpha 截面
+LIVE_MODE = False
+LIVE_SOURCE = "data/live_bars.csv"  # None 表示只接收 POST /bars 推送
+LIVE_HOST = '127.0.0.1'
+LIVE_PORT = 8765
+LIVE_UNIX_SOCKET = None             # 例如 "/tmp/alpha.sock"，设置后不再监听 TCP 端口
+LIVE_BACKEND = 'numpy'              # 实时模式里没有增量版本的因子在缓冲区尾部重算时用的后端
+
+# 交易日历对齐：每只股票补齐到完整的分钟网格 (停牌 / 无成交的分钟也有一行)，滚动窗口按真实时间对齐
+GRID_CONFIG = {
+    "enabled": False,
+    "ffill_limit": 5,      # 最多连续补几根，再长的缺口保留为 NaN 行 (is_valid = False)
+}
+
+# 因子计算后端：'pandas' / 'numpy' / 'polars' (没移植的因子自动用 pandas)
+COMPUTE_BACKEND = 'pandas'
+
+# 调试模式：只取前 N 行 (None 表示全量)
+DEBUG_ROWS = 100000
+
+# 断点续跑：adapt/check、原始因子、清洗后因子三个阶段各存一份 (只对非流水线模式生效)
+USE_CHECKPOINT = True
+CHECKPOINT_DIR = "data/checkpoints"
+
+# Step 3 清洗配置
+CLEAN_CONFIG = {
+    "winsorize": False,    # 关闭去极值
+    "neutralize": False, # 如果有行业数据就做中性化，否则不做
+    "standardize": False, # 关闭标准化
+    "sector_col": 'sector',
+    # 'cross' 逐日截面清洗；'ts' 每只股票和自己的历史比 (股票很少时用，不做中性化，实时模式不支持)
+    "mode": 'cross',
+    "ts_window": 240,
+    "ts_scale": 'zscore',  # 'zscore' / 'percentile'
+}
+
+# Step 5 初筛配置：候选因子多时，先在抽样截面上用 bootstrap 区间淘汰明显无效的，剩下的再全量评估
+SCREEN_CONFIG = {
+    "enabled": True,
+    "min_candidates": 10,  # 候选因子少于这个数就不筛，直接全量评估
+    "frac": 0.1,           # 每个交易日抽 10% 的分钟截面
+    "min_abs_ic": 0.01,    # |IC| 区间上界低于它的淘汰
+    "min_abs_icir": 0.05,  # |ICIR| 区间上界低于它的淘汰
+    "n_boot": 500,
+    "block_len": 10,       # 块 bootstrap 的块长，不小于收益 horizon (相邻截面的未来收益重叠)
+}
+
+# Step 5 分维度拆解：按月份 / 行业 / 流动性分组看因子是否处处有效
+BREAKDOWN_CONFIG = {
+    "dims": ['month', 'sector', 'liquidity'],  # 时间维度见 FactorEvaluator.TIME_KEYS，其余为列名
+    "liq_col": 'turnover',  # 流动性用过去 liq_window 根 K 线的平均成交额
+    "liq_window": 240,
+    "liq_bins": 3,
+}
+
+# Step 5 多因子合成配置 (滚动样本外：等权 / IC / ICIR / 岭回归)
+COMBINE_CONFIG = {
+    "enabled": True,
+    "refit": 240,          # 每 240 个分钟截面 (约一天) 重估一次权重
+    "window": 20,          # 用最近 20 次重估区间的数据
+    "ridge_lambda": 1.0,
+}
 
-    # ==========================================
-    # Step 2: 因子计算 (Factor Calculation)
-    # ==========================================
-    print("\n[2/5] 开始计算原始因子...")
-    
-    #在此配置你想挖掘的因子
 # 在此配置你想挖掘的因子
-    factor_config = [
-        # ==========================
-        # 1. 动量与趋势类 (Momentum & Trend)
-        # ==========================
-        {"name": "RSI", "params": {"window": 14}, "shift": 1},                 # 相对强弱指标
-        {"name": "MACD", "params": {"fast": 12, "slow": 26, "signal": 9}, "shift": 1}, # MACD趋势
-        {"name": "TSMOM", "params": {"window": 10}, "shift": 1},               # 时间序列动量
-        {"name": "ROC", "params": {"window": 10}, "shift": 1},                 # 变动率 (Rate of Change)
-        {"name": "BIAS", "params": {"window": 20}, "shift": 1},                # 乖离率 (价格偏离均线程度)
-        {"name": "CCI", "params": {"window": 14}, "shift": 1},                 # 顺势指标 (需High/Low)
-        {"name": "Aroon", "params": {"window": 25}, "shift": 1},               # 阿隆指标 (趋势强弱)
-        {"name": "PriceRank", "params": {"window": 20}, "shift": 1},           # 价格在过去N天的分位数
-
-        # ==========================
-        # 2. 波动率与风险类 (Volatility & Risk)
-        # ==========================
-        {"name": "ATR", "params": {"window": 14}, "shift": 1},                 # 平均真实波幅 (绝对波动量)
-        {"name": "Boll_Width", "params": {"window": 20}, "shift": 1},          # 布林带宽度 (波动率挤压)
-        {"name": "Individual_VOL", "params": {"window": 20}, "shift": 1},      # 剔除Beta后的特异波动率
-        {"name": "Return_Std", "params": {"window": 20}, "shift": 1},          # 简单收益率标准差
-        {"name": "ER", "params": {"window": 10}, "shift": 1},                  # 路径效率 (卡夫曼效率系数)
-
-        # ==========================
-        # 3. 量价与资金流类 (Volume & Money Flow)
-        # ==========================
-        {"name": "PVT", "params": {}, "shift": 1},                             # 量价趋势指标
-        {"name": "MFI", "params": {"window": 14}, "shift": 1},                 # 资金流量指标 (量化版RSI)
-        {"name": "OBV", "params": {}, "shift": 1},                             # 能量潮 (需确认是否已注册，若无可用PVT代替)
-        {"name": "VWAP_Bias", "params": {"window": 20}, "shift": 1},           # 价格对VWAP的偏离
-        {"name": "VR", "params": {"window": 26}, "shift": 1},                  # 成交量比率
-        {"name": "Volume_Price_Corr", "params": {"window": 10}, "shift": 1},   # 量价相关性
-
-        # ==========================
-        # 4. 情绪与反转类 (Sentiment & Reversal)
-        # ==========================
-        {"name": "WilliamsR", "params": {"window": 14}, "shift": 1},           # 威廉指标 (超买超卖)
-        {"name": "PSY", "params": {"window": 12}, "shift": 1},                 # 心理线
-        {"name": "Capital_Gain_Overhang", "params": {"window": 20}, "shift": 1}, # 获利盘比例 (CGO)
-
-        # ==========================
-        # 5. 流动性与微观结构 (Liquidity & Structure)
-        # ==========================
-        {"name": "Turnover_Stability", "params": {"window": 10}, "shift": 1},  # 换手率稳定性
-        {"name": "Ret_Turnover_Corr", "params": {"window": 10}, "shift": 1},   # 收益率与换手率相关性
-        {"name": "Amihud", "params": {"window": 20}, "shift": 1},              # 非流动性因子 (Amihud Illiquidity)
-        
-        # ==========================
-        # 6. 统计分布特征 (Statistical)
-        # ==========================
-        {"name": "Skewness", "params": {"window": 20}, "shift": 1},            # 收益率分布偏度
-    ]
+FACTOR_CONFIG = [
+    # ==========================
+    # 1. 动量与趋势类 (Momentum & Trend)
+    # ==========================
+    {"name": "RSI", "params": {"window": 14}, "shift": 1},                 # 相对强弱指标
+    {"name": "MACD", "params": {"fast": 12, "slow": 26, "signal": 9}, "shift": 1}, # MACD趋势
+    {"name": "TSMOM", "params": {"window": 10}, "shift": 1},               # 时间序列动量
+    {"name": "ROC", "params": {"window": 10}, "shift": 1},                 # 变动率 (Rate of Change)
+    {"name": "BIAS", "params": {"window": 20}, "shift": 1},                # 乖离率 (价格偏离均线程度)
+    {"name": "CCI", "params": {"window": 14}, "shift": 1},                 # 顺势指标 (需High/Low)
+    {"name": "Aroon", "params": {"window": 25}, "shift": 1},               # 阿隆指标 (趋势强弱)
+    {"name": "PriceRank", "params": {"window": 20}, "shift": 1},           # 价格在过去N天的分位数
+
+    # ==========================
+    # 2. 波动率与风险类 (Volatility & Risk)
+    # ==========================
+    {"name": "ATR", "params": {"window": 14}, "shift": 1, "freq": "5min"},          # 平均真实波幅 (绝对波动量)
+    {"name": "Boll_Width", "params": {"window": 20}, "shift": 1, "freq": "15min"},  # 布林带宽度 (波动率挤压)
+    {"name": "Individual_VOL", "params": {"window": 20}, "shift": 1},      # 剔除Beta后的特异波动率
+    {"name": "Return_Std", "params": {"window": 20}, "shift": 1},          # 简单收益率标准差
+    {"name": "ER", "params": {"window": 10}, "shift": 1},                  # 路径效率 (卡夫曼效率系数)
+    {"name": "Beta", "params": {"window": 20}, "shift": 1},                # 滚动市场 beta
+    {"name": "Alpha", "params": {"window": 20}, "shift": 1},               # 滚动市场 alpha (截距)
+    {"name": "Idio_VOL", "params": {"window": 20}, "shift": 1},            # 剔除市场后的特异波动率
+
+    # ==========================
+    # 3. 量价与资金流类 (Volume & Money Flow)
+    # ==========================
+    {"name": "PVT", "params": {}, "shift": 1},                             # 量价趋势指标
+    {"name": "MFI", "params": {"window": 14}, "shift": 1},                 # 资金流量指标 (量化版RSI)
+    {"name": "OBV", "params": {}, "shift": 1},                             # 能量潮 (需确认是否已注册，若无可用PVT代替)
+    {"name": "VWAP_Bias", "params": {"window": 20}, "shift": 1},           # 价格对VWAP的偏离
+    {"name": "VR", "params": {"window": 26}, "shift": 1},                  # 成交量比率
+    {"name": "Volume_Price_Corr", "params": {"window": 10}, "shift": 1},   # 量价相关性
+
+    # ==========================
+    # 4. 情绪与反转类 (Sentiment & Reversal)
+    # ==========================
+    {"name": "WilliamsR", "params": {"window": 14}, "shift": 1},           # 威廉指标 (超买超卖)
+    {"name": "PSY", "params": {"window": 12}, "shift": 1},                 # 心理线
+    {"name": "Capital_Gain_Overhang", "params": {"window": 20}, "shift": 1}, # 获利盘比例 (CGO)
+
+    # ==========================
+    # 5. 流动性与微观结构 (Liquidity & Structure)
+    # ==========================
+    {"name": "Turnover_Stability", "params": {"window": 10}, "shift": 1},  # 换手率稳定性
+    {"name": "Ret_Turnover_Corr", "params": {"window": 10}, "shift": 1},   # 收益率与换手率相关性
+    {"name": "Amihud", "params": {"window": 20}, "shift": 1, "freq": "30min"},      # 非流动性因子 (Amihud Illiquidity)
+    
+    # ==========================
+    # 6. 统计分布特征 (Statistical)
+    # ==========================
+    {"name": "Skewness", "params": {"window": 20}, "shift": 1, "freq": "30min"},    # 收益率分布偏度
+]
+
+
+def factor_col_name(config):
+    """
+    因子列名：factor_名字_参数值[_周期]
+    """
+    params = config['params']
+    suffix = "_" + "_".join(str(v) for v in params.values()) if params else ""
+    if config.get('freq'):
+        suffix += f"_{config['freq']}"
+    return f"factor_{config['name']}{suffix}"
+
+
+def config_bars(config, n):
+    """
+    把因子周期上的 n 根 K 线换算成分钟线根数 (大周期多算一根，覆盖未走完的那根)
+    按交易时段换算：日内周期最多一天的根数，'1D' = 240 根分钟线而不是 1440 分钟
+    """
+    freq = config.get('freq')
+    if not freq:
+        return n
+    step, day = pd.Timedelta(freq), pd.Timedelta('1D')
+    per_day = bars_per_day(A_SHARE_SESSIONS)
+    if step >= day:
+        per_bar = (step // day) * per_day
+    else:
+        per_bar = min(max(1, step // pd.Timedelta('1min')), per_day)
+    return (n + 1) * per_bar
+
+
+def config_lookback(config):
+    """
+    这个因子 (含 shift) 在分钟线上需要的历史长度；累计型因子返回 None
+    """
+    lookback = FACTOR_REGISTRY[config['name']](config['params']).lookback
+    if lookback is None:
+        return None
+    return config_bars(config, lookback) + config.get('shift', 0)
+
+
+def config_warmup(config):
+    """
+    这个因子 (含 shift) 在分钟线上每只股票开头要剔除的 K 线数
+    """
+    warmup = FACTOR_REGISTRY[config['name']](config['params']).warmup
+    return config_bars(config, warmup) + config.get('shift', 0)
+
+
+def required_halo(factor_config):
+    """
+    分块计算时每块需要带的最小历史：
+    所有因子 lookback 与流动性分组 liq_window 的最大值，时序清洗再加 ts_window (清洗的是算好的因子)
+    累计型因子靠 carry_cumulative 跨块接上，预热只需盖住 shift 和第一根的差分
+    """
+    configs = [c for c in factor_config if c['name'] in FACTOR_REGISTRY]
+    halo = max([config_lookback(c) or config_bars(c, 1) + c.get('shift', 0) + 1 for c in configs], default=1)
+    if 'liquidity' in BREAKDOWN_CONFIG['dims']:
+        halo = max(halo, BREAKDOWN_CONFIG['liq_window'])
+    if CLEAN_CONFIG.get('mode') == 'ts':
+        halo += CLEAN_CONFIG['ts_window']
+    return halo
+
+
+def carry_cumulative(df, fm, cols, anchors):
+    """
+    分块模式下把累计型因子 (如 PVT) 接到上一块的累计值上 (原地)
+    每块从预热起点重新累计，与整表累计只差每只股票一个常数：
+    用上一块最后输出的有效值 (锚点) 在本块同一 (asset, date) 上的差值补齐
+    :param anchors: 因子名 -> 每只股票的锚点 DataFrame (index 为 asset，列 date / value，见 update_anchors)
+    """
+    key = pd.MultiIndex.from_arrays([df['asset'], df['date']])
+    for col in cols:
+        if col not in fm or col not in anchors:
+            continue
+        values = fm.column(col)
+        anchor = anchors[col]
+        pos = key.get_indexer(pd.MultiIndex.from_arrays([anchor.index, anchor['date']]))
+        here = np.where(pos >= 0, values[np.maximum(pos, 0)], np.nan)
+        # 锚点不在本块 (或本块在锚点上没有值) 的股票无法对齐，保持原样
+        offset = pd.Series(anchor['value'].to_numpy() - here, index=anchor.index).dropna()
+        values += df['asset'].map(offset).fillna(0.0).to_numpy()
+
+
+def update_anchors(df, fm, cols, keep, anchors):
+    """每只股票在本块输出行里最后一个有效的累计值，作为下一块的锚点"""
+    out = dict(anchors)
+    for col in cols:
+        if col not in fm:
+            continue
+        ok = keep & np.isfinite(fm.column(col))
+        last = pd.DataFrame({'date': df['date'].to_numpy()[ok], 'value': fm.column(col)[ok]},
+                            index=df['asset'].to_numpy()[ok]).groupby(level=0, sort=False).last()
+        out[col] = last if col not in anchors else last.combine_first(anchors[col])
+    return out
+
+
+def compute_factors(df, factor_config, verbose=True, backend=None, fm=None):
+    """
+    Step 2: 按配置逐个计算原始因子，写进预分配的因子矩阵 (列名 factor_xxx)
+    :param fm: 已有的 FactorMatrix (断点续跑时部分列已填好)，不传就新建
+    """
+    backend = backend or COMPUTE_BACKEND
+    factor_config = [c for c in factor_config if c['name'] in FACTOR_REGISTRY]
+    if fm is None:
+        fm = FactorMatrix([factor_col_name(c) for c in factor_config], df.index)
+    starts = segment_starts(df['asset'])
+
+    # 多周期 K 线缓存：因子配置里声明了 freq 的，在对应周期上计算
+    resampler = ResampleCache(df, verbose=verbose)
+
+    # 非 pandas 后端：分钟线上、已移植的因子先一次性批量算好
+    precomputed = {}
+    if backend != 'pandas':
+        jobs = {}
+        for config in factor_config:
+            if not config.get('freq'):
+                instance = FACTOR_REGISTRY[config['name']](config['params'])
+                if backend in instance.backends:
+                    jobs[factor_col_name(config)] = instance
+        if verbose:
+            print(f"   -> [{backend}] 批量计算 {len(jobs)} 个因子")
+        precomputed = factor_backend.calculate(df, jobs, backend)
 
     # 遍历配置，计算每个因子
+    failed = []
     for config in factor_config:
         name = config['name']
         params = config['params']
         shift_steps = config.get('shift', 0)  # 默认不滞后
-
-        if name not in FACTOR_REGISTRY:
-            continue
+        freq = config.get('freq')  # 默认直接在分钟线上算
+        col_name = factor_col_name(config)
 
         try:
             factor_cls = FACTOR_REGISTRY[name]
             instance = factor_cls(params)
 
-            suffix = "_" + "_".join(str(v) for v in params.values()) if params else ""
-            col_name = f"factor_{name}{suffix}"
-
-            print(f"   -> 计算: {col_name}")
-            raw_values = instance.calculate(df)
-            df[col_name] = raw_values
-
-        # 如果 shift_steps > 0，才做滞后
-            if shift_steps > 0:
-                df[col_name] = df.groupby('asset')[col_name].shift(shift_steps)
+            if verbose:
+                print(f"   -> 计算: {col_name}")
+            if col_name in precomputed:
+                raw_values = precomputed[col_name]
+            elif freq:
+                # 在大周期 K 线上算，再按"已完成的 K 线"对齐回分钟网格
+                bars = resampler.get(freq)
+                raw_values = resampler.align(freq, instance.calculate(bars).sort_index())
+            else:
+                raw_values = instance.calculate(df)
+            fm.set(col_name, raw_values)
+
+            # 如果 shift_steps > 0，才做滞后 (矩阵内原地平移)
+            fm.shift(col_name, shift_steps, starts)
 
         except Exception as e:
             print(f"   ❌ {name} 计算失败: {e}")
+            failed.append(col_name)
 
+    # 算失败的因子从矩阵里去掉 (和以前"没有这一列"的行为一致)
+    if failed:
+        fm = fm.select([n for n in fm.names if n not in failed])
+    return fm
 
-    # ==========================================
-    # Step 3: 因子清洗 (Factor Cleaning)
-    # ==========================================
-    print("\n[3/5] 开始因子清洗 (去极值/中性化/标准化)...")
-    
+
+def clean_factors(df, fm, verbose=True, cols=None):
+    """
+    Step 3: 在因子矩阵上原地做截面清洗，清洗过的列改名 factor_xxx -> alpha_xxx
+    :param cols: 只清洗这些列 (默认所有 factor_xxx 列)
+    """
     # 找到所有原始因子列
-    raw_factors = [c for c in df.columns if c.startswith('factor_')]
-    has_sector = 'sector' in df.columns # 检查是否有行业列
-    
-    for col in raw_factors:
-        alpha_name = col.replace('factor_', 'alpha_')
-        print(f"   -> 清洗: {col} => {alpha_name}")
-        
-        # 核心清洗步骤
-        df[alpha_name] = FactorCleaner.process_factor(
-            df, 
-            col, 
-            winsorize=False,    # 关闭去极值
-            neutralize=False, # 如果有行业数据就做中性化，否则不做
-            standardize=False, # 关闭标准化
-            sector_col='sector'
-        )
+    raw_factors = cols if cols is not None else [c for c in fm.names if c.startswith('factor_')]
+    if not raw_factors:
+        return fm
+    has_sector = CLEAN_CONFIG['sector_col'] in df.columns # 检查是否有行业列
+    # 中性化用的风格暴露 (市值/beta)，数据里有哪个就用哪个
+    exposure_cols = [c for c in ['size', 'beta'] if c in df.columns]
+    if verbose:
+        print(f"   -> 批量清洗 {len(raw_factors)} 个因子 (行业列: {has_sector}, 暴露: {exposure_cols})")
+
+    # 核心清洗步骤：所有因子一次性做截面处理，直接写回矩阵
+    FactorCleaner.process_matrix(
+        fm.values,
+        df,
+        cols=fm.positions(raw_factors),
+        exposure_cols=exposure_cols,
+        **CLEAN_CONFIG
+    )
+    cleaned = set(raw_factors)
+    fm.rename(lambda c: c.replace('factor_', 'alpha_', 1) if c in cleaned else c)
+    return fm
+
+
+def align_grid(df, verbose=True, end=None):
+    """
+    可选：对齐到交易日历网格 (GRID_CONFIG)，没打开时原样返回
+    :param end: 流水线模式传本块最后一个时间，每只股票都补到块尾
+    """
+    if not GRID_CONFIG['enabled']:
+        return df
+    df, report = align_to_calendar(df, ffill_limit=GRID_CONFIG['ffill_limit'], end=end)
+    if verbose:
+        print(f"   [Grid] {report['rows_in']} 行 -> {report['rows_out']} 行 | 补齐 {report['filled']} | "
+              f"仍缺失 {report['missing']} | 丢弃非交易时段 {report['out_of_session']}")
+    return df
+
+
+def key_columns(df):
+    """alpha 表里和因子一起保存的基础列 (对齐到网格后多一个 is_valid)"""
+    return [c for c in ['date', 'asset', 'close', 'is_valid'] if c in df.columns]
+
+
+def breakdown_keys(df):
+    """
+    拆解评估用的分组列 (行业 / 流动性分组)，随 alpha 一起存档，数据里没有对应列就不生成
+    流动性分组只在 dims 里有 'liquidity' 时生成 (分块模式的预热长度按同一条件算，见 required_halo)
+    """
+    keys = pd.DataFrame(index=df.index)
+    if CLEAN_CONFIG['sector_col'] in df.columns:
+        keys['sector'] = df[CLEAN_CONFIG['sector_col']]
+    if 'liquidity' in BREAKDOWN_CONFIG['dims'] and BREAKDOWN_CONFIG['liq_col'] in df.columns:
+        keys['liquidity'] = FactorEvaluator.liquidity_bucket(
+            df, BREAKDOWN_CONFIG['liq_col'], BREAKDOWN_CONFIG['liq_window'], BREAKDOWN_CONFIG['liq_bins'])
+    return keys
+
+
+def report_quality(quality):
+    """打印体检摘要，有缺失 K 线的股票明细写到 data/data_quality.csv"""
+    print(f"   [Check] {format_report(quality)}")
+    if len(quality['by_asset']):
+        quality['by_asset'].to_csv("data/data_quality.csv")
+        print("   [Check] 各股票缺失 K 线明细已保存: data/data_quality.csv")
+
+
+def load_data(ckpt=None):
+    """
+    Step 1: 读 parquet + adapt_format + check_df；有有效断点就直接读断点
+    断点 key 包含数据适配 / 体检 / 网格对齐模块的代码指纹，体检报告随断点一起保存
+    返回 (df, data_key)，文件不存在时返回 (None, None)
+    """
+    code = [adapt_format, validate_df] + ([align_to_calendar] if GRID_CONFIG['enabled'] else [])
+    try:
+        data_key = make_key('adapted', file_signature(DATA_PATH), DEBUG_ROWS, module_fingerprint(*code),
+                            GRID_CONFIG if GRID_CONFIG['enabled'] else None)
+    except FileNotFoundError:
+        print(f"❌ 错误：找不到文件 {DATA_PATH}")
+        return None, None
+
+    if ckpt is not None:
+        df = ckpt.load('adapted', data_key)
+        if df is not None:
+            # 体检报告也从断点恢复，data_quality.csv 与重新体检时一致
+            by_asset = ckpt.load('quality', data_key)
+            quality = dict(ckpt.meta('adapted').get('quality', {}))
+            if quality:
+                quality['by_asset'] = by_asset.set_index('asset') if by_asset is not None else \
+                    pd.DataFrame(columns=['expected', 'actual', 'missing'])
+                report_quality(quality)
+            return df, data_key
+
+    df = pd.read_parquet(DATA_PATH, engine="fastparquet")
+
+    if DEBUG_ROWS:
+        print(f"⚠️ 调试模式：仅使用前 {DEBUG_ROWS:,} 行数据...")
+        df = df.head(DEBUG_ROWS).copy()
 
-    # ==========================================
-    # Step 4: 结果存档 (Persistence)
-    # ==========================================
-    print("\n[4/5] 保存 Alpha 因子库...")
-    # 只保留 key columns 和 alpha columns
-    final_cols = ['date', 'asset', 'close'] + [c for c in df.columns if c.startswith('alpha_')]
-    df_alpha = df[final_cols].copy()
-    
-    save_path = "data/alpha_factors.csv"
-    df_alpha.to_csv(save_path)
-    print(f"✅ 文件已保存至: {save_path}")
-    
-# ==========================================
-    # Step 5: 因子体检报告 & 结果存档
-    # ==========================================
-    print("\n[5/5] 生成因子体检报告 (Horizon=10min)...")
+    # 适配与检查
+    print("   正在转换格式 (adapt_format)...")
+    df = adapt_format(df)
     
-    # 1. 预处理
+    print("   正在体检数据 (排序 / 重复 / 交易时段 / 缺失)...")
+    df, quality = validate_df(df)
+    report_quality(quality)
+    df = align_grid(df)
+
+    if ckpt is not None:
+        summary = {k: (v if isinstance(v, bool) else int(v)) for k, v in quality.items() if k != 'by_asset'}
+        if len(quality['by_asset']):
+            ckpt.save('quality', data_key, quality['by_asset'].reset_index())
+        ckpt.save('adapted', data_key, df, input=file_signature(DATA_PATH), quality=summary)
+    return df, data_key
+
+
+def compute_factors_cached(df, factor_config, ckpt, data_key):
+    """
+    Step 2 + 断点：每个因子列的 key = 数据 key + 因子配置 + 因子源码指纹 + 后端
+    + 所有因子共用的计算工具 (滚动核心 / 重采样 / 因子矩阵 / 后端分发) 的模块指纹
+    只重算 key 变了 (或新增) 的因子
+    """
+    shared = module_fingerprint(segment_starts, ResampleCache, FactorMatrix, factor_backend, FactorBase)
+    factor_keys = {
+        factor_col_name(c): make_key(data_key, c, factor_fingerprint(FACTOR_REGISTRY[c['name']]),
+                                     COMPUTE_BACKEND, shared)
+        for c in factor_config if c['name'] in FACTOR_REGISTRY
+    }
+    fm = FactorMatrix(list(factor_keys), df.index)
+    cached = ckpt.load_columns('factors', factor_keys)
+    for col in cached.columns:
+        fm.set(col, cached[col].to_numpy())
+    todo = [c for c in factor_config if factor_col_name(c) not in cached.columns]
+    if todo:
+        fm = compute_factors(df, todo, fm=fm)
+        ckpt.save_columns('factors', factor_keys, fm.frame())
+    return fm, factor_keys
+
+
+def clean_factors_cached(df, fm, ckpt, factor_keys):
+    """
+    Step 3 + 断点：清洗逐列独立，alpha 列的 key = 原始因子 key + 清洗配置 + 清洗代码指纹
+    返回 (fm, alpha_keys)
+    """
+    exposure_cols = [c for c in ['size', 'beta'] if c in df.columns]
+    code = module_fingerprint(FactorCleaner, segment_rolling)
+    alpha_keys = {
+        col.replace('factor_', 'alpha_'): make_key(key, CLEAN_CONFIG, exposure_cols, code)
+        for col, key in factor_keys.items() if col in fm
+    }
+    cached = ckpt.load_columns('alphas', alpha_keys)
+    for col in cached.columns:
+        fm.set(col.replace('alpha_', 'factor_', 1), cached[col].to_numpy())
+    reused = {col.replace('alpha_', 'factor_', 1) for col in cached.columns}
+    fm.rename(lambda c: c.replace('factor_', 'alpha_', 1) if c in reused else c)
+
+    todo = [c for c in fm.names if c.startswith('factor_')]
+    if todo:
+        fm = clean_factors(df, fm, cols=todo)
+        ckpt.save_columns('alphas', alpha_keys, fm.frame())
+    return fm, alpha_keys
+
+
+def evaluate_alphas(df_alpha):
+    """
+    Step 5: 逐因子 IC / 分组分析 + 多空回测，汇总存 factor_report.csv
+    """
+    # 1. 预处理 (先剔除各因子的预热期，再算未来收益)
+    warmups = {
+        factor_col_name(c).replace('factor_', 'alpha_', 1): config_warmup(c)
+        for c in FACTOR_CONFIG if c['name'] in FACTOR_REGISTRY
+    }
+    df_alpha = FactorEvaluator.mask_warmup(df_alpha, warmups)
     df_eval = FactorEvaluator.preprocess_data(df_alpha, ret_col='next_ret', horizon=10)
+    if 'is_valid' in df_eval.columns:
+        # 网格上补出来的 K 线不算作真实截面样本 (未来收益仍按网格上的 10 根计算)
+        df_eval = df_eval[df_eval['is_valid'].astype(bool)]
     
     # 2. 找到所有 alpha 因子
     alpha_cols = [c for c in df_eval.columns if c.startswith('alpha_')]
     print(f"待评估因子: {alpha_cols}")
 
+    # 初筛：抽样截面 + bootstrap 区间，只有通过的因子进入后面的全量评估
+    if SCREEN_CONFIG['enabled'] and len(alpha_cols) >= SCREEN_CONFIG['min_candidates']:
+        print(f"\n🔎 初筛 (每个交易日抽样 {SCREEN_CONFIG['frac']:.0%} 截面, bootstrap {SCREEN_CONFIG['n_boot']} 次)...")
+        screen = FactorEvaluator.screen(
+            df_eval, alpha_cols, 'next_ret',
+            frac=SCREEN_CONFIG['frac'], min_abs_ic=SCREEN_CONFIG['min_abs_ic'],
+            min_abs_icir=SCREEN_CONFIG['min_abs_icir'], n_boot=SCREEN_CONFIG['n_boot'],
+            block_len=SCREEN_CONFIG['block_len'],
+        )
+        print(screen.round(4))
+        screen.to_csv("data/factor_screen.csv", float_format='%.6f')
+        alpha_cols = [c for c in alpha_cols if screen.loc[c, 'Passed']]
+        print(f"   -> 通过 {len(alpha_cols)}/{len(screen)} 个，淘汰的因子不再做全量评估")
+
     summary_results = []
 
+    # 所有因子、所有分钟截面的 IC 一次算完，后面逐因子直接取列
+    ic_matrix = FactorEvaluator.calc_ic_matrix(df_eval, alpha_cols, 'next_ret')
+
+    # 多因子合成：滚动估计权重，合成因子当作普通 alpha 走后面同一套评估
+    if COMBINE_CONFIG['enabled'] and len(alpha_cols) > 1:
+        print("\n🧩 多因子合成 (等权 / IC / ICIR / 岭回归)...")
+        combo_weights = FactorCombiner.fit_weights(
+            df_eval, alpha_cols, 'next_ret', ic_matrix, horizon=10,
+            refit=COMBINE_CONFIG['refit'], window=COMBINE_CONFIG['window'],
+            ridge_lambda=COMBINE_CONFIG['ridge_lambda'],
+        )
+        df_eval = pd.concat([df_eval, FactorCombiner.combine(df_eval, alpha_cols, combo_weights)], axis=1)
+        df_alpha = pd.concat([df_alpha, FactorCombiner.combine(df_alpha, alpha_cols, combo_weights)], axis=1)
+        combo_cols = [c for c in df_eval.columns if c.startswith('alpha_combo_')]
+        ic_matrix = pd.concat([ic_matrix, FactorEvaluator.calc_ic_matrix(df_eval, combo_cols, 'next_ret')], axis=1)
+        alpha_cols = alpha_cols + combo_cols
+        pd.concat(combo_weights, names=['method']).to_csv("data/combo_weights.csv", float_format='%.6f')
+
     # 3. 循环评估
     for factor in alpha_cols:
         print(f"\n{'='*60}")
@@ -199,7 +553,7 @@ def main():
         print(f"{'='*60}")
         
         # --- A. IC 分析 ---
-        ic_series = FactorEvaluator.calc_ic_series(df_eval, factor, 'next_ret')
+        ic_series = ic_matrix[factor]
         metrics = FactorEvaluator.calc_ic_metrics(ic_series)
         
         print(f"[1] IC 表现:")
@@ -252,10 +606,35 @@ def main():
             
         summary_results.append(record)
 
+    # --- E. 多空组合回测 (不重叠调仓 + 换手成本)，所有因子一次算完 ---
+    print("\n📈 多空组合回测 (每 10 分钟调仓, 单边成本 3bp)...")
+    bt_summary, _ = FactorBacktester.run(df_alpha, alpha_cols, horizon=10, n_bins=5, cost_bps=3.0)
+    print(bt_summary.round(6))
+
+    # --- F. 日内 IC 结构：按交易日 / 日内时段汇总分钟 IC ---
+    print("\n🕒 日内 IC 分布 (开盘 / 盘中 / 尾盘)...")
+    intraday = FactorEvaluator.calc_intraday_ic(ic_matrix)
+    print(intraday['session'].T.round(4))
+    intraday['session'].T.to_csv("data/factor_session_ic.csv", float_format='%.6f')
+    intraday['minute_profile'].to_csv("data/factor_ic_profile.csv", float_format='%.6f')
+
+    # --- G. 分维度拆解 (月份 / 行业 / 流动性)，每个维度一次聚合 ---
+    print("\n🧱 分维度拆解...")
+    breakdown = FactorEvaluator.calc_breakdown(df_eval, alpha_cols, 'next_ret',
+                                               BREAKDOWN_CONFIG['dims'], ic_matrix=ic_matrix)
+    if len(breakdown):
+        print(breakdown.pivot_table(index='Factor_Name', columns=['Dimension', 'Bucket'],
+                                    values='IC_Mean', sort=False).round(4))
+        breakdown.to_csv("data/factor_breakdown.csv", index=False, float_format='%.6f')
+        print("✅ 拆解表已保存: data/factor_breakdown.csv")
+
     # 保存结果 (保持不变)
     if summary_results:
         print("\n💾 正在保存评估汇总表...")
         df_report = pd.DataFrame(summary_results)
+        df_report = df_report.merge(bt_summary.reset_index(), on="Factor_Name", how="left")
+        df_report = df_report.merge(intraday['daily'].rename_axis('Factor_Name').reset_index(),
+                                    on="Factor_Name", how="left")
         # 可以按 ICIR 或 累计多空收益 排序
         df_report = df_report.sort_values(by="IC_Mean", ascending=False)
         
@@ -265,6 +644,222 @@ def main():
     else:
         print("⚠️ 没有因子可以评估，报告未保存。")
 
+
+def run_pipeline(data_path, factor_config, save_path, chunk_days=None, halo_bars=None):
+    """
+    Step 1-4 的流水线版本：
+    后台线程解码第 N+1 块 parquet，主线程算第 N 块因子并清洗，后台线程写第 N-1 块结果
+    每块计算前拼上前一块每只股票最后 halo_bars 根 K 线，算完再把这部分切掉
+    :param chunk_days / halo_bars: 不传就用运行时的 PIPELINE_CHUNK_DAYS / PIPELINE_HALO_BARS
+    输出文件的格式与串行模式相同 (不写行号)
+    """
+    chunk_days = chunk_days if chunk_days is not None else PIPELINE_CHUNK_DAYS
+    halo_bars = halo_bars if halo_bars is not None else PIPELINE_HALO_BARS
+    halo_bars = halo_bars if halo_bars is not None else required_halo(factor_config)
+    print(f"   [Pipeline] 每块预热 {halo_bars} 根 K 线")
+    # 累计型因子每块从预热起点重新累计，按锚点接回整表的累计值 (在清洗之前)
+    cumulative = [factor_col_name(c) for c in factor_config
+                  if c['name'] in FACTOR_REGISTRY and config_lookback(c) is None]
+    state = {'tail': None, 'header': True, 'emitted': None, 'anchors': {}}
+    collected = []
+
+    def compute(raw):
+        df = adapt_format(raw)
+        if df.empty:
+            return None
+        if state['tail'] is not None:
+            df = pd.concat([state['tail'], df], ignore_index=True)
+        df = align_grid(check_df(df), verbose=False, end=df['date'].max())
+        tail = df.groupby('asset', sort=False).tail(halo_bars)
+        if 'is_valid' in tail.columns:
+            # 只带真实 K 线进下一块，补齐在下一块对齐时重新做
+            tail = tail[tail['is_valid']].drop(columns='is_valid')
+        state['tail'] = tail.reset_index(drop=True)
+
+        # 切掉预热用的历史部分，只输出每只股票上一块已输出时间之后的行
+        # (对齐网格时，上一块末尾补到块尾的 K 线在本块会重新生成，不能重复输出)
+        if state['emitted'] is None:
+            keep = df['date'].notna().to_numpy()
+        else:
+            last = df['asset'].map(state['emitted'])
+            keep = (last.isna() | (df['date'] > last)).to_numpy()
+
+        fm = compute_factors(df, factor_config, verbose=False)
+        if cumulative:
+            carry_cumulative(df, fm, cumulative, state['anchors'])
+            state['anchors'] = update_anchors(df, fm, cumulative, keep, state['anchors'])
+        fm = clean_factors(df, fm, verbose=False)
+
+        keys = pd.concat([df[key_columns(df)], breakdown_keys(df)], axis=1)
+        keys = keys[keep].reset_index(drop=True)
+        emitted = keys.groupby('asset', sort=False)['date'].max()
+        state['emitted'] = emitted if state['emitted'] is None else \
+            emitted.combine_first(state['emitted'])
+        alphas = fm.take(keep).frame().reset_index(drop=True)
+        print(f"   -> 已算完 {keys['date'].min()} ~ {keys['date'].max()} ({len(keys)} 行)")
+        return pd.concat([keys, alphas], axis=1)
+
+    def sink(df_chunk):
+        df_chunk.to_csv(save_path, mode='w' if state['header'] else 'a',
+                        header=state['header'], index=False)
+        state['header'] = False
+        collected.append(df_chunk)
+
+    runner = PipelineRunner(iter_parquet_chunks(data_path, chunk_days=chunk_days), compute, sink)
+    runner.run()
+
+    if not collected:
+        return None
+    return pd.concat(collected, ignore_index=True).sort_values(['asset', 'date']).reset_index(drop=True)
+
+
+def build_live_engine(factor_config):
+    """
+    实时引擎：有增量版本的因子每根 K 线 O(1) 更新运行状态；
+    其余因子每只股票只缓存最近 lookback 根 K 线，lookback 相同的放一组在缓冲区尾部重算
+    """
+    if CLEAN_CONFIG['mode'] == 'ts':
+        # 时序清洗要每只股票自己的历史因子值，实时模式每次只清洗最新截面，清出来全是 NaN
+        raise ValueError("实时模式不支持 CLEAN_CONFIG['mode'] = 'ts'，请改用 'cross'")
+    factor_config = [c for c in factor_config if c['name'] in FACTOR_REGISTRY]
+    streams, groups, dropped = {}, {}, []
+    for config in factor_config:
+        instance = FACTOR_REGISTRY[config['name']](config['params'])
+        col_name = factor_col_name(config)
+        if instance.incremental:
+            update = instance.stream()
+            streams[col_name] = ResampledStream(update, config['freq']) if config.get('freq') else update
+            continue
+        # 尾部重算时不带 shift，滞后由引擎统一做
+        base = {k: v for k, v in config.items() if k != 'shift'}
+        lookback = config_lookback(base)
+        if lookback is None:
+            # 累计型又没有增量版本：只靠缓冲区算不出和离线一致的值，不输出
+            dropped.append(col_name)
+            continue
+        groups.setdefault((lookback, config.get('freq')), []).append(base)
+    if dropped:
+        print(f"   ⚠️ [Live] 累计型因子 {dropped} 没有增量版本，实时模式不输出")
+
+    jobs = [(length, lambda panel, configs=configs: compute_factors(panel, configs, verbose=False,
+                                                                    backend=LIVE_BACKEND), freq)
+            for (length, freq), configs in groups.items()]
+    factor_config = [c for c in factor_config if factor_col_name(c) not in dropped]
+    fields = sorted({c for conf in factor_config
+                     for c in FACTOR_REGISTRY[conf['name']](conf['params']).required_cols} | {'close'})
+    capacity = max([length for length, _, _ in jobs], default=1)
+    print(f"   [Live] 增量更新 {len(streams)} 个因子，尾部重算 {len(factor_config) - len(streams)} 个 "
+          f"({len(jobs)} 组，每只股票最多缓存 {capacity} 根 K 线)，字段: {fields}")
+
+    return LiveAlphaEngine(
+        names=[factor_col_name(c) for c in factor_config],
+        streams=streams,
+        jobs=jobs,
+        clean=lambda df, fm: clean_factors(df, fm, verbose=False),
+        fields=fields,
+        shifts={factor_col_name(c): c.get('shift', 0) for c in factor_config},
+    )
+
+
+def run_live(factor_config, source_path=LIVE_SOURCE, host=LIVE_HOST, port=LIVE_PORT,
+             unix_path=LIVE_UNIX_SOCKET):
+    """
+    实时模式：行情推进实时引擎，本机 HTTP 提供最新截面的 alpha 快照
+    """
+    engine = build_live_engine(factor_config)
+    service = LiveAlphaService(engine, host=host, port=port, unix_path=unix_path).start()
+    try:
+        if source_path:
+            service.feed(tail_csv_bars(source_path))
+        else:
+            while True:
+                time.sleep(60)
+                print(f"   [Live] {engine.stats()}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        print(f"   [Live] 延迟统计: {engine.stats()}")
+
+
+def main():
+    print("量化因子挖掘启动...\n")
+
+    if LIVE_MODE:
+        run_live(FACTOR_CONFIG)
+        return
+
+    # ==========================================
+    # Step 1: 数据准备 (Data Preparation)
+    # ==========================================
+    if PIPELINE_MODE:
+        print("[1-4/5] 流水线模式：分块读取 / 计算清洗 / 写出 并行...")
+        try:
+            df_alpha = run_pipeline(DATA_PATH, FACTOR_CONFIG, ALPHA_PATH)
+        except FileNotFoundError:
+            print(f"❌ 错误：找不到文件 {DATA_PATH}")
+            return
+        if df_alpha is None:
+            print("⚠️ 没有读到任何数据。")
+            return
+        print(f"✅ 文件已保存至: {ALPHA_PATH}")
+
+        print("\n[5/5] 生成因子体检报告 (Horizon=10min)...")
+        evaluate_alphas(df_alpha)
+        print("\n✅ 所有任务完成！")
+        return
+
+    print("[1/5] 读取与检查数据...")
+    ckpt = StageCheckpoint(CHECKPOINT_DIR) if USE_CHECKPOINT else None
+    df, data_key = load_data(ckpt)
+    if df is None:
+        return
+    print(df.head())
+    # ...
+    print(f"✅ 数据加载完成: {len(df)} 行, {df['asset'].nunique()} 只股票")
+
+    # ==========================================
+    # Step 2: 因子计算 (Factor Calculation)
+    # ==========================================
+    print("\n[2/5] 开始计算原始因子...")
+    if ckpt is not None:
+        fm, factor_keys = compute_factors_cached(df, FACTOR_CONFIG, ckpt, data_key)
+    else:
+        fm = compute_factors(df, FACTOR_CONFIG)
+
+    # ==========================================
+    # Step 3: 因子清洗 (Factor Cleaning)
+    # ==========================================
+    print("\n[3/5] 开始因子清洗 (去极值/中性化/标准化)...")
+    if ckpt is not None:
+        fm, alpha_keys = clean_factors_cached(df, fm, ckpt, factor_keys)
+    else:
+        fm = clean_factors(df, fm)
+
+    # ==========================================
+    # Step 4: 结果存档 (Persistence)
+    # ==========================================
+    print("\n[4/5] 保存 Alpha 因子库...")
+    # 只保留 key columns 和 alpha columns (alpha 部分直接包装因子矩阵，不拷贝)
+    df_alpha = pd.concat([df[key_columns(df)], breakdown_keys(df), fm.frame()], axis=1)
+    
+    save_path = ALPHA_PATH
+    # 所有阶段都复用了断点、且上次写出的文件没被动过，就不再重写整张表
+    output_key = make_key(alpha_keys, BREAKDOWN_CONFIG) if ckpt is not None else None
+    if ckpt is not None and ckpt.output_current('output', output_key, save_path):
+        print(f"   [Checkpoint] 输出未变化，沿用 {save_path}")
+    else:
+        df_alpha.to_csv(save_path, index=False)
+        if ckpt is not None:
+            ckpt.record_output('output', output_key, save_path)
+        print(f"✅ 文件已保存至: {save_path}")
+    
+# ==========================================
+    # Step 5: 因子体检报告 & 结果存档
+    # ==========================================
+    print("\n[5/5] 生成因子体检报告 (Horizon=10min)...")
+    evaluate_alphas(df_alpha)
+
     print("\n✅ 所有任务完成！")
 
 if __name__ == "__main__":
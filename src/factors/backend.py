@@ -0,0 +1,105 @@
+# 文件路径: src/factors/backend.py
+import time
+import numpy as np
+import pandas as pd
+
+from src.factors.rolling import segment_starts
+
+# polars 是可选依赖，没装就只能用 pandas / numpy
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+BACKENDS = ('pandas', 'numpy', 'polars')
+
+
+def _run_numpy(df, jobs):
+    starts = segment_starts(df['asset'])
+    cache = {}
+
+    def get_cols(instance):
+        for c in instance.required_cols:
+            if c not in cache:
+                cache[c] = df[c].to_numpy(dtype=np.float64)
+        return cache
+
+    return {name: inst.calculate_numpy(get_cols(inst), starts) for name, inst in jobs.items()}
+
+
+def _run_polars(df, jobs):
+    if pl is None:
+        raise ImportError("polars 后端需要先 pip install polars")
+
+    cols = sorted({c for inst in jobs.values() for c in inst.required_cols})
+    # asset 用整数编码传进去，只用 numpy 数组构造，不依赖 pyarrow
+    data = {'asset': pd.factorize(df['asset'])[0]}
+    data.update({c: df[c].to_numpy(dtype=np.float64) for c in cols})
+    lf = pl.LazyFrame(data)
+    # 所有因子放进同一个查询，polars 会多线程并行算各列
+    lf = lf.select([inst.polars_expr().over('asset').alias(name) for name, inst in jobs.items()])
+    try:
+        out = lf.collect(engine='streaming')
+    except TypeError:
+        # 老版本 polars 没有 engine 参数
+        out = lf.collect(streaming=True)
+    return {name: out[name].to_numpy().astype(np.float64) for name in jobs}
+
+
+def calculate(df, jobs: dict, backend='pandas') -> dict:
+    """
+    用指定后端批量计算因子
+    :param df: 已按 ['asset', 'date'] 排序的分钟数据
+    :param jobs: 列名 -> 因子实例
+    :return: 列名 -> 与 df 等长的结果；不支持该后端的因子自动回退到 pandas
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend: {backend}, choose from {BACKENDS}")
+
+    ported = {} if backend == 'pandas' else {
+        name: inst for name, inst in jobs.items() if backend in inst.backends
+    }
+    results = {name: inst.calculate(df) for name, inst in jobs.items() if name not in ported}
+    if ported:
+        runner = _run_numpy if backend == 'numpy' else _run_polars
+        computed = runner(df, ported)
+        results.update({name: pd.Series(v, index=df.index) for name, v in computed.items()})
+    return results
+
+
+def compare_backends(df, jobs: dict, backends=BACKENDS, rtol=1e-6) -> pd.DataFrame:
+    """
+    一致性检查 + 性能对比：同一份数据上各后端的结果和 pandas 对比 (backends 需包含 'pandas')
+    返回每个 (因子, 后端) 的最大相对误差、NaN 位置是否一致、以及批量耗时
+    """
+    if pl is None:
+        backends = [b for b in backends if b != 'polars']
+    # 只比较所有后端都已移植的因子，耗时才可比
+    jobs = {name: inst for name, inst in jobs.items() if set(backends) <= inst.backends}
+
+    timings, outputs = {}, {}
+    for backend in backends:
+        t0 = time.perf_counter()
+        outputs[backend] = calculate(df, jobs, backend)
+        timings[backend] = time.perf_counter() - t0
+
+    records = []
+    for name, inst in jobs.items():
+        ref = np.asarray(outputs['pandas'][name], dtype=np.float64)
+        for backend in backends:
+            if backend == 'pandas':
+                continue
+            val = np.asarray(outputs[backend][name], dtype=np.float64)
+            both = np.isfinite(ref) & np.isfinite(val)
+            err = np.abs(val[both] - ref[both]) / np.maximum(np.abs(ref[both]), 1.0)
+            max_err = err.max() if len(err) else 0.0
+            records.append({
+                'factor': name,
+                'backend': backend,
+                'max_rel_err': max_err,
+                'nan_match': bool((np.isfinite(ref) == np.isfinite(val)).all()),
+                'passed': bool(max_err <= rtol and (np.isfinite(ref) == np.isfinite(val)).all()),
+                'batch_seconds': timings[backend],
+                'speedup_vs_pandas': timings['pandas'] / timings[backend],
+            })
+    return pd.DataFrame(records)
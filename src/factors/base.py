@@ -1,5 +1,6 @@
 # 文件路径: src/factors/base.py
 from abc import ABC, abstractmethod
+import math
 import pandas as pd 
 
 # --- 定义开始 ---
@@ -27,6 +28,13 @@ def register_factor(name: str):
 
 # --- 定义结束 ---
 
+def ewm_lookback(span: int, tol: float = 1e-6) -> int:
+    """
+    EWM(span) 的有效记忆长度：再往前的 K 线权重 (1-alpha)^k 已经小于 tol
+    """
+    alpha = 2.0 / (span + 1)
+    return int(math.ceil(math.log(tol) / math.log(1 - alpha)))
+
 class FactorBase(ABC):
     def __init__(self, params: dict = None):
         self.params = params if params else {}
@@ -49,4 +57,63 @@ class FactorBase(ABC):
 
     @abstractmethod
     def calculate(self, df) -> pd.Series:
-        pass
\ No newline at end of file
+        pass
+
+    # --- 历史长度声明 (分块计算的 halo / 评估时剔除预热期都靠它) ---
+
+    @property
+    def lookback(self):
+        """
+        算出"与全量历史一致"的当前值，需要多少根 K 线 (含当前这根)
+        滚动窗口类一般是 window 或 window+1 (先 diff/pct_change 再滚动)
+        None 表示累计型因子 (如 PVT)，依赖全部历史，分块时无法精确续算
+        """
+        return 1
+
+    @property
+    def warmup(self) -> int:
+        """
+        每只股票开头有多少根 K 线的值不可用 (NaN 或尚未收敛)，评估时要剔除
+        """
+        return (self.lookback or 1) - 1
+
+    # --- 可选：其它计算后端 (见 src/factors/backend.py) ---
+    # 子类覆盖哪个，就支持哪个后端；没覆盖的自动回退到 pandas 的 calculate
+
+    def calculate_numpy(self, cols: dict, starts):
+        """
+        纯 NumPy 版本
+        cols: 列名 -> 1 维 ndarray (已按 ['asset', 'date'] 排序)
+        starts: 每一行所在股票分段的起始行号 (rolling.segment_starts)
+        返回与行数等长的 ndarray
+        """
+        raise NotImplementedError
+
+    def polars_expr(self):
+        """
+        Polars 版本：返回单只股票上的表达式，由后端统一加 .over('asset') 执行
+        """
+        raise NotImplementedError
+
+    def stream(self):
+        """
+        增量版本 (实时模式)：返回 update(rows, bar) -> ndarray，每来一根 K 线 O(1) 更新
+        rows: 这批股票在实时缓冲区里的行号 (每只股票的运行状态按行号存)
+        bar: 列名 -> 1 维 ndarray，这批股票最新的一根 K 线 (另有 'date')
+        状态放在闭包里的 src/factors/stream.py 小部件中，每次调用 stream() 得到一份新状态
+        """
+        raise NotImplementedError
+
+    @property
+    def incremental(self) -> bool:
+        """有没有可用的 stream()；某些参数下没有增量版本的因子 (如依赖外部列) 在子类里按参数判断"""
+        return type(self).stream is not FactorBase.stream
+
+    @property
+    def backends(self) -> set:
+        supported = {'pandas'}
+        if type(self).calculate_numpy is not FactorBase.calculate_numpy:
+            supported.add('numpy')
+        if type(self).polars_expr is not FactorBase.polars_expr:
+            supported.add('polars')
+        return supported
\ No newline at end of file
@@ -1,7 +1,19 @@
 import pandas as pd
 import numpy as np
 # 从同级目录的 base.py 导入工具
-from src.factors.base import FactorBase, register_factor
+from src.factors.base import FactorBase, register_factor, ewm_lookback
+from src.factors.rolling import (
+    segment_starts, segment_shift, rolling_sum, rolling_count, rolling_mean, rolling_std
+)
+from src.factors.stream import (
+    Lag, RollingSum, RollingMoments, RollingWindow, EWM, Cumsum, window_mean, window_std, window_corr
+)
+
+# polars 后端是可选的 (见 src/factors/backend.py)
+try:
+    import polars as pl
+except ImportError:
+    pl = None
 
 # ==========================================
 # Part 1: 纯数学公式 (Math Logic)
@@ -204,138 +216,450 @@ def calc_aroon(high, low, window=25):
     return aroon_up - aroon_down # 返回 Aroon Oscillator
 
 
+# 26. 市场收益率 (基准)
+# 有指数列就用指数的收益率，否则用当期全市场股票收益率的截面均值
+def calc_market_return(df, ret, index_col=None):
+    if index_col and index_col in df.columns:
+        return df.groupby('asset')[index_col].pct_change()
+    return ret.groupby(df['date']).transform('mean')
+
+# 27. 滚动 beta / alpha / 特异波动率 (所有股票一次算完)
+# 用滚动累加和算离差积：SP_rm = Σrm - Σr·Σm/n，不对每只股票跑回归
+def calc_market_regression(asset, ret, mkt, window=20):
+    starts = segment_starts(asset)
+    r = ret.to_numpy(dtype=np.float64)
+    m = mkt.to_numpy(dtype=np.float64)
+    valid = np.isfinite(r) & np.isfinite(m)
+    r = np.where(valid, r, 0.0)
+    m = np.where(valid, m, 0.0)
+
+    sums = rolling_sum(np.column_stack([r, m, r * m, m * m, r * r]), starts, window)
+    n = rolling_count(np.where(valid, 1.0, np.nan), starts, window)
+    s_r, s_m, s_rm, s_mm, s_rr = sums.T
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov_rm = s_rm - s_r * s_m / n
+        var_m = s_mm - s_m * s_m / n
+        var_r = s_rr - s_r * s_r / n
+        out = market_regression_outputs(n, s_r / n, s_m / n, cov_rm, var_m, var_r, window)
+    return pd.DataFrame(out, index=ret.index)
+
+# 由窗口内的均值和离差平方和 / 离差积和得到 beta / alpha / 特异波动率 (离线和实时共用)
+def market_regression_outputs(n, mean_r, mean_m, cov_rm, var_m, var_r, window):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        beta = cov_rm / np.where(var_m > 1e-16, var_m, np.nan)
+        alpha = mean_r - beta * mean_m
+        # 残差平方和 = SS_r - beta * SP_rm，自由度 n-2
+        resid_var = np.maximum(var_r - beta * cov_rm, 0) / (n - 2)
+        idio_vol = np.sqrt(resid_var)
+
+    # 窗口没填满的位置与 pandas rolling 一样返回 NaN
+    full = n >= window
+    out = {'beta': beta, 'alpha': alpha, 'idio_vol': idio_vol}
+    return {k: np.where(full, v, np.nan) for k, v in out.items()}
+
 # ==========================================
 # Part 2: 因子类封装 (Factor Classes)
 # ==========================================
 
+# 市场相对因子：beta / alpha / 特异波动率
+# params: window 滚动窗口；index_col 指数收盘价列名 (不填就用截面均值当市场)
+class MarketRelativeBase(FactorBase):
+    output = None  # 'beta' / 'alpha' / 'idio_vol'
+
+    @property
+    def required_cols(self): return ['close']
+    @property
+    def lookback(self): return self.params.get('window', 20) + 1
+
+    def calculate(self, df):
+        w = self.params.get('window', 20)
+        ret = df.groupby('asset')['close'].pct_change()
+        mkt = calc_market_return(df, ret, self.params.get('index_col'))
+        return calc_market_regression(df['asset'], ret, mkt, w)[self.output]
+
+    @property
+    def incremental(self):
+        # 指数列不在实时缓冲区里，只支持"截面均值当市场"
+        return not self.params.get('index_col')
+
+    def stream(self):
+        w = self.params.get('window', 20)
+        prev, moments = Lag(1), RollingMoments(w, 2)
+        def update(rows, bar):
+            ret = bar['close'] / prev.update(rows, bar['close']) - 1
+            # 这一批就是同一时刻的全部股票，市场收益 = 截面均值
+            ok = np.isfinite(ret)
+            mkt = np.full(len(ret), ret[ok].mean() if ok.any() else np.nan)
+            n, mean, ss = moments.update(rows, np.column_stack([ret, mkt]))
+            out = market_regression_outputs(n, mean[:, 0], mean[:, 1], ss[:, 0, 1],
+                                            ss[:, 1, 1], ss[:, 0, 0], w)
+            return out[self.output]
+        return update
+
+@register_factor('Beta')
+class Beta(MarketRelativeBase):
+    output = 'beta'
+
+@register_factor('Alpha')
+class Alpha(MarketRelativeBase):
+    output = 'alpha'
+
+@register_factor('Idio_VOL')
+class IdioVolatility(MarketRelativeBase):
+    output = 'idio_vol'
+
+
 #Gemini因子
 @register_factor('BIAS')
 class BIAS(FactorBase):
     @property
     def required_cols(self): return ['close']
+    @property
+    def lookback(self): return self.params.get('window', 20)
     def calculate(self, df):
         w = self.params.get('window', 20)
         return df.groupby('asset')['close'].transform(lambda x: calc_bias(x, w))
+    def calculate_numpy(self, cols, starts):
+        w = self.params.get('window', 20)
+        ma = rolling_mean(cols['close'], starts, w)
+        return (cols['close'] - ma) / (ma + 1e-8)
+    def polars_expr(self):
+        w = self.params.get('window', 20)
+        ma = pl.col('close').rolling_mean(w)
+        return (pl.col('close') - ma) / (ma + 1e-8)
+    def stream(self):
+        w = self.params.get('window', 20)
+        roll = RollingSum(w)
+        def update(rows, bar):
+            ma = window_mean(*roll.update(rows, bar['close']), w)
+            return (bar['close'] - ma) / (ma + 1e-8)
+        return update
 
 @register_factor('CCI')
 class CCI(FactorBase):
     @property
     def required_cols(self): return ['high', 'low', 'close']
+    @property
+    def lookback(self): return self.params.get('window', 14)
     def calculate(self, df):
         w = self.params.get('window', 14)
         def logic(sub): return calc_cci(sub['high'], sub['low'], sub['close'], w)
         return df.groupby('asset', group_keys=False).apply(logic)
+    def stream(self):
+        # MAD 没有运行和形式，在最近 window 个值上直接算
+        w = self.params.get('window', 14)
+        win = RollingWindow(w)
+        def update(rows, bar):
+            tp = (bar['high'] + bar['low'] + bar['close']) / 3
+            x = win.update(rows, tp)
+            full = np.isfinite(x).all(axis=1)
+            ma = x.mean(axis=1)
+            md = np.abs(x - ma[:, None]).mean(axis=1)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                cci = (tp - ma) / (0.015 * np.where(md == 0, np.nan, md))
+            return np.where(full, cci, np.nan)
+        return update
 
 @register_factor('ATR')
 class ATR(FactorBase):
     @property
     def required_cols(self): return ['high', 'low', 'close']
+    @property
+    def lookback(self): return self.params.get('window', 14) + 1
     def calculate(self, df):
         w = self.params.get('window', 14)
         def logic(sub): return calc_atr(sub['high'], sub['low'], sub['close'], w)
         return df.groupby('asset', group_keys=False).apply(logic)
+    def stream(self):
+        w = self.params.get('window', 14)
+        prev, roll = Lag(1), RollingSum(w)
+        def update(rows, bar):
+            c_prev = prev.update(rows, bar['close'])
+            tr = np.fmax(bar['high'] - bar['low'],
+                         np.fmax(np.abs(bar['high'] - c_prev), np.abs(bar['low'] - c_prev)))
+            return window_mean(*roll.update(rows, tr), w)
+        return update
 
 @register_factor('Boll_Width')
 class Boll_Width(FactorBase):
     @property
     def required_cols(self): return ['close']
+    @property
+    def lookback(self): return self.params.get('window', 20)
     def calculate(self, df):
         w = self.params.get('window', 20)
         return df.groupby('asset')['close'].transform(lambda x: calc_boll_width(x, w))
+    def stream(self):
+        w = self.params.get('window', 20)
+        moments = RollingMoments(w)
+        def update(rows, bar):
+            n, mean, ss = moments.update(rows, bar['close'])
+            ma, std = mean[:, 0], window_std(n, ss[:, 0, 0], w)
+            return ((ma + 2 * std) - (ma - 2 * std)) / ma
+        return update
 
 @register_factor('MFI')
 class MFI(FactorBase):
     @property
     def required_cols(self): return ['high', 'low', 'close', 'volume']
+    @property
+    def lookback(self): return self.params.get('window', 14) + 1
     def calculate(self, df):
         w = self.params.get('window', 14)
         def logic(sub): return calc_mfi(sub['high'], sub['low'], sub['close'], sub['volume'], w)
         return df.groupby('asset', group_keys=False).apply(logic)
+    def stream(self):
+        w = self.params.get('window', 14)
+        prev, roll = Lag(1), RollingSum(w, 2)
+        def update(rows, bar):
+            tp = (bar['high'] + bar['low'] + bar['close']) / 3
+            delta = tp - prev.update(rows, tp)
+            rmf = tp * bar['volume']
+            flows = np.column_stack([np.where(delta > 0, rmf, 0.0), np.where(delta < 0, rmf, 0.0)])
+            sums, counts = roll.update(rows, flows)
+            sums = np.where(counts >= w, sums, np.nan)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                m_ratio = sums[:, 0] / np.where(sums[:, 1] == 0, np.nan, sums[:, 1])
+                return 100 - (100 / (1 + m_ratio))
+        return update
 
 @register_factor('WilliamsR')
 class WilliamsR(FactorBase):
     @property
     def required_cols(self): return ['high', 'low', 'close']
+    @property
+    def lookback(self): return self.params.get('window', 14)
     def calculate(self, df):
         w = self.params.get('window', 14)
         def logic(sub): return calc_willr(sub['high'], sub['low'], sub['close'], w)
         return df.groupby('asset', group_keys=False).apply(logic)
+    def stream(self):
+        w = self.params.get('window', 14)
+        win = RollingWindow(w, 2)
+        def update(rows, bar):
+            x = win.update(rows, np.column_stack([bar['high'], bar['low']]))
+            full = np.isfinite(x).all(axis=(1, 2))
+            hh, ll = x[:, :, 0].max(axis=1), x[:, :, 1].min(axis=1)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                willr = -100 * (hh - bar['close']) / np.where(hh == ll, np.nan, hh - ll)
+            return np.where(full, willr, np.nan)
+        return update
 
 @register_factor('Amihud')
 class Amihud(FactorBase):
     @property
     def required_cols(self): return ['close', 'volume']
+    @property
+    def lookback(self): return self.params.get('window', 20) + 1
     def calculate(self, df):
         w = self.params.get('window', 20)
         def logic(sub): return calc_amihud(sub['close'], sub['volume'], w)
         return df.groupby('asset', group_keys=False).apply(logic)
+    def stream(self):
+        w = self.params.get('window', 20)
+        prev, roll = Lag(1), RollingSum(w)
+        def update(rows, bar):
+            ret_abs = np.abs(bar['close'] / prev.update(rows, bar['close']) - 1)
+            amt = bar['close'] * bar['volume']
+            illiq = ret_abs / np.where(amt == 0, np.nan, amt)
+            return window_mean(*roll.update(rows, illiq), w) * 1e6
+        return update
 
 @register_factor('Skewness')
 class Skewness(FactorBase):
     @property
     def required_cols(self): return ['close']
+    @property
+    def lookback(self): return self.params.get('window', 20) + 1
     def calculate(self, df):
         w = self.params.get('window', 20)
         return df.groupby('asset')['close'].transform(lambda x: calc_skew(x, w))
+    def stream(self):
+        # 三阶矩在最近 window 个收益率上直接算 (公式同 pandas rolling skew)
+        w = self.params.get('window', 20)
+        prev, win = Lag(1), RollingWindow(w)
+        def update(rows, bar):
+            x = win.update(rows, bar['close'] / prev.update(rows, bar['close']) - 1)
+            full = np.isfinite(x).all(axis=1)
+            d = x - x.mean(axis=1, keepdims=True)
+            b, c = (d ** 2).mean(axis=1), (d ** 3).mean(axis=1)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                skew = np.sqrt(w * (w - 1)) * c / ((w - 2) * np.where(b > 0, b, np.nan) ** 1.5)
+            return np.where(full, skew, np.nan)
+        return update
 
 @register_factor('PriceRank')
 class PriceRank(FactorBase):
     @property
     def required_cols(self): return ['close']
+    @property
+    def lookback(self): return self.params.get('window', 20)
     def calculate(self, df):
         w = self.params.get('window', 20)
         return df.groupby('asset')['close'].transform(lambda x: calc_price_rank(x, w))
+    def stream(self):
+        w = self.params.get('window', 20)
+        win = RollingWindow(w)
+        def update(rows, bar):
+            x = win.update(rows, bar['close'])
+            full = np.isfinite(x).all(axis=1)
+            rank = (x < x[:, -1:]).sum(axis=1) / (w - 1)
+            return np.where(full, rank, np.nan)
+        return update
 
 @register_factor('ROC')
 class ROC(FactorBase):
     @property
     def required_cols(self): return ['close']
+    @property
+    def lookback(self): return self.params.get('window', 12) + 1
     def calculate(self, df):
         w = self.params.get('window', 12)
         return df.groupby('asset')['close'].transform(lambda x: calc_roc(x, w))
+    def calculate_numpy(self, cols, starts):
+        w = self.params.get('window', 12)
+        prev = segment_shift(cols['close'], starts, w)
+        return (cols['close'] - prev) / prev
+    def polars_expr(self):
+        w = self.params.get('window', 12)
+        prev = pl.col('close').shift(w)
+        return (pl.col('close') - prev) / prev
+    def stream(self):
+        lag = Lag(self.params.get('window', 12))
+        def update(rows, bar):
+            prev = lag.update(rows, bar['close'])
+            return (bar['close'] - prev) / prev
+        return update
 
 @register_factor('PSY')
 class PSY(FactorBase):
     @property
     def required_cols(self): return ['close']
+    @property
+    def lookback(self): return self.params.get('window', 12) + 1
     def calculate(self, df):
         w = self.params.get('window', 12)
         return df.groupby('asset')['close'].transform(lambda x: calc_psy(x, w))
+    def calculate_numpy(self, cols, starts):
+        w = self.params.get('window', 12)
+        up = (cols['close'] - segment_shift(cols['close'], starts, 1)) > 0
+        return rolling_mean(up.astype(np.float64), starts, w) * 100
+    def polars_expr(self):
+        w = self.params.get('window', 12)
+        up = (pl.col('close').diff() > 0).fill_null(False).cast(pl.Float64)
+        return up.rolling_mean(w) * 100
+    def stream(self):
+        w = self.params.get('window', 12)
+        prev, roll = Lag(1), RollingSum(w)
+        def update(rows, bar):
+            up = (bar['close'] - prev.update(rows, bar['close'])) > 0
+            return window_mean(*roll.update(rows, up.astype(np.float64)), w) * 100
+        return update
 
 @register_factor('VWAP_Bias')
 class VWAP_Bias(FactorBase):
     @property
     def required_cols(self): return ['close', 'volume']
+    @property
+    def lookback(self): return self.params.get('window', 20)
     def calculate(self, df):
         w = self.params.get('window', 20)
         def logic(sub): return calc_vwap_bias(sub['close'], sub['volume'], w)
         return df.groupby('asset', group_keys=False).apply(logic)
+    def calculate_numpy(self, cols, starts):
+        w = self.params.get('window', 20)
+        pv = cols['close'] * cols['volume']
+        full = rolling_count(pv, starts, w) >= w
+        cum_pv = np.where(full, rolling_sum(pv, starts, w), np.nan)
+        cum_v = np.where(full, rolling_sum(cols['volume'], starts, w), np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            vwap = cum_pv / np.where(cum_v == 0, np.nan, cum_v)
+        return cols['close'] / vwap - 1
+    def polars_expr(self):
+        w = self.params.get('window', 20)
+        cum_pv = (pl.col('close') * pl.col('volume')).rolling_sum(w)
+        cum_v = pl.col('volume').rolling_sum(w)
+        vwap = cum_pv / pl.when(cum_v == 0).then(None).otherwise(cum_v)
+        return pl.col('close') / vwap - 1
+    def stream(self):
+        w = self.params.get('window', 20)
+        roll = RollingSum(w, 2)
+        def update(rows, bar):
+            sums, counts = roll.update(rows, np.column_stack([bar['close'] * bar['volume'], bar['volume']]))
+            sums = np.where(counts >= w, sums, np.nan)
+            vwap = sums[:, 0] / np.where(sums[:, 1] == 0, np.nan, sums[:, 1])
+            return bar['close'] / vwap - 1
+        return update
 
 @register_factor('VR')
 class VR(FactorBase):
     @property
     def required_cols(self): return ['close', 'volume']
+    @property
+    def lookback(self): return self.params.get('window', 26) + 1
     def calculate(self, df):
         w = self.params.get('window', 26)
         def logic(sub): return calc_vr(sub['close'], sub['volume'], w)
         return df.groupby('asset', group_keys=False).apply(logic)
+    def stream(self):
+        w = self.params.get('window', 26)
+        prev, roll = Lag(1), RollingSum(w, 3)
+        def update(rows, bar):
+            diff, v = bar['close'] - prev.update(rows, bar['close']), bar['volume']
+            vols = np.column_stack([np.where(diff > 0, v, 0.0), np.where(diff < 0, v, 0.0),
+                                    np.where(diff == 0, v, 0.0)])
+            sums, counts = roll.update(rows, vols)
+            u, d, q = np.where(counts >= w, sums, np.nan).T
+            return (u + 0.5 * q) / (d + 0.5 * q + 1e-8) * 100
+        return update
 
 @register_factor('Return_Std')
 class Return_Std(FactorBase):
     @property
     def required_cols(self): return ['close']
+    @property
+    def lookback(self): return self.params.get('window', 20) + 1
     def calculate(self, df):
         w = self.params.get('window', 20)
         return df.groupby('asset')['close'].transform(lambda x: calc_std(x, w))
+    def calculate_numpy(self, cols, starts):
+        w = self.params.get('window', 20)
+        ret = cols['close'] / segment_shift(cols['close'], starts, 1) - 1
+        return rolling_std(ret, starts, w)
+    def polars_expr(self):
+        w = self.params.get('window', 20)
+        return pl.col('close').pct_change().rolling_std(w)
+    def stream(self):
+        w = self.params.get('window', 20)
+        prev, moments = Lag(1), RollingMoments(w)
+        def update(rows, bar):
+            ret = bar['close'] / prev.update(rows, bar['close']) - 1
+            n, _, ss = moments.update(rows, ret)
+            return window_std(n, ss[:, 0, 0], w)
+        return update
 
 @register_factor('Aroon')
 class Aroon(FactorBase):
     @property
     def required_cols(self): return ['high', 'low']
+    @property
+    def lookback(self): return self.params.get('window', 25)
     def calculate(self, df):
         w = self.params.get('window', 25)
         def logic(sub): return calc_aroon(sub['high'], sub['low'], w)
         return df.groupby('asset', group_keys=False).apply(logic)
+    def stream(self):
+        w = self.params.get('window', 25)
+        win = RollingWindow(w, 2)
+        def update(rows, bar):
+            x = win.update(rows, np.column_stack([bar['high'], bar['low']]))
+            full = np.isfinite(x).all(axis=(1, 2))
+            arg_max = x[:, :, 0].argmax(axis=1)
+            arg_min = x[:, :, 1].argmin(axis=1)
+            aroon = (arg_max + 1) / w * 100 - (arg_min + 1) / w * 100
+            return np.where(full, aroon, np.nan)
+        return update
 
 # 新增因子7: 获利盘比例 CGO
 @register_factor('Capital_Gain_Overhang')
@@ -344,6 +668,10 @@ class Capital_Gain_Overhang(FactorBase):
     def required_cols(self):
         return ['close', 'volume', 'turnover']
 
+    @property
+    def lookback(self):
+        return self.params.get('window', 10)
+
     def calculate(self, df):
         w = self.params.get('window', 10) # CGO通常周期较长，建议默认60
         
@@ -357,12 +685,27 @@ class Capital_Gain_Overhang(FactorBase):
         # 调用纯数学逻辑
         return calc_cgo_math(df['close'], sum_volume, sum_turnover)
 
+    def stream(self):
+        w = self.params.get('window', 10)
+        roll = RollingSum(w, 2)
+        def update(rows, bar):
+            sums, counts = roll.update(rows, np.column_stack([bar['turnover'], bar['volume']]))
+            sum_turnover, sum_volume = np.where(counts >= w, sums, np.nan).T
+            avg_cost = sum_turnover / (sum_volume + 1e-8)
+            cgo = (bar['close'] - avg_cost) / avg_cost
+            return np.where(np.isnan(cgo), 0.0, cgo)
+        return update
+
 # 新增因子6: 换手率稳定性
 @register_factor('Turnover_Stability')
 class Turnover_Stability(FactorBase):
     @property
     def required_cols(self):
         return ['turnover']
+
+    @property
+    def lookback(self):
+        return self.params.get('window', 10)
     
     def calculate(self, df):
         w = self.params.get('window', 10)        
@@ -370,6 +713,25 @@ class Turnover_Stability(FactorBase):
             lambda x: calc_turnover_stability(x, window=w)
         )
 
+    def calculate_numpy(self, cols, starts):
+        w = self.params.get('window', 10)
+        mean_val = rolling_mean(cols['turnover'], starts, w)
+        std_val = rolling_std(cols['turnover'], starts, w)
+        return -std_val / (mean_val + 1e-8)
+
+    def polars_expr(self):
+        w = self.params.get('window', 10)
+        return -pl.col('turnover').rolling_std(w) / (pl.col('turnover').rolling_mean(w) + 1e-8)
+
+    def stream(self):
+        w = self.params.get('window', 10)
+        moments = RollingMoments(w)
+        def update(rows, bar):
+            n, mean, ss = moments.update(rows, bar['turnover'])
+            mean_val = np.where(n >= w, mean[:, 0], np.nan)
+            return -window_std(n, ss[:, 0, 0], w) / (mean_val + 1e-8)
+        return update
+
 # 新增因子5: 收益率与活跃度匹配
 @register_factor('Ret_Turnover_Corr')
 class Ret_Turnover_Corr(FactorBase):
@@ -377,6 +739,10 @@ class Ret_Turnover_Corr(FactorBase):
     def required_cols(self):
         return ['close', 'turnover']
 
+    @property
+    def lookback(self):
+        return self.params.get('window', 10) + 1
+
     def calculate(self, df):
         w = self.params.get('window', 10)
         
@@ -386,6 +752,16 @@ class Ret_Turnover_Corr(FactorBase):
             
         return df.groupby('asset', group_keys=False).apply(logic)
 
+    def stream(self):
+        w = self.params.get('window', 10)
+        prev, moments = Lag(1), RollingMoments(w, 2)
+        def update(rows, bar):
+            ret = bar['close'] / prev.update(rows, bar['close']) - 1
+            n, _, ss = moments.update(rows, np.column_stack([ret, bar['turnover']]))
+            corr = window_corr(n, ss, w)
+            return np.where(np.isnan(corr), 0.0, corr)
+        return update
+
 # 新增因子4: 量价相关性 (变化率版)
 @register_factor('Volume_Price_Corr')
 class Volume_Price_Corr(FactorBase):
@@ -393,6 +769,10 @@ class Volume_Price_Corr(FactorBase):
     def required_cols(self):
         return ['close', 'volume']
 
+    @property
+    def lookback(self):
+        return self.params.get('window', 10) + 1
+
     def calculate(self, df):
         w = self.params.get('window', 10)
         
@@ -401,12 +781,27 @@ class Volume_Price_Corr(FactorBase):
             
         return df.groupby('asset', group_keys=False).apply(logic)
 
+    def stream(self):
+        w = self.params.get('window', 10)
+        prev_c, prev_v, moments = Lag(1), Lag(1), RollingMoments(w, 2)
+        def update(rows, bar):
+            delta_price = bar['close'] / prev_c.update(rows, bar['close']) - 1
+            delta_volume = bar['volume'] / prev_v.update(rows, bar['volume']) - 1
+            n, _, ss = moments.update(rows, np.column_stack([delta_price, delta_volume]))
+            corr = window_corr(n, ss, w)
+            return np.where(np.isnan(corr), 0.0, corr)
+        return update
+
 # 新增因子3：剔除beta的波动率
 @register_factor('Individual_VOL')
 class IndividualVolatility(FactorBase):
     @property
     def required_cols(self):
         return ['close']
+
+    @property
+    def lookback(self):
+        return 2 * self.params.get('window', 10) - 1
     
     def calculate(self, df) -> pd.Series:
         w = self.params.get('window', 10)
@@ -414,12 +809,26 @@ class IndividualVolatility(FactorBase):
             lambda x: calc_individual_vol(x, window=w)
         )
 
+    def stream(self):
+        w = self.params.get('window', 10)
+        roll, moments = RollingSum(w), RollingMoments(w)
+        def update(rows, bar):
+            ma = window_mean(*roll.update(rows, bar['close']), w)
+            bias = (bar['close'] - ma) / ma
+            n, _, ss = moments.update(rows, bias)
+            return -window_std(n, ss[:, 0, 0], w)
+        return update
+
 # 新增因子2：路径效率
 @register_factor('ER')
 class EfficiencyRatio(FactorBase):
     @property
     def required_cols(self):
         return ['close']
+
+    @property
+    def lookback(self):
+        return self.params.get('window', 10) + 1
     
     def calculate(self, df) -> pd.Series:
         w = self.params.get('window', 10)
@@ -427,6 +836,17 @@ class EfficiencyRatio(FactorBase):
             lambda x: calc_er(x, window=w)
         )
 
+    def stream(self):
+        w = self.params.get('window', 10)
+        lag, prev, roll = Lag(w), Lag(1), RollingSum(w)
+        def update(rows, bar):
+            change = np.abs(bar['close'] - lag.update(rows, bar['close']))
+            s, n = roll.update(rows, np.abs(bar['close'] - prev.update(rows, bar['close'])))
+            path = np.where(n >= w, s, np.nan)
+            er = change / np.where(path == 0, np.nan, path)
+            return np.where(np.isnan(er), 0.0, er)
+        return update
+
 # 新增因子1：时间序列动量
 @register_factor("TSMOM")
 class Momentum(FactorBase):
@@ -434,17 +854,39 @@ class Momentum(FactorBase):
     def required_cols(self) -> list:
         return ['close']
 
+    @property
+    def lookback(self):
+        return self.params.get('window', 10) + 1
+
     def calculate(self, df) -> pd.Series:
         w = self.params.get('window', 10)
         return df.groupby('asset')['close'].transform(
             lambda x: calc_ts_momentum(x, window=w)
         )
 
+    def calculate_numpy(self, cols, starts):
+        w = self.params.get('window', 10)
+        return cols['close'] / segment_shift(cols['close'], starts, w)
+
+    def polars_expr(self):
+        w = self.params.get('window', 10)
+        return pl.col('close') / pl.col('close').shift(w)
+
+    def stream(self):
+        lag = Lag(self.params.get('window', 10))
+        def update(rows, bar):
+            return bar['close'] / lag.update(rows, bar['close'])
+        return update
+
 @register_factor('RSI')
 class RSI(FactorBase):
     @property
     def required_cols(self):
         return ['close']
+
+    @property
+    def lookback(self):
+        return self.params.get('window', 10) + 1
     
     def calculate(self, df) -> pd.Series:
         w = self.params.get('window', 10)
@@ -452,12 +894,34 @@ class RSI(FactorBase):
             lambda x: calc_rsi(x, window=w)
         )
 
+    def stream(self):
+        w = self.params.get('window', 10)
+        prev, roll = Lag(1), RollingSum(w, 2)
+        def update(rows, bar):
+            delta = bar['close'] - prev.update(rows, bar['close'])
+            moves = np.column_stack([np.where(delta > 0, delta, 0.0), np.where(delta < 0, -delta, 0.0)])
+            gain, loss = window_mean(*roll.update(rows, moves), w).T
+            with np.errstate(invalid='ignore', divide='ignore'):
+                rs = gain / np.where(loss == 0, np.nan, loss)
+                return 100 - (100 / (1 + rs))
+        return update
+
 @register_factor("MACD")
 class MACD(FactorBase):
     @property
     def required_cols(self) -> list:
         return ['close']
 
+    @property
+    def lookback(self):
+        # EWM 记忆无限长，取权重衰减到 1e-6 以下的长度 (慢线 + 信号线)
+        return ewm_lookback(self.params.get('slow', 26)) + ewm_lookback(self.params.get('signal', 9))
+
+    @property
+    def warmup(self) -> int:
+        # 习惯上慢线走完一个周期后 MACD 就可以用了
+        return self.params.get('slow', 26) + self.params.get('signal', 9)
+
     def calculate(self, df) -> pd.Series:
         f = self.params.get('fast', 12)
         s = self.params.get('slow', 26)
@@ -466,14 +930,40 @@ class MACD(FactorBase):
             lambda x: calc_macd(x, fast=f, slow=s, signal=sig)
         )
 
+    def stream(self):
+        ema_fast = EWM(self.params.get('fast', 12))
+        ema_slow = EWM(self.params.get('slow', 26))
+        dea = EWM(self.params.get('signal', 9))
+        def update(rows, bar):
+            diff = ema_fast.update(rows, bar['close']) - ema_slow.update(rows, bar['close'])
+            return (diff - dea.update(rows, diff)) * 2
+        return update
+
 @register_factor("PVT")
 class PVT(FactorBase):
     @property
     def required_cols(self) -> list:
         return ['close', 'volume']
 
+    @property
+    def lookback(self):
+        # 累计型：依赖全部历史
+        return None
+
+    @property
+    def warmup(self) -> int:
+        return 1
+
     def calculate(self, df) -> pd.Series:
         def apply_pvt(group):
             return calc_pvt(group['close'], group['volume'])
         result = df.groupby('asset', group_keys=False).apply(apply_pvt)
-        return result
\ No newline at end of file
+        return result
+
+    def stream(self):
+        # 累计值只能靠运行状态续上：实时模式从第一根 K 线开始一直累加，不受缓冲区长度限制
+        prev, total = Lag(1), Cumsum()
+        def update(rows, bar):
+            ret = bar['close'] / prev.update(rows, bar['close']) - 1
+            return total.update(rows, ret * bar['volume'])
+        return update
\ No newline at end of file
@@ -0,0 +1,72 @@
+# 文件路径: src/factors/matrix.py
+import numpy as np
+import pandas as pd
+
+
+class FactorMatrix:
+    """
+    因子矩阵：所有因子放在一整块预分配的 float64 数组里 (行 × 因子)
+    - 列优先存储 (order='F')，每个因子是一段连续内存，逐列读写、滞后、清洗都是原地操作
+    - 不再往 DataFrame 里一列一列地插，避免 pandas 反复拷贝 / 合并 block
+    - frame() 直接包一层 DataFrame 给评估器用，不拷贝数据
+    """
+
+    def __init__(self, names, index):
+        self.names = list(names)
+        self.index = index
+        self.values = np.full((len(index), len(self.names)), np.nan, order='F')
+        self._pos = {name: i for i, name in enumerate(self.names)}
+
+    def __contains__(self, name):
+        return name in self._pos
+
+    def __len__(self):
+        return len(self.names)
+
+    def positions(self, names) -> list:
+        return [self._pos[name] for name in names]
+
+    def column(self, name) -> np.ndarray:
+        """某个因子的视图 (改它就是改矩阵本身)"""
+        return self.values[:, self._pos[name]]
+
+    def set(self, name, values):
+        """写入一个因子；Series 按 index 对齐，和 df[col] = series 语义一致"""
+        if isinstance(values, pd.Series) and not values.index.equals(self.index):
+            values = values.reindex(self.index)
+        self.values[:, self._pos[name]] = np.asarray(values, dtype=np.float64)
+
+    def shift(self, name, periods, starts):
+        """
+        原地分段滞后 (等价于 groupby('asset').shift(periods))
+        starts: 每一行所在股票分段的起始行号 (rolling.segment_starts)
+        """
+        if periods <= 0:
+            return
+        col = self.column(name)
+        col[periods:] = col[:-periods]
+        col[np.arange(len(col)) - starts < periods] = np.nan
+
+    def select(self, names) -> 'FactorMatrix':
+        """只保留部分因子 (会拷贝，只在有因子计算失败时用到)"""
+        if list(names) == self.names:
+            return self
+        out = FactorMatrix(names, self.index)
+        for name in names:
+            out.values[:, out._pos[name]] = self.column(name)
+        return out
+
+    def take(self, mask) -> 'FactorMatrix':
+        """按行筛选 (会拷贝)"""
+        out = FactorMatrix(self.names, self.index[mask])
+        out.values[:] = self.values[mask]
+        return out
+
+    def rename(self, func):
+        """原地改名，如 factor_xxx -> alpha_xxx"""
+        self.names = [func(n) for n in self.names]
+        self._pos = {name: i for i, name in enumerate(self.names)}
+
+    def frame(self) -> pd.DataFrame:
+        """零拷贝地包成 DataFrame"""
+        return pd.DataFrame(self.values, index=self.index, columns=self.names, copy=False)
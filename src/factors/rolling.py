@@ -0,0 +1,156 @@
+# 文件路径: src/factors/rolling.py
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# 分段滚动工具 (Segment-aware Rolling)
+# 整张表按 ['asset', 'date'] 排好序后，每只股票是一段连续的行
+# 用"全表累加和 + 每段起点截断"一次算完所有股票的滚动和，不用 groupby.apply
+# ==========================================
+
+def segment_starts(keys) -> np.ndarray:
+    """
+    每一行所在分段的起始行号 (keys 需已排序，相同 key 连续出现)
+    """
+    keys = pd.Series(keys).to_numpy()
+    n = len(keys)
+    is_start = np.ones(n, dtype=bool)
+    if n > 1:
+        is_start[1:] = keys[1:] != keys[:-1]
+    return np.maximum.accumulate(np.where(is_start, np.arange(n), 0))
+
+
+def rolling_sum(values, starts, window) -> np.ndarray:
+    """
+    分段滚动求和，values 可以是 1 维 (n,) 或 2 维 (n, k)，NaN 当作 0
+    每段开头不足 window 的位置返回"已有部分"的和，需配合 rolling_count 判断
+    """
+    x = np.nan_to_num(np.asarray(values, dtype=np.float64), nan=0.0, posinf=0.0, neginf=0.0)
+    cs = np.concatenate([np.zeros((1,) + x.shape[1:]), np.cumsum(x, axis=0)])
+    idx = np.arange(len(x))
+    lo = np.maximum(idx + 1 - window, starts)
+    return cs[idx + 1] - cs[lo]
+
+
+def rolling_count(values, starts, window) -> np.ndarray:
+    """
+    分段滚动窗口内的有效 (非 NaN) 个数
+    """
+    valid = np.isfinite(np.asarray(values, dtype=np.float64)).astype(np.float64)
+    return rolling_sum(valid, starts, window)
+
+
+def segment_shift(values, starts, periods=1) -> np.ndarray:
+    """
+    分段平移 (等价于 groupby('asset').shift(periods)，periods > 0)
+    """
+    x = np.asarray(values, dtype=np.float64)
+    out = np.full(len(x), np.nan)
+    idx = np.arange(len(x))
+    ok = idx - periods >= starts
+    out[ok] = x[idx[ok] - periods]
+    return out
+
+
+def segment_demean(values, starts) -> np.ndarray:
+    """
+    每段减去自己的均值 (忽略 NaN)，values 可以是 (n,) 或 (n, k)
+    滚动方差前先去掉价格 / 成交额这类大数量级，避免 Σx² - (Σx)²/n 大数相消
+    """
+    x = np.asarray(values, dtype=np.float64)
+    if not len(x):
+        return x.copy()
+    first = np.flatnonzero(starts == np.arange(len(x)))
+    ok = np.isfinite(x)
+    sums = np.add.reduceat(np.where(ok, x, 0.0), first, axis=0)
+    counts = np.add.reduceat(ok.astype(np.float64), first, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = sums / counts
+    seg = np.cumsum(starts == np.arange(len(x))) - 1
+    return x - mean[seg]
+
+
+def rolling_mean(values, starts, window) -> np.ndarray:
+    """
+    分段滚动均值，窗口内有 NaN 或不满 window 时返回 NaN (与 pandas rolling(window).mean() 一致)
+    """
+    n = rolling_count(values, starts, window)
+    s = rolling_sum(values, starts, window)
+    return np.where(n >= window, s / window, np.nan)
+
+
+def rolling_std(values, starts, window, ddof=1) -> np.ndarray:
+    """
+    分段滚动标准差：var = (Σd² - (Σd)²/n) / (n - ddof)，d 为每段去均值后的值 (segment_demean)
+    """
+    x = segment_demean(values, starts)
+    n = rolling_count(x, starts, window)
+    s = rolling_sum(x, starts, window)
+    ss = rolling_sum(x * x, starts, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        var = np.maximum(ss - s * s / window, 0) / (window - ddof)
+    return np.where(n >= window, np.sqrt(var), np.nan)
+
+
+def segment_rolling(values, starts, window, func, min_periods=None) -> np.ndarray:
+    """
+    分段滚动的通用版 (中位数 / 分位排名等不能用累加和差分的统计量)
+    每段前面垫 window - 1 行 NaN，整张表 (所有列) 只调用一次 pandas rolling，
+    窗口不会跨到上一只股票，也不用 groupby.apply
+    :param func: 'median' / 'rank' (当前值在窗口内的分位, (0, 1]) / 'mean' / 'std' 等 Rolling 方法名
+    """
+    x = np.asarray(values, dtype=np.float64)
+    squeeze = x.ndim == 1
+    padded, pos = _segment_pad(x.reshape(len(x), -1), starts, window)
+
+    roll = pd.DataFrame(padded).rolling(window, min_periods=min_periods or window)
+    out = roll.rank(pct=True) if func == 'rank' else getattr(roll, func)()
+    out = out.to_numpy()[pos]
+    return out[:, 0] if squeeze else out
+
+
+def segment_rolling_mad(values, starts, window, min_periods=None, block_size=1 << 20):
+    """
+    分段滚动中位数与 MAD：MAD_t = median_{i ∈ 窗口 t} |x_i - med_t|，两个中位数用同一个窗口
+    在补齐后的数组上取滑动窗口视图，按块 (每块约 block_size 个元素) 排序后取中间位置，内存不随窗口翻倍
+    :return: (med, mad)，形状同 values；窗口内有效值不足 min_periods 的位置为 NaN
+    """
+    x = np.asarray(values, dtype=np.float64)
+    squeeze = x.ndim == 1
+    x = x.reshape(len(x), -1)
+    med, mad = np.full(x.shape, np.nan), np.full(x.shape, np.nan)
+    if not len(x):
+        return (med[:, 0], mad[:, 0]) if squeeze else (med, mad)
+    padded, pos = _segment_pad(x, starts, window)
+    # windows[p] 是以补齐后第 p + window - 1 行结尾的窗口，形状 (列, window)
+    windows = np.lib.stride_tricks.sliding_window_view(padded, window, axis=0)
+    count = rolling_count(x, starts, window).astype(np.int64)
+    step = max(1, block_size // (window * x.shape[1]))
+    for lo in range(0, len(x), step):
+        win = windows[pos[lo:lo + step] - (window - 1)]
+        c = count[lo:lo + step]
+        m = _window_median(win, c)
+        med[lo:lo + step] = m
+        mad[lo:lo + step] = _window_median(np.abs(win - m[:, :, None]), c)
+    short = count < (min_periods or window)
+    med[short], mad[short] = np.nan, np.nan
+    return (med[:, 0], mad[:, 0]) if squeeze else (med, mad)
+
+
+def _window_median(win, count):
+    """窗口 (行, 列, window) 内有效值的中位数：排序后 NaN 在末尾，取前 count 个的中间一个 (两个的均值)"""
+    sorted_win = np.sort(win, axis=2)
+    c = np.maximum(count, 1)[:, :, None]
+    lo = np.take_along_axis(sorted_win, (c - 1) // 2, axis=2)[:, :, 0]
+    hi = np.take_along_axis(sorted_win, c // 2, axis=2)[:, :, 0]
+    return (lo + hi) / 2
+
+
+def _segment_pad(x, starts, window):
+    """每段前面垫 window - 1 行 NaN，返回 (补齐后的数组, 原始每行在其中的位置)"""
+    n = len(x)
+    seg = np.cumsum(starts == np.arange(n)) - 1
+    pos = np.arange(n) + (seg + 1) * (window - 1)
+    padded = np.full((n + (seg[-1] + 1) * (window - 1) if n else 0, x.shape[1]), np.nan)
+    padded[pos] = x
+    return padded, pos
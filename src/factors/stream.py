@@ -0,0 +1,231 @@
+# 文件路径: src/factors/stream.py
+import numpy as np
+
+# ==========================================
+# 增量计算工具 (实时模式)
+# 每只股票一份运行状态，按缓冲区行号 rows 存放；来一根 K 线只做 O(1) 的更新
+# 因子的 stream() 把这些小部件放在闭包里，组合成 update(rows, bar) -> 最新值
+# 与离线的 rolling.py 一一对应：窗口不满 / 有 NaN 时同样返回 NaN
+# ==========================================
+
+def grow_rows(arr, n, fill):
+    """按倍数扩容第 0 维 (新股票出现时)"""
+    old = arr.shape[0]
+    if n <= old:
+        return arr
+    pad = np.full((max(n, old * 2) - old,) + arr.shape[1:], fill, dtype=arr.dtype)
+    return np.concatenate([arr, pad])
+
+
+class Lag:
+    """
+    每只股票最近 k 个值的环：update 返回 k 根之前的值 (不足 k 根为 NaN)，再记下当前值
+    等价于 groupby('asset').shift(k)
+    """
+
+    def __init__(self, k=1):
+        self.k = int(k)
+        self.ring = np.full((0, self.k), np.nan)
+        self.head = np.zeros(0, dtype=np.int64)
+
+    def update(self, rows, x):
+        n = rows.max() + 1 if len(rows) else 0
+        self.ring = grow_rows(self.ring, n, np.nan)
+        self.head = grow_rows(self.head, n, 0)
+        pos = self.head[rows]
+        old = self.ring[rows, pos]
+        self.ring[rows, pos] = x
+        self.head[rows] = (pos + 1) % self.k
+        return old
+
+
+class RollingSum:
+    """
+    滚动窗口和：环里存最近 window 个值，加新减旧维护运行和与有效个数
+    x 可以是 (m,) 或 (m, k)，NaN 不计入 (同 rolling.rolling_sum / rolling_count)
+    每只股票每走 window 根用环里的值重算一次运行和，避免加减误差越积越大
+    """
+
+    def __init__(self, window, k=1):
+        self.window, self.k = int(window), int(k)
+        self.ring = np.full((0, self.window, self.k), np.nan)
+        self.sums = np.zeros((0, self.k))
+        self.counts = np.zeros((0, self.k))
+        self.steps = np.zeros(0, dtype=np.int64)
+
+    def update(self, rows, x):
+        """:return: (sums, counts)，形状 (m, k)；k == 1 时为 (m,)"""
+        n = rows.max() + 1 if len(rows) else 0
+        self.ring = grow_rows(self.ring, n, np.nan)
+        self.sums = grow_rows(self.sums, n, 0.0)
+        self.counts = grow_rows(self.counts, n, 0.0)
+        self.steps = grow_rows(self.steps, n, 0)
+
+        x = np.asarray(x, dtype=np.float64).reshape(len(rows), self.k)
+        pos = self.steps[rows] % self.window
+        old = self.ring[rows, pos]
+        new_ok, old_ok = np.isfinite(x), np.isfinite(old)
+        self.sums[rows] += np.where(new_ok, x, 0.0) - np.where(old_ok, old, 0.0)
+        self.counts[rows] += new_ok.astype(np.float64) - old_ok
+        self.ring[rows, pos] = x
+        self.steps[rows] += 1
+
+        resync = rows[self.steps[rows] % self.window == 0]
+        if len(resync):
+            ring = self.ring[resync]
+            ok = np.isfinite(ring)
+            self.sums[resync] = np.where(ok, ring, 0.0).sum(axis=1)
+            self.counts[resync] = ok.sum(axis=1)
+        if self.k == 1:
+            return self.sums[rows, 0], self.counts[rows, 0]
+        return self.sums[rows], self.counts[rows]
+
+
+class RollingMoments:
+    """
+    滚动窗口的均值与离差平方和 / 离差积和 (p 个变量，只用 p 个都有效的行，同 pandas rolling corr/cov)
+    运行和累加的是"减去锚点后"的值，锚点取上次重算时的窗口均值，
+    成交额这类大数量级的序列也不会出现 Σx² - (Σx)²/n 的大数相消
+    """
+
+    def __init__(self, window, p=1):
+        self.window, self.p = int(window), int(p)
+        self.ring = np.full((0, self.window, self.p), np.nan)
+        self.anchor = np.full((0, self.p), np.nan)
+        self.s1 = np.zeros((0, self.p))
+        self.s2 = np.zeros((0, self.p, self.p))
+        self.n = np.zeros(0)
+        self.steps = np.zeros(0, dtype=np.int64)
+
+    def update(self, rows, x):
+        """
+        :return: (n, mean, ss)，n 为窗口内有效行数 (m,)，mean (m, p)，ss (m, p, p) 离差积和
+        """
+        m = rows.max() + 1 if len(rows) else 0
+        self.ring = grow_rows(self.ring, m, np.nan)
+        self.anchor = grow_rows(self.anchor, m, np.nan)
+        self.s1 = grow_rows(self.s1, m, 0.0)
+        self.s2 = grow_rows(self.s2, m, 0.0)
+        self.n = grow_rows(self.n, m, 0.0)
+        self.steps = grow_rows(self.steps, m, 0)
+
+        x = np.asarray(x, dtype=np.float64).reshape(len(rows), self.p)
+        x = np.where(np.isfinite(x).all(axis=1, keepdims=True), x, np.nan)
+        new_ok = np.isfinite(x[:, 0])
+        # 第一次见到有效值时用它当锚点 (此前运行和都是 0)
+        fresh = np.isnan(self.anchor[rows, 0]) & new_ok
+        self.anchor[rows[fresh]] = x[fresh]
+
+        pos = self.steps[rows] % self.window
+        old = self.ring[rows, pos]
+        old_ok = np.isfinite(old[:, 0])
+        a = self.anchor[rows]
+        dn = np.where(new_ok[:, None], x - a, 0.0)
+        do = np.where(old_ok[:, None], old - a, 0.0)
+        self.s1[rows] += dn - do
+        self.s2[rows] += dn[:, :, None] * dn[:, None, :] - do[:, :, None] * do[:, None, :]
+        self.n[rows] += new_ok.astype(np.float64) - old_ok
+        self.ring[rows, pos] = x
+        self.steps[rows] += 1
+
+        resync = rows[self.steps[rows] % self.window == 0]
+        if len(resync):
+            self._resync(resync)
+
+        n = self.n[rows]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_d = self.s1[rows] / n[:, None]
+            ss = self.s2[rows] - self.s1[rows][:, :, None] * mean_d[:, None, :]
+        return n, self.anchor[rows] + mean_d, ss
+
+    def _resync(self, rows):
+        ring = self.ring[rows]
+        ok = np.isfinite(ring[:, :, 0])
+        n = ok.sum(axis=1).astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(ok[:, :, None], ring, 0.0).sum(axis=1) / n[:, None]
+        # 窗口里没有有效值时保留旧锚点
+        anchor = np.where(n[:, None] > 0, mean, self.anchor[rows])
+        d = np.where(ok[:, :, None], ring - anchor[:, None, :], 0.0)
+        self.anchor[rows] = anchor
+        self.s1[rows] = d.sum(axis=1)
+        self.s2[rows] = np.einsum('rwi,rwj->rij', d, d)
+        self.n[rows] = n
+
+
+class RollingWindow:
+    """
+    每只股票最近 window 个值，按时间从旧到新排好 (不足 window 个的位置为 NaN)
+    给没有运行和形式的统计量用 (极值 / 排序 / MAD / 偏度)：每根 K 线 O(window)，所有股票一起向量化，不经过 pandas
+    """
+
+    def __init__(self, window, k=1):
+        self.window, self.k = int(window), int(k)
+        self.ring = np.full((0, self.window, self.k), np.nan)
+        self.steps = np.zeros(0, dtype=np.int64)
+
+    def update(self, rows, x):
+        """:return: (m, window, k)；k == 1 时为 (m, window)"""
+        n = rows.max() + 1 if len(rows) else 0
+        self.ring = grow_rows(self.ring, n, np.nan)
+        self.steps = grow_rows(self.steps, n, 0)
+        x = np.asarray(x, dtype=np.float64).reshape(len(rows), self.k)
+        self.ring[rows, self.steps[rows] % self.window] = x
+        self.steps[rows] += 1
+        # 最旧的一个在下一次要写入的位置
+        order = (self.steps[rows, None] + np.arange(self.window)[None, :]) % self.window
+        out = self.ring[rows[:, None], order]
+        return out[:, :, 0] if self.k == 1 else out
+
+
+class EWM:
+    """
+    ewm(span, adjust=False).mean() 的递推：y = (1 - alpha) * y + alpha * x，第一根取 x 本身
+    """
+
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1)
+        self.y = np.full(0, np.nan)
+
+    def update(self, rows, x):
+        n = rows.max() + 1 if len(rows) else 0
+        self.y = grow_rows(self.y, n, np.nan)
+        y = self.y[rows]
+        y = np.where(np.isnan(y), x, (1 - self.alpha) * y + self.alpha * x)
+        self.y[rows] = y
+        return y
+
+
+class Cumsum:
+    """
+    累计和 (同 pandas cumsum：NaN 的位置输出 NaN，累计值跳过它继续)
+    """
+
+    def __init__(self):
+        self.total = np.zeros(0)
+
+    def update(self, rows, x):
+        n = rows.max() + 1 if len(rows) else 0
+        self.total = grow_rows(self.total, n, 0.0)
+        ok = np.isfinite(x)
+        self.total[rows] += np.where(ok, x, 0.0)
+        return np.where(ok, self.total[rows], np.nan)
+
+
+def window_mean(sums, counts, window):
+    """RollingSum 的结果 -> 窗口均值 (不满 window 个有效值为 NaN)"""
+    return np.where(counts >= window, sums / window, np.nan)
+
+
+def window_std(n, ss, window, ddof=1):
+    """RollingMoments 的单变量结果 -> 窗口标准差"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(n >= window, np.sqrt(np.maximum(ss, 0) / (n - ddof)), np.nan)
+
+
+def window_corr(n, ss, window):
+    """RollingMoments 的两变量结果 -> 窗口相关系数 (任一方差为 0 时为 NaN)"""
+    denom = ss[:, 0, 0] * ss[:, 1, 1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = ss[:, 0, 1] / np.sqrt(np.where(denom > 0, denom, np.nan))
+    return np.where(n >= window, corr, np.nan)
@@ -0,0 +1,97 @@
+# 文件路径: src/processor/backtest.py
+import pandas as pd
+import numpy as np
+
+class FactorBacktester:
+    """
+    多空组合回测：每隔 horizon 根 K 线调仓一次 (不重叠持仓)
+    做多因子值最高的一组、做空最低的一组，组内等权，多空各 1 倍资金
+    所有 alpha 列一起算，不逐个因子循环
+    """
+
+    @staticmethod
+    def build_weights(df: pd.DataFrame, factor_cols: list, n_bins=5) -> pd.DataFrame:
+        """
+        每个调仓截面上的目标权重 (行 × 因子)
+        分位 > 1 - 1/n_bins 的做多，<= 1/n_bins 的做空，不在两头的权重为 0
+        """
+        pct = df.groupby('date', sort=False)[factor_cols].rank(pct=True)
+        long = (pct > 1.0 - 1.0 / n_bins).astype(np.float64)
+        short = (pct <= 1.0 / n_bins).astype(np.float64)
+
+        # 组内等权：除以当期该组的股票数
+        by_date = df['date']
+        n_long = long.groupby(by_date, sort=False).transform('sum')
+        n_short = short.groupby(by_date, sort=False).transform('sum')
+        w = long / n_long.where(n_long > 0) - short / n_short.where(n_short > 0)
+        return w.fillna(0.0)
+
+    @staticmethod
+    def calc_turnover(rebal_idx: np.ndarray, asset_codes: np.ndarray,
+                      weights: np.ndarray, n_periods: int) -> np.ndarray:
+        """
+        每期换手 = Σ|w_t - w_{t-1}| (双边)，所有因子一次算完
+        把本期权重和"上一期权重取负"拼在一起，按 (期, 股票) 求和就是权重变化量
+        返回 (n_periods, n_factors)
+        """
+        keys = np.concatenate([rebal_idx, rebal_idx + 1])
+        assets = np.concatenate([asset_codes, asset_codes])
+        delta = pd.DataFrame(np.vstack([weights, -weights]))
+        delta = delta.groupby([keys, assets], sort=False).sum().abs()
+        turnover = delta.groupby(level=0).sum()
+        return turnover.reindex(range(n_periods), fill_value=0.0).to_numpy()
+
+    @classmethod
+    def run(cls, df: pd.DataFrame, factor_cols: list, horizon=10, n_bins=5,
+            cost_bps=3.0, bars_per_year=240 * 252):
+        """
+        回测入口
+        :param df: 至少包含 date / asset / close 和所有因子列，需按 ['asset', 'date'] 排序
+        :param cost_bps: 单边交易成本 (基点)，按换手扣除
+        :param bars_per_year: 一年有多少根 K 线，用于年化 Sharpe
+        :return: (summary, net_returns)
+                 summary: 每个因子的收益 / Sharpe / 回撤 / 换手
+                 net_returns: 每个调仓期的净收益 (调仓日 × 因子)
+        """
+        # 1. 调仓日：每隔 horizon 个时间点取一个
+        all_dates = np.sort(df['date'].unique())
+        rebal_dates = all_dates[::horizon]
+        sub = df[df['date'].isin(rebal_dates)]
+        rebal_idx = np.searchsorted(rebal_dates, sub['date'].to_numpy())
+
+        # 2. 持有期收益：到下一个调仓日的收盘价涨幅 (下一期缺失的股票按 0 处理)
+        close_next = sub.groupby('asset', sort=False)['close'].shift(-1)
+        idx_next = pd.Series(rebal_idx, index=sub.index).groupby(sub['asset'], sort=False).shift(-1)
+        hold_ret = (close_next / sub['close'] - 1).where(idx_next == rebal_idx + 1)
+        hold_ret = hold_ret.replace([np.inf, -np.inf], np.nan).fillna(0.0).to_numpy()
+
+        # 3. 权重 & 毛收益 (每期 Σ w * r)
+        w = cls.build_weights(sub, factor_cols, n_bins).to_numpy()
+        n_periods = len(rebal_dates)
+        gross = pd.DataFrame(w * hold_ret[:, None]).groupby(rebal_idx).sum()
+        gross = gross.reindex(range(n_periods), fill_value=0.0).to_numpy()
+
+        # 4. 换手 & 成本
+        asset_codes, _ = pd.factorize(sub['asset'])
+        turnover = cls.calc_turnover(rebal_idx, asset_codes, w, n_periods)
+        net = gross - turnover * cost_bps / 1e4
+
+        # 最后一个调仓日之后没有持有期，去掉
+        net = pd.DataFrame(net[:-1], index=rebal_dates[:-1], columns=factor_cols)
+        gross = pd.DataFrame(gross[:-1], index=rebal_dates[:-1], columns=factor_cols)
+        turnover = pd.DataFrame(turnover[:-1], index=rebal_dates[:-1], columns=factor_cols)
+
+        # 5. 汇总指标
+        periods_per_year = bars_per_year / horizon
+        nav = (1 + net).cumprod()
+        net_std = net.std()
+        summary = pd.DataFrame({
+            'Gross_Ret': gross.mean(),
+            'Net_Ret': net.mean(),
+            'Net_Sharpe': (net.mean() / net_std.where(net_std > 0)) * np.sqrt(periods_per_year),
+            'Max_Drawdown': (nav / nav.cummax() - 1).min(),
+            'Turnover': turnover.mean(),
+            'Net_Cum': nav.iloc[-1] - 1 if len(nav) else np.nan,
+        })
+        summary.index.name = 'Factor_Name'
+        return summary, net
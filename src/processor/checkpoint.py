@@ -0,0 +1,144 @@
+# 文件路径: src/processor/checkpoint.py
+import hashlib
+import inspect
+import json
+import os
+import re
+import pandas as pd
+
+
+def make_key(*parts) -> str:
+    """
+    把任意配置 (dict / list / 字符串...) 哈希成一个短 key
+    """
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def file_signature(path) -> dict:
+    """
+    输入文件指纹：路径 + 大小 + 修改时间 (不读内容，大文件也是瞬间完成)
+    """
+    st = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def factor_fingerprint(factor_cls) -> str:
+    """
+    因子定义指纹：因子类 (含父类) 的源码 + 它 (间接) 调用到的同模块函数源码
+    (calc_xxx、market_regression_outputs 这类辅助函数，沿调用链一直找下去)
+    改了某个因子的公式，只有这个因子的 key 会变；别的模块里的公共工具见 module_fingerprint
+    """
+    module = inspect.getmodule(factor_cls)
+    sources = []
+    for klass in factor_cls.__mro__:
+        if inspect.getmodule(klass) is module:
+            sources.append(inspect.getsource(klass))
+    seen, todo = set(), list(sources)
+    while todo:
+        for name in sorted(set(re.findall(r'\b[A-Za-z_]\w*', todo.pop())) - seen):
+            seen.add(name)
+            func = getattr(module, name, None)
+            if inspect.isfunction(func) and func.__module__ == module.__name__:
+                source = inspect.getsource(func)
+                sources.append(source)
+                todo.append(source)
+    return make_key(sources)
+
+
+def module_fingerprint(*objs) -> str:
+    """
+    代码指纹：传入的函数 / 类所在模块的完整源码 (模块里的辅助函数改了也会变)
+    用于整表阶段的 key，改了数据适配 / 体检逻辑，旧断点自动失效
+    """
+    return make_key([inspect.getsource(inspect.getmodule(obj)) for obj in objs])
+
+
+class StageCheckpoint:
+    """
+    分阶段断点：每个阶段存一个 parquet 文件 + manifest.json 里的 key
+    - 整表阶段 (如 adapt/check 之后)：key 不变就直接读回
+    - 按列阶段 (原始因子 / 清洗后因子)：每列一个 key，只有 key 对得上的列会被复用，
+      其余列由调用方重算后再一起存回去
+    """
+
+    def __init__(self, root='data/checkpoints', engine='fastparquet'):
+        self.root = root
+        self.engine = engine
+        os.makedirs(root, exist_ok=True)
+        self.manifest_path = os.path.join(root, 'manifest.json')
+        self.manifest = self._read_manifest()
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write_manifest(self):
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.manifest_path)
+
+    def _file(self, stage):
+        return os.path.join(self.root, f'{stage}.parquet')
+
+    def _write(self, stage, df):
+        # 先写临时文件再替换，写到一半崩了也不会留下坏的断点
+        tmp = self._file(stage) + '.tmp'
+        df.reset_index(drop=True).to_parquet(tmp, engine=self.engine, index=False)
+        os.replace(tmp, self._file(stage))
+
+    # ------------------------------------------------
+    # 整表阶段
+    # ------------------------------------------------
+    def load(self, stage, key):
+        entry = self.manifest.get(stage)
+        if not entry or entry.get('key') != key or not os.path.exists(self._file(stage)):
+            return None
+        print(f"   [Checkpoint] 复用 {stage} 断点")
+        return pd.read_parquet(self._file(stage), engine=self.engine)
+
+    def save(self, stage, key, df, **meta):
+        self._write(stage, df)
+        self.manifest[stage] = {'key': key, **meta}
+        self._write_manifest()
+
+    def meta(self, stage) -> dict:
+        """save 时一起记下的附加信息 (如体检报告摘要)"""
+        return self.manifest.get(stage) or {}
+
+    # ------------------------------------------------
+    # 最终输出文件：key 没变且文件没被动过就不用重写
+    # ------------------------------------------------
+    def output_current(self, stage, key, path) -> bool:
+        entry = self.manifest.get(stage) or {}
+        return (entry.get('key') == key and os.path.exists(path)
+                and entry.get('file') == file_signature(path))
+
+    def record_output(self, stage, key, path):
+        self.manifest[stage] = {'key': key, 'file': file_signature(path)}
+        self._write_manifest()
+
+    # ------------------------------------------------
+    # 按列阶段
+    # ------------------------------------------------
+    def load_columns(self, stage, col_keys: dict) -> pd.DataFrame:
+        """
+        读回 key 与 col_keys 一致的列；没有可复用的列时返回空 DataFrame
+        """
+        entry = self.manifest.get(stage) or {}
+        saved = entry.get('columns', {})
+        valid = [c for c, k in col_keys.items() if saved.get(c) == k]
+        if not valid or not os.path.exists(self._file(stage)):
+            return pd.DataFrame()
+        print(f"   [Checkpoint] 复用 {stage} 断点: {len(valid)}/{len(col_keys)} 列")
+        return pd.read_parquet(self._file(stage), engine=self.engine, columns=valid)
+
+    def save_columns(self, stage, col_keys: dict, df: pd.DataFrame):
+        cols = [c for c in col_keys if c in df.columns]
+        self._write(stage, df[cols])
+        self.manifest[stage] = {'columns': {c: col_keys[c] for c in cols}}
+        self._write_manifest()
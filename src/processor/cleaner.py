@@ -1,6 +1,17 @@
 import pandas as pd
 import numpy as np
 
+from src.factors.rolling import (segment_starts, segment_demean, segment_rolling, segment_rolling_mad,
+                                rolling_sum, rolling_count)
+
+# 时序模式的默认参数 (每只股票和自己过去 window 根 K 线比)
+TS_DEFAULTS = {
+    'ts_window': 240,        # 滚动窗口 (分钟线 240 约等于一天)
+    'ts_min_periods': None,  # 窗口内至少多少个有效值，None 表示等于 ts_window
+    'ts_scale': 'zscore',    # 标准化方式：'zscore' 滚动 z-score / 'percentile' 滚动分位 (0, 1]
+    'ts_mad_k': 3.0,         # 去极值：滚动中位数 ± k * 1.4826 * MAD
+}
+
 class FactorCleaner:
     
     @staticmethod
@@ -41,6 +52,104 @@ class FactorCleaner:
         # 结果 = 原始值 - 行业均值
         return df_group[factor_col] - sector_means
 
+    @staticmethod
+    def neutralize_regression(df: pd.DataFrame, factor_cols: list,
+                              sector_col: str = 'sector',
+                              exposure_cols: list = None,
+                              date_col: str = 'date') -> pd.DataFrame:
+        """
+        回归中性化 (批量版)：对所有日期、所有因子列一次性求逐日 OLS 残差
+        模型：factor = 行业哑变量 + size/beta 等暴露 + 残差
+        1. 行业固定效应用 (date, sector) 组内去均值消掉 (FWL 定理，等价于加哑变量)
+        2. 去均值后的暴露逐日构造正规方程 X'X b = X'Y，所有日期堆叠后批量求解
+        要求 factor_cols 中已无 NaN (由调用方先做截面填充)
+        """
+        exposure_cols = [c for c in (exposure_cols or []) if c in df.columns]
+        keys = [date_col] + ([sector_col] if sector_col in df.columns else [])
+        grp = df.groupby(keys, sort=False, dropna=False)
+
+        # A. 去掉行业(或仅日期)均值
+        Y = df[factor_cols].to_numpy(dtype=np.float64)
+        Y = Y - grp[factor_cols].transform('mean').to_numpy(dtype=np.float64)
+        if not exposure_cols:
+            return pd.DataFrame(Y, index=df.index, columns=factor_cols)
+
+        # B. 暴露：缺失用当日均值填 (去均值后贡献为 0)，再做同样的组内去均值
+        X = df[exposure_cols].replace([np.inf, -np.inf], np.nan)
+        X = X.fillna(X.groupby(df[date_col]).transform('mean')).fillna(0)
+        X = X - X.groupby([df[c] for c in keys], sort=False, dropna=False).transform('mean')
+        X = X.to_numpy(dtype=np.float64)
+
+        # C. 逐日累加 X'X (n_dates, k, k) 与 X'Y (n_dates, k, m)
+        codes, uniques = pd.factorize(df[date_col])
+        n_dates, k, m = len(uniques), X.shape[1], Y.shape[1]
+        xtx = np.empty((n_dates, k, k))
+        xty = np.empty((n_dates, k, m))
+        for i in range(k):
+            for j in range(i, k):
+                xtx[:, i, j] = xtx[:, j, i] = np.bincount(codes, weights=X[:, i] * X[:, j], minlength=n_dates)
+            for j in range(m):
+                xty[:, i, j] = np.bincount(codes, weights=X[:, i] * Y[:, j], minlength=n_dates)
+
+        # D. 批量求解 (pinv 处理暴露共线 / 截面太小的奇异情形)
+        beta = np.linalg.pinv(xtx) @ xty
+
+        # E. 残差 = Y - X @ beta[当日]，按暴露逐个减，避免生成 (n, k, m) 的大数组
+        for i in range(k):
+            Y -= X[:, [i]] * beta[codes, i, :]
+        return pd.DataFrame(Y, index=df.index, columns=factor_cols)
+
+    @staticmethod
+    def process_ts(values: np.ndarray, df: pd.DataFrame, cols=None,
+                   winsorize: bool = False,
+                   standardize: bool = False,
+                   ts_window: int = 240,
+                   ts_min_periods: int = None,
+                   ts_scale: str = 'zscore',
+                   ts_mad_k: float = 3.0) -> np.ndarray:
+        """
+        时序清洗 (原地)：每只股票的因子和它自己过去 ts_window 根 K 线比，适合股票池很小 / 单只股票的场景
+        - 去极值：滚动中位数 ± k * 1.4826 * MAD (MAD 为同一窗口内 |x_i - 窗口中位数| 的中位数)
+        - 标准化：滚动 z-score，或当前值在窗口内的分位
+        窗口包含当前这根，不用未来数据；历史不足 ts_min_periods 的位置为 NaN，缺失值不填充
+        所有列一起用分段滚动核心 (factors/rolling.py) 计算，要求 df 已按 ['asset', 'date'] 排序
+        """
+        cols = list(range(values.shape[1]) if cols is None else cols)
+        if not cols:
+            return values
+        min_periods = ts_min_periods or ts_window
+        starts = segment_starts(df['asset'])
+        x = values[:, cols]
+        x[~np.isfinite(x)] = np.nan
+
+        # A. 滚动 median / MAD 去极值
+        if winsorize:
+            med, mad = segment_rolling_mad(x, starts, ts_window, min_periods)
+            band = ts_mad_k * 1.4826 * mad
+            # 历史还不够算中位数的位置不截断 (同 pandas clip 遇到 NaN 边界的行为)
+            x = np.where(np.isnan(band), x, np.clip(x, med - band, med + band))
+
+        # B. 滚动标准化
+        if standardize:
+            if ts_scale == 'percentile':
+                x = segment_rolling(x, starts, ts_window, 'rank', min_periods)
+            elif ts_scale == 'zscore':
+                # 先减去每只股票的整体均值再累加，大数量级的因子也不会大数相消
+                d = segment_demean(x, starts)
+                n = rolling_count(d, starts, ts_window)
+                s = rolling_sum(d, starts, ts_window)
+                ss = rolling_sum(d * d, starts, ts_window)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    mean = s / n
+                    std = np.sqrt(np.maximum(ss - s * mean, 0) / (n - 1))
+                    z = np.where(std > 0, (d - mean) / std, 0.0)
+                x = np.where((n >= min_periods) & ~np.isnan(x), z, np.nan)
+            else:
+                raise ValueError(f"unknown ts_scale: {ts_scale}, choose from ('zscore', 'percentile')")
+
+        values[:, cols] = x
+        return values
+
     # ==============================================
     # 入口函数
     # ==============================================
@@ -49,9 +158,18 @@ class FactorCleaner:
                        winsorize: bool = False,     # 默认关闭
                        neutralize: bool = False,   
                        standardize: bool = False,   # 默认关闭
-                       sector_col: str = 'sector'
+                       sector_col: str = 'sector',
+                       mode: str = 'cross',
+                       **ts_params
                        ) -> pd.Series:
-        
+        """
+        :param mode: 'cross' 逐日截面清洗 (默认) / 'ts' 时序清洗，转给 process_factors (见 process_ts，不做中性化)
+        :param ts_params: 时序模式参数，见 TS_DEFAULTS
+        """
+        if mode == 'ts':
+            return cls.process_factors(df, [col_name], winsorize, neutralize, standardize,
+                                       sector_col, mode=mode, **ts_params)[col_name]
+
         # 1. 预处理：先把 inf 变成 NaN
         s = cls.clean_inf(df[col_name])
         
@@ -86,4 +204,94 @@ class FactorCleaner:
         # group_keys=False 保证索引不被打乱
         processed_s = temp_df.groupby('date', group_keys=False).apply(cross_sectional_step)
         
-        return processed_s
\ No newline at end of file
+        return processed_s
+
+    @classmethod
+    def process_factors(cls, df: pd.DataFrame, col_names: list,
+                        winsorize: bool = False,
+                        neutralize: bool = False,
+                        standardize: bool = False,
+                        sector_col: str = 'sector',
+                        exposure_cols: list = None,
+                        limits=(0.01, 0.01),
+                        **kwargs
+                        ) -> pd.DataFrame:
+        """
+        批量版 process_factor：所有因子列一起清洗，返回新的 DataFrame
+        只是把列拷贝成矩阵后调用 process_matrix，清洗逻辑只在 process_matrix 一处维护
+        :param kwargs: 其余参数 (mode / 时序参数) 见 process_matrix
+        """
+        vals = np.asfortranarray(df[col_names].to_numpy(dtype=np.float64, copy=True))
+        cls.process_matrix(vals, df, None, winsorize, neutralize, standardize,
+                           sector_col, exposure_cols, limits, **kwargs)
+        return pd.DataFrame(vals, index=df.index, columns=col_names)
+
+    @classmethod
+    def process_matrix(cls, values: np.ndarray, df: pd.DataFrame, cols=None,
+                       winsorize: bool = False,
+                       neutralize: bool = False,
+                       standardize: bool = False,
+                       sector_col: str = 'sector',
+                       exposure_cols: list = None,
+                       limits=(0.01, 0.01),
+                       mode: str = 'cross',
+                       **ts_params) -> np.ndarray:
+        """
+        清洗的唯一实现：直接在因子矩阵 (行 × 因子，见 FactorMatrix) 上原地清洗
+        步骤：填充当日均值 -> 去极值 -> 中性化 (行业 + exposure_cols 回归取残差) -> 标准化
+        :param values: float64 二维数组，会被原地修改
+        :param df: 提供 date / 行业 / 暴露列，行顺序与 values 一致
+        :param cols: 只处理这些列号 (默认全部)
+        :param mode: 'cross' 截面清洗 / 'ts' 时序清洗 (见 process_ts)
+        逐日统计量用 bincount 按日期编码一次算完，不生成逐日小 DataFrame
+        """
+        if mode == 'ts':
+            return cls.process_ts(values, df, cols, winsorize, standardize, **{**TS_DEFAULTS, **ts_params})
+
+        cols = range(values.shape[1]) if cols is None else cols
+        codes, uniques = pd.factorize(df['date'])
+        n_dates = len(uniques)
+
+        for j in cols:
+            col = values[:, j]
+            col[~np.isfinite(col)] = np.nan
+            ok = ~np.isnan(col)
+
+            # A. 用当日均值填充，整天都是 NaN 的填 0
+            s = np.bincount(codes, weights=np.where(ok, col, 0.0), minlength=n_dates)
+            n = np.bincount(codes, weights=ok, minlength=n_dates)
+            mean = np.divide(s, n, out=np.zeros(n_dates), where=n > 0)
+            col[~ok] = mean[codes[~ok]]
+
+            # B. 去极值：逐日分位数 (与 Series.quantile 同样的线性插值)
+            if winsorize:
+                by_date = pd.Series(col, copy=False).groupby(codes)
+                lower = by_date.quantile(limits[0]).to_numpy()
+                upper = by_date.quantile(1.0 - limits[1]).to_numpy()
+                np.clip(col, lower[codes], upper[codes], out=col)
+
+        # C. 中性化 (回归残差需要一次性对所有列求解，算完写回矩阵)
+        if neutralize:
+            cols = list(cols)
+            tmp = df[['date']].copy()
+            for c in [sector_col] + list(exposure_cols or []):
+                if c in df.columns:
+                    tmp[c] = df[c]
+            names = [f'_f{j}' for j in cols]
+            tmp[names] = values[:, cols]
+            values[:, cols] = cls.neutralize_regression(tmp, names, sector_col, exposure_cols).to_numpy()
+
+        # D. 标准化 (两遍法：先减均值，再算标准差，ddof=1)
+        if standardize:
+            n = np.bincount(codes, minlength=n_dates).astype(np.float64)
+            for j in cols:
+                col = values[:, j]
+                mean = np.bincount(codes, weights=col, minlength=n_dates) / np.maximum(n, 1)
+                col -= mean[codes]
+                ss = np.bincount(codes, weights=col * col, minlength=n_dates)
+                std = np.sqrt(np.divide(ss, n - 1, out=np.zeros(n_dates), where=n > 1))
+                # 标准差为 0 (或只有一只股票) 的截面全部置 0
+                inv = np.divide(1.0, std, out=np.zeros(n_dates), where=std > 0)
+                col *= inv[codes]
+
+        return values
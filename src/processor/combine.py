@@ -0,0 +1,154 @@
+# 文件路径: src/processor/combine.py
+import pandas as pd
+import numpy as np
+
+from src.processor.evaluate import FactorEvaluator
+
+
+class FactorCombiner:
+    """
+    多因子合成 (滚动样本外 walk-forward)：
+    - equal: 等权 (方向取滚动 IC 的符号)
+    - ic / icir: 按滚动 IC 均值 / ICIR 加权
+    - ridge: 截面岭回归 (截面标准化后的因子 -> 去均值的未来收益)
+    每 refit 个时间点重估一次权重，只用最近 window 次重估区间内"已经能看到"的数据：
+    第 t 个时间点的未来收益要到 t + horizon 才知道，所以它最早进入 (t + horizon) 所在区间之后的估计
+    每个区间先算一次汇总 (IC 的和 / 平方和、Gram 矩阵 X'X 和 X'y)，
+    滚动窗口 = 累加和相减 (加入新区间、减掉最老的区间)，不在每次重估时从头回归
+    """
+
+    METHODS = ('equal', 'ic', 'icir', 'ridge')
+
+    @staticmethod
+    def cross_zscore(df: pd.DataFrame, factor_cols: list) -> np.ndarray:
+        """
+        每个截面内对所有因子做 z-score，缺失记 0 (即"没有观点")
+        """
+        codes = pd.factorize(df['date'])[0]
+        x = df[factor_cols].to_numpy(dtype=np.float64)
+        valid = np.isfinite(x)
+        z = np.zeros_like(x)
+        for j in range(x.shape[1]):
+            ok = valid[:, j]
+            c, v = codes[ok], x[ok, j]
+            n = np.bincount(c, minlength=codes.max() + 1)
+            s = np.bincount(c, weights=v, minlength=len(n))
+            ss = np.bincount(c, weights=v * v, minlength=len(n))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = s / n
+                std = np.sqrt(np.maximum(ss - s * mean, 0) / (n - 1))
+                z[ok, j] = np.where(std[c] > 0, (v - mean[c]) / std[c], 0.0)
+        return z
+
+    @staticmethod
+    def _window_sum(block_sums: np.ndarray, window: int) -> np.ndarray:
+        """
+        第 b 个区间可用的汇总 = 区间 [b - window, b - 1] 的和 (用累加和差分，O(1) 滚动更新)
+        """
+        cs = np.concatenate([np.zeros((1,) + block_sums.shape[1:]), np.cumsum(block_sums, axis=0)])
+        b = np.arange(len(block_sums))
+        return cs[b] - cs[np.maximum(b - window, 0)]
+
+    @classmethod
+    def fit_weights(cls, df: pd.DataFrame, factor_cols: list, ret_col: str, ic_matrix=None,
+                    horizon=10, refit=240, window=20, ridge_lambda=1.0, methods=METHODS) -> dict:
+        """
+        滚动估计各合成方法的权重
+        :param df: 评估用数据 (含因子列和未来收益列，已 preprocess_data)
+        :param ic_matrix: calc_ic_matrix 的结果 (时间 × 因子)，不传就现算
+        :param horizon: 未来收益的期数 (决定数据多久之后才"可见")
+        :param refit: 每多少个时间点重估一次 (分钟线 240 约等于每天一次)
+        :param window: 用最近多少个重估区间的数据
+        :param ridge_lambda: 岭回归惩罚，按 Gram 矩阵对角线均值缩放，与因子量纲无关
+        :return: 方法名 -> 权重表 (区间起始时间 × 因子)，没有足够历史的区间为 NaN
+        """
+        dates = np.sort(df['date'].unique())
+        n_blocks = (len(dates) - 1) // refit + 1
+        starts = pd.Index(dates[::refit], name='date')
+        k = len(factor_cols)
+
+        def known_block(date_values):
+            # 这个时间点的收益在哪个区间变得可见
+            return (np.searchsorted(dates, date_values) + horizon) // refit
+
+        weights = {}
+        if set(methods) & {'equal', 'ic', 'icir'}:
+            if ic_matrix is None:
+                ic_matrix = FactorEvaluator.calc_ic_matrix(df, factor_cols, ret_col)
+            ic = ic_matrix[factor_cols].to_numpy(dtype=np.float64)
+            kb = known_block(ic_matrix.index.to_numpy())
+            keep = kb < n_blocks
+            ic, kb = ic[keep], kb[keep]
+
+            sums = np.zeros((n_blocks, 3, k))
+            for j in range(k):
+                ok = np.isfinite(ic[:, j])
+                sums[:, 0, j] = np.bincount(kb[ok], minlength=n_blocks)
+                sums[:, 1, j] = np.bincount(kb[ok], weights=ic[ok, j], minlength=n_blocks)
+                sums[:, 2, j] = np.bincount(kb[ok], weights=ic[ok, j] ** 2, minlength=n_blocks)
+            n, s, ss = cls._window_sum(sums, window).transpose(1, 0, 2)
+
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = np.where(n >= 2, s / n, np.nan)
+                std = np.sqrt(np.maximum(ss - s * mean, 0) / (n - 1))
+                icir = np.where(std > 0, mean / std, 0.0)
+                raw = {'equal': np.sign(mean) / k, 'ic': mean, 'icir': np.where(np.isnan(mean), np.nan, icir)}
+                for method in ('equal', 'ic', 'icir'):
+                    if method in methods:
+                        w = raw[method]
+                        # 权重绝对值之和归一到 1，不同区间的合成因子量级可比
+                        scale = np.nansum(np.abs(w), axis=1, keepdims=True)
+                        weights[method] = pd.DataFrame(np.where(scale > 0, w / scale, np.nan),
+                                                       index=starts, columns=factor_cols)
+
+        if 'ridge' in methods:
+            z = cls.cross_zscore(df, factor_cols)
+            codes = pd.factorize(df['date'])[0]
+            y = df[ret_col].to_numpy(dtype=np.float64)
+            has_y = np.isfinite(y)
+            # 收益在截面内去均值：只学"相对强弱"，不学大盘涨跌
+            with np.errstate(invalid='ignore', divide='ignore'):
+                y_mean = np.bincount(codes[has_y], weights=y[has_y], minlength=codes.max() + 1) \
+                    / np.bincount(codes[has_y], minlength=codes.max() + 1)
+            y = y - y_mean[codes]
+            kb = known_block(df['date'].to_numpy())
+            keep = (kb < n_blocks) & has_y
+            z, y, kb = z[keep], y[keep], kb[keep]
+
+            # 每个区间的 X'X 和 X'y：按区间排序后用 reduceat 分段求和
+            order = np.argsort(kb, kind='stable')
+            z, y, kb = z[order], y[order], kb[order]
+            blocks, first = np.unique(kb, return_index=True)
+            gram = np.zeros((n_blocks, k, k))
+            xty = np.zeros((n_blocks, k))
+            for i in range(k):
+                gram[blocks, i, :] = np.add.reduceat(z[:, [i]] * z, first, axis=0)
+            xty[blocks] = np.add.reduceat(z * y[:, None], first, axis=0)
+
+            gram_w = cls._window_sum(gram, window)
+            xty_w = cls._window_sum(xty, window)
+            scale = np.trace(gram_w, axis1=1, axis2=2) / k
+            fitted = scale > 0
+            penalty = ridge_lambda * scale[fitted, None, None] * np.eye(k)
+            beta = np.full((n_blocks, k), np.nan)
+            # 所有区间的正规方程一次批量求解
+            beta[fitted] = np.linalg.solve(gram_w[fitted] + penalty, xty_w[fitted][..., None])[..., 0]
+            weights['ridge'] = pd.DataFrame(beta, index=starts, columns=factor_cols)
+
+        return weights
+
+    @classmethod
+    def combine(cls, df: pd.DataFrame, factor_cols: list, weights: dict, prefix='alpha_combo_') -> pd.DataFrame:
+        """
+        用 fit_weights 的权重合成：每行 = 截面标准化后的因子 · 该行所在区间的权重
+        :return: 与 df 同 index 的合成因子表，列名 prefix + 方法名
+        """
+        z = cls.cross_zscore(df, factor_cols)
+        out = {}
+        for method, w in weights.items():
+            block = np.searchsorted(w.index.to_numpy(), df['date'].to_numpy(), side='right') - 1
+            w_rows = w.to_numpy()[np.maximum(block, 0)]
+            value = (z * np.nan_to_num(w_rows)).sum(axis=1)
+            has_weight = (block >= 0) & np.isfinite(w_rows).any(axis=1)
+            out[prefix + method] = np.where(has_weight, value, np.nan)
+        return pd.DataFrame(out, index=df.index)
@@ -2,6 +2,8 @@
 import pandas as pd
 import numpy as np
 
+from src.factors.rolling import segment_starts, rolling_mean
+
 class FactorEvaluator:
     
     @staticmethod
@@ -23,6 +25,21 @@ class FactorEvaluator:
         # 必须去掉最后 horizon 行，否则 IC 是 NaN
         return df.dropna(subset=[ret_col])
 
+    @staticmethod
+    def mask_warmup(df: pd.DataFrame, warmups: dict) -> pd.DataFrame:
+        """
+        把每只股票开头的预热期置为 NaN，不计入 IC / 分组统计
+        :param warmups: 因子列名 -> 预热 K 线数 (来自 FactorBase.warmup)
+        清洗阶段会把 NaN 填成截面均值，所以必须在评估前按位置重新剔除
+        """
+        # 浅拷贝：只有被改的列会换成新数组，其余列与原表共用内存
+        df = df.copy(deep=False)
+        pos = df.groupby('asset').cumcount().to_numpy()
+        for col, n in warmups.items():
+            if col in df.columns and n > 0:
+                df[col] = np.where(pos < n, np.nan, df[col].to_numpy())
+        return df
+
     # ------------------------------------------------
     # 1. IC & Rolling IC (相关性 & 持续性)
     # ------------------------------------------------
@@ -39,6 +56,287 @@ class FactorEvaluator:
         # include_groups=False 是新版 Pandas 的建议，不过为了兼容性先不加
         return df.groupby('date').apply(daily_ic)
 
+    @staticmethod
+    def _cross_section_codes(df: pd.DataFrame, by=None):
+        """
+        截面编码：默认每个 date 一个截面；by 给出额外的列时，每个 (date, by...) 一个截面
+        :return: (每行的截面编号 (-1 表示分组键缺失), 截面索引)
+        """
+        if not by:
+            codes, dates = pd.factorize(df['date'], sort=True)
+            return codes, pd.Index(dates, name='date')
+        grouped = df.groupby(['date'] + list(by), sort=True, observed=True)
+        # 分组键缺失的行 ngroup 为 NaN，记为 -1
+        return grouped.ngroup().fillna(-1).to_numpy(dtype=np.int64), grouped.size().index
+
+    @classmethod
+    def calc_ic_matrix(cls, df: pd.DataFrame, factor_cols: list, ret_col: str, min_count=5,
+                       by=None) -> pd.DataFrame:
+        """
+        一次算出所有因子、所有截面 (分钟) 的 Rank IC，返回 (时间 × 因子)
+        与逐个 calc_ic_series 结果一致，但不再对几十万个小截面逐个 apply：
+        1. 每个因子只保留因子和收益都不缺失的行，按截面一次性求秩 (groupby.rank 一次处理所有列)
+        2. 秩的 Pearson 相关用按截面编码的 bincount 累加 Σx、Σy、Σxy、Σx²、Σy² 得到
+        :param by: 额外的分组列 (如 ['sector'])，此时每个 (时间, 分组) 是一个截面，返回的 index 是 MultiIndex
+        """
+        codes, index = cls._cross_section_codes(df, by)
+        n_dates = len(index)
+        f = df[factor_cols].to_numpy(dtype=np.float64)
+        r = df[ret_col].to_numpy(dtype=np.float64)
+        keyed = codes >= 0
+        valid = ~np.isnan(f) & ~np.isnan(r)[:, None] & keyed[:, None]
+        codes = np.maximum(codes, 0)
+
+        # 收益的秩要在"该因子有值"的行里单独排
+        by_date = pd.Series(codes)
+        rank_f = pd.DataFrame(np.where(valid, f, np.nan)).groupby(by_date).rank().to_numpy()
+        rank_r = pd.DataFrame(np.where(valid, r[:, None], np.nan)).groupby(by_date).rank().to_numpy()
+
+        # 截面太小 (原逻辑：行数 < min_count) 的直接记 NaN
+        size = np.bincount(codes[keyed], minlength=n_dates)
+        ic = np.full((n_dates, len(factor_cols)), np.nan)
+        for j in range(len(factor_cols)):
+            ok = valid[:, j]
+            c, x, y = codes[ok], rank_f[ok, j], rank_r[ok, j]
+            n = np.bincount(c, minlength=n_dates).astype(np.float64)
+            sx = np.bincount(c, weights=x, minlength=n_dates)
+            sy = np.bincount(c, weights=y, minlength=n_dates)
+            sxy = np.bincount(c, weights=x * y, minlength=n_dates)
+            sxx = np.bincount(c, weights=x * x, minlength=n_dates)
+            syy = np.bincount(c, weights=y * y, minlength=n_dates)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                cov = sxy - sx * sy / n
+                var = (sxx - sx * sx / n) * (syy - sy * sy / n)
+                ic[:, j] = np.where((size >= min_count) & (var > 1e-12), cov / np.sqrt(var), np.nan)
+
+        return pd.DataFrame(ic, index=index, columns=factor_cols)
+
+    @classmethod
+    def calc_ls_matrix(cls, df: pd.DataFrame, factor_cols: list, ret_col: str, n_bins=5,
+                       by=None) -> pd.DataFrame:
+        """
+        每个截面的多空收益 (最高一组均值 - 最低一组均值)，所有因子一次算完，返回 (截面 × 因子)
+        分组口径同 FactorBacktester.build_weights：截面分位 > 1 - 1/n_bins 为最高组，<= 1/n_bins 为最低组
+        """
+        codes, index = cls._cross_section_codes(df, by)
+        n = len(index)
+        ok = codes >= 0
+        r = df[ret_col].to_numpy(dtype=np.float64)
+        pct = df[factor_cols][ok].groupby(codes[ok]).rank(pct=True).to_numpy()
+        r, codes = r[ok], codes[ok]
+        has_r = ~np.isnan(r)
+
+        ls = np.full((n, len(factor_cols)), np.nan)
+        for j in range(len(factor_cols)):
+            top = (pct[:, j] > 1.0 - 1.0 / n_bins) & has_r
+            bottom = (pct[:, j] <= 1.0 / n_bins) & has_r
+            with np.errstate(invalid='ignore', divide='ignore'):
+                top_ret = np.bincount(codes[top], weights=r[top], minlength=n) / np.bincount(codes[top], minlength=n)
+                bottom_ret = np.bincount(codes[bottom], weights=r[bottom], minlength=n) \
+                    / np.bincount(codes[bottom], minlength=n)
+            ls[:, j] = top_ret - bottom_ret
+        return pd.DataFrame(ls, index=index, columns=factor_cols)
+
+    @staticmethod
+    def calc_intraday_ic(ic_matrix: pd.DataFrame, sessions: dict = None) -> dict:
+        """
+        把分钟级 IC 矩阵按"交易日"和"日内时段"汇总 (只用 IC 矩阵，不再扫原始数据)
+        :param sessions: 时段名 -> (开始, 结束)，左开右闭，默认 A 股的开盘 / 盘中 / 尾盘
+        :return: dict
+                 minute_profile: 每个分钟时刻的平均 IC (日内 IC 曲线)
+                 session: 每个时段的 IC 均值 / ICIR
+                 daily_ic: 每个交易日的平均 IC
+                 daily: 日度 IC 均值 / ICIR / 胜率
+        """
+        if sessions is None:
+            sessions = {
+                'open': ('09:30', '10:00'),
+                'midday': ('10:00', '14:30'),
+                'close': ('14:30', '15:00'),
+            }
+        idx = pd.DatetimeIndex(ic_matrix.index)
+        minute_profile = ic_matrix.groupby(idx.time).mean()
+
+        # 时段：按当天的时间落在哪个区间
+        tod = pd.Series(idx - idx.normalize(), index=ic_matrix.index)
+        label = pd.Series(None, index=ic_matrix.index, dtype=object)
+        for name, (start, end) in sessions.items():
+            in_session = (tod > pd.Timedelta(start + ':00')) & (tod <= pd.Timedelta(end + ':00'))
+            label[in_session] = name
+        by_session = ic_matrix.groupby(label, sort=False)
+        session_mean, session_std = by_session.mean(), by_session.std()
+        session = pd.concat({
+            'IC_Mean': session_mean,
+            'ICIR': session_mean / session_std.where(session_std != 0),
+        }, names=['metric', 'session'])
+
+        daily_ic = ic_matrix.groupby(idx.normalize()).mean()
+        daily_ic.index.name = 'day'
+        daily_std = daily_ic.std()
+        daily = pd.DataFrame({
+            'Daily_IC_Mean': daily_ic.mean(),
+            'Daily_ICIR': daily_ic.mean() / daily_std.where(daily_std != 0),
+            'Daily_Win_Rate': (daily_ic > 0).sum() / daily_ic.notna().sum(),
+        })
+        return {'minute_profile': minute_profile, 'session': session, 'daily_ic': daily_ic, 'daily': daily}
+
+    # ------------------------------------------------
+    # 1.5 Screening (抽样初筛)
+    # ------------------------------------------------
+    @staticmethod
+    def sample_dates(dates, frac=0.1, seed=0) -> np.ndarray:
+        """
+        按交易日分层抽样截面：每个交易日各抽 frac 比例的分钟 (至少 1 个)
+        保证样本覆盖所有交易日，而不是集中在某几天
+        """
+        dates = pd.DatetimeIndex(pd.unique(np.asarray(dates))).sort_values()
+        day_codes = pd.factorize(dates.normalize())[0]
+        rng = np.random.default_rng(seed)
+        # 每个截面一个随机数，在所属交易日内排名，排名靠前的入选
+        rank = pd.Series(rng.random(len(dates))).groupby(day_codes).rank(method='first').to_numpy()
+        size = np.bincount(day_codes)
+        keep = rank <= np.maximum(np.ceil(size * frac), 1)[day_codes]
+        return dates[keep].to_numpy()
+
+    @staticmethod
+    def bootstrap_ic(ic_matrix: pd.DataFrame, n_boot=500, ci=0.95, seed=0, block_len=10) -> pd.DataFrame:
+        """
+        IC 均值 / ICIR 的 bootstrap 置信区间，所有因子、所有重抽样一次矩阵乘法算完
+        每次重抽样 = 每个截面被抽中的次数，均值和方差都是"次数矩阵 @ IC 矩阵"
+        用循环块 bootstrap (circular block)：每次抽 ceil(n / block_len) 段连续 block_len 个截面，
+        首尾相接，每个截面被抽中的概率相同。未来 horizon 根的收益互相重叠，相邻截面的 IC 不独立，
+        逐个截面 i.i.d. 重抽会低估方差、区间偏窄，所以 block_len 取不小于收益的 horizon
+        :param block_len: 块长 (行数)，1 即 i.i.d. 重抽样
+        """
+        ic = ic_matrix.to_numpy(dtype=np.float64)
+        valid = ~np.isnan(ic)
+        x = np.where(valid, ic, 0.0)
+        n_dates = len(ic)
+        rng = np.random.default_rng(seed)
+        block_len = max(min(int(block_len), n_dates), 1)
+        n_blocks = -(-n_dates // block_len)
+        starts = rng.integers(0, max(n_dates, 1), size=(n_boot, n_blocks, 1))
+        # 每次重抽样的行号 (多出来的尾巴截掉，总数正好 n_dates)，再按行号数次数
+        rows = ((starts + np.arange(block_len)) % max(n_dates, 1)).reshape(n_boot, -1)[:, :n_dates]
+        offset = np.arange(n_boot)[:, None] * n_dates
+        counts = np.bincount((rows + offset).ravel(), minlength=n_boot * n_dates) \
+            .reshape(n_boot, n_dates).astype(np.float64)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            n = counts @ valid
+            mean = (counts @ x) / n
+            var = (counts @ (x * x) - n * mean ** 2) / (n - 1)
+            icir = mean / np.sqrt(np.maximum(var, 0))
+
+        lo_q, hi_q = (1 - ci) / 2, 1 - (1 - ci) / 2
+        point_mean = np.nanmean(np.where(valid, ic, np.nan), axis=0) if n_dates else np.full(ic.shape[1], np.nan)
+        point_std = ic_matrix.std().to_numpy()
+        return pd.DataFrame({
+            'IC_Mean': point_mean,
+            'IC_Lo': np.nanquantile(mean, lo_q, axis=0),
+            'IC_Hi': np.nanquantile(mean, hi_q, axis=0),
+            'ICIR': point_mean / np.where(point_std > 0, point_std, np.nan),
+            'ICIR_Lo': np.nanquantile(icir, lo_q, axis=0),
+            'ICIR_Hi': np.nanquantile(icir, hi_q, axis=0),
+            'N_Dates': valid.sum(axis=0),
+        }, index=pd.Index(ic_matrix.columns, name='Factor_Name'))
+
+    @classmethod
+    def screen(cls, df: pd.DataFrame, factor_cols: list, ret_col: str, frac=0.1,
+               min_abs_ic=0.01, min_abs_icir=0.05, n_boot=500, ci=0.95, seed=0,
+               block_len=10) -> pd.DataFrame:
+        """
+        初筛：只在分层抽样的截面上算 IC，用 bootstrap 区间淘汰"明显没用"的因子
+        淘汰规则：|IC| 的区间上界 < min_abs_ic，或 |ICIR| 的区间上界 < min_abs_icir
+        (按绝对值判断：稳定为负的因子反着用也有效，不淘汰)
+        :param block_len: 块 bootstrap 的块长，取不小于收益的 horizon (见 bootstrap_ic)；
+                          抽样后相邻两行相隔约 1 / frac 根，按行数取 horizon 偏保守
+        :return: 每个因子的点估计 / 区间 / 是否通过 (Passed)
+        """
+        sampled = cls.sample_dates(df['date'].unique(), frac=frac, seed=seed)
+        sub = df[df['date'].isin(sampled)]
+        ic_matrix = cls.calc_ic_matrix(sub, factor_cols, ret_col)
+        result = cls.bootstrap_ic(ic_matrix, n_boot=n_boot, ci=ci, seed=seed, block_len=block_len)
+
+        def abs_upper(lo, hi):
+            # 区间 [lo, hi] 取绝对值后的上界
+            return np.maximum(np.abs(lo), np.abs(hi))
+
+        result['Passed'] = (
+            (abs_upper(result['IC_Lo'], result['IC_Hi']) >= min_abs_ic)
+            & (abs_upper(result['ICIR_Lo'], result['ICIR_Hi']) >= min_abs_icir)
+        )
+        return result
+
+    # ------------------------------------------------
+    # 1.6 Breakdown (分时段 / 分股票池)
+    # ------------------------------------------------
+    # 按时间切分的维度：名字 -> 截面时间映射到分组标签
+    TIME_KEYS = {
+        'year': lambda d: d.strftime('%Y'),
+        'month': lambda d: d.strftime('%Y-%m'),
+        'weekday': lambda d: d.day_name(),
+    }
+
+    @staticmethod
+    def liquidity_bucket(df: pd.DataFrame, col='turnover', window=240, n_bins=3) -> pd.Series:
+        """
+        流动性分组：每只股票过去 window 根 K 线的平均成交额，在每个截面内分成 n_bins 组
+        0 为流动性最差的一组；历史不足的行为 NaN (不参与分组统计)
+        """
+        liq = rolling_mean(df[col].to_numpy(dtype=np.float64), segment_starts(df['asset']), window)
+        pct = pd.Series(liq, index=df.index).groupby(df['date'], sort=False).rank(pct=True)
+        return (np.ceil(pct * n_bins).clip(lower=1) - 1).astype('Int64')
+
+    @classmethod
+    def calc_breakdown(cls, df: pd.DataFrame, factor_cols: list, ret_col: str, dims: list,
+                       ic_matrix: pd.DataFrame = None, n_bins=5) -> pd.DataFrame:
+        """
+        分维度拆解因子表现 (整齐的长表)：每个维度只做一次 groupby 聚合，所有因子、所有分组一起出
+        :param dims: 维度列表；TIME_KEYS 里的名字按截面时间切分 (用全市场的 IC)，
+                     否则视为 df 的列名 (如 'sector' / 'liquidity')，在 (时间, 该列) 的子截面里重新算 IC
+        :param ic_matrix: 已算好的全市场 IC 矩阵，时间维度直接复用
+        :return: Dimension / Bucket / Factor_Name / IC_Mean / ICIR / Win_Rate / LS_Mean / N_Periods
+        """
+        base = None
+        tables = []
+        for dim in dims:
+            if dim in cls.TIME_KEYS:
+                if base is None:
+                    ic = ic_matrix[factor_cols] if ic_matrix is not None else \
+                        cls.calc_ic_matrix(df, factor_cols, ret_col)
+                    base = (ic, cls.calc_ls_matrix(df, factor_cols, ret_col, n_bins))
+                ic, ls = base
+                label = cls.TIME_KEYS[dim](pd.DatetimeIndex(ic.index))
+            elif dim in df.columns:
+                ic = cls.calc_ic_matrix(df, factor_cols, ret_col, by=[dim])
+                ls = cls.calc_ls_matrix(df, factor_cols, ret_col, n_bins, by=[dim])
+                label = ic.index.get_level_values(dim)
+            else:
+                print(f"   ⚠️ 跳过维度 {dim}: 数据中没有这一列")
+                continue
+
+            # IC / 胜率 / 多空收益拼成一张宽表，一次 groupby 出均值、标准差、个数
+            panel = pd.concat({'IC': ic, 'Win': (ic > 0).where(ic.notna()), 'LS': ls}, axis=1)
+            grouped = panel.groupby(np.asarray(label), sort=True)
+            mean, std, count = grouped.mean(), grouped.std(), grouped.count()
+            ic_std = std['IC']
+            table = pd.DataFrame({
+                'IC_Mean': mean['IC'].stack(),
+                'ICIR': (mean['IC'] / ic_std.where(ic_std != 0)).stack(),
+                'Win_Rate': mean['Win'].stack(),
+                'LS_Mean': mean['LS'].stack(),
+                'N_Periods': count['IC'].stack(),
+            })
+            table.index.names = ['Bucket', 'Factor_Name']
+            tables.append(table.reset_index().assign(Dimension=dim))
+
+        if not tables:
+            return pd.DataFrame(columns=['Dimension', 'Bucket', 'Factor_Name', 'IC_Mean', 'ICIR',
+                                         'Win_Rate', 'LS_Mean', 'N_Periods'])
+        out = pd.concat(tables, ignore_index=True)
+        return out[['Dimension', 'Bucket', 'Factor_Name', 'IC_Mean', 'ICIR', 'Win_Rate', 'LS_Mean', 'N_Periods']]
+
     @staticmethod
     def calc_ic_metrics(ic_series: pd.Series) -> dict:
         """
@@ -66,7 +364,9 @@ class FactorEvaluator:
                 labels = list(range(n_bins))
                 # duplicates='drop' 防止因子值大量重复导致分箱失败
                 day_df['group'] = pd.qcut(day_df[factor_col], n_bins, labels=labels, duplicates='drop')
-                return day_df.groupby('group')[ret_col].mean()
+                # 统一成 0..n_bins-1 的普通索引，否则和下面的 NaN 兜底索引类型不一致，apply 拼不成表
+                group_ret = day_df.groupby('group', observed=False)[ret_col].mean()
+                return pd.Series(group_ret.to_numpy(), index=labels)
             except ValueError:
                 return pd.Series(np.nan, index=range(n_bins))
 
@@ -0,0 +1,532 @@
+# 文件路径: src/processor/live.py
+import csv
+import json
+import os
+import queue
+import socketserver
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from src.data.data_check import A_SHARE_SESSIONS
+from src.data.data_resample import agg_rules
+from src.factors.matrix import FactorMatrix
+from src.factors.stream import Lag, grow_rows
+
+# 与 adapt_format 一致：这些列出现 0 / inf 视为脏数据，沿用该股票上一根 K 线的值
+CLEAN_COLS = ['open', 'high', 'low', 'close', 'volume', 'turnover', 'amount']
+
+
+class BarRingBuffer:
+    """
+    每只股票一个定长环形缓冲区，只保留最近 capacity 根分钟 K 线
+    - 所有股票放在同一块 (股票 × capacity) 数组里，新股票出现时按倍数扩容
+    - 追加一根 K 线是 O(1) 的原地写入，不拼接 DataFrame
+    - panel() 把指定股票的缓冲区按时间顺序摊平成 ['asset', 'date'] 排好序的长表，直接喂给因子计算
+    - latest() 取指定股票最新的一根 (已补值)，喂给增量因子
+    - 丢弃的重复 / 迟到 K 线计入 late (GET /health 里的 late_bars)，不会悄悄丢掉
+    capacity 取需要尾部重算的因子 lookback 的最大值，窗口内的因子值与离线全量计算一致
+    """
+
+    def __init__(self, fields, capacity, init_assets=256):
+        self.fields = list(fields)
+        self.capacity = int(capacity)
+        self.assets = []
+        self._rows = {}
+        n = max(1, init_assets)
+        self.dates = np.zeros((n, self.capacity), dtype=np.int64)
+        self.data = {f: np.full((n, self.capacity), np.nan) for f in self.fields}
+        self.head = np.zeros(n, dtype=np.int64)   # 下一根 K 线写入的位置
+        self.count = np.zeros(n, dtype=np.int64)  # 已有 K 线数 (最多 capacity)
+        self.late = 0                             # 累计丢弃的重复 / 迟到 K 线数
+
+    def _grow(self, n):
+        old = len(self.head)
+        if n <= old:
+            return
+        new = max(n, old * 2)
+        pad = new - old
+        self.dates = np.vstack([self.dates, np.zeros((pad, self.capacity), dtype=np.int64)])
+        for f in self.fields:
+            self.data[f] = np.vstack([self.data[f], np.full((pad, self.capacity), np.nan)])
+        self.head = np.concatenate([self.head, np.zeros(pad, dtype=np.int64)])
+        self.count = np.concatenate([self.count, np.zeros(pad, dtype=np.int64)])
+
+    def rows_of(self, assets) -> np.ndarray:
+        """股票 -> 缓冲区行号，没见过的股票自动分配新行"""
+        for a in assets:
+            if a not in self._rows:
+                self._rows[a] = len(self.assets)
+                self.assets.append(a)
+        self._grow(len(self.assets))
+        return np.fromiter((self._rows[a] for a in assets), dtype=np.int64, count=len(assets))
+
+    def append(self, bars: pd.DataFrame) -> np.ndarray:
+        """
+        追加一批 K 线 (每只股票至多一根)，返回实际写入的缓冲区行号
+        - 时间不晚于该股票最后一根的 (重复 / 迟到) K 线丢弃，计入 late
+        - 0 / inf 沿用上一根的值，仍然没有收盘价的丢弃 (同 adapt_format)
+        """
+        n_in = len(bars)
+        bars = bars.drop_duplicates('asset', keep='last')
+        self.late += n_in - len(bars)
+        rows = self.rows_of(bars['asset'].tolist())
+        ts = pd.to_datetime(bars['date']).to_numpy().astype('datetime64[ns]').astype(np.int64)
+        prev = (self.head[rows] - 1) % self.capacity
+        has_prev = self.count[rows] > 0
+        fresh = ~has_prev | (ts > self.dates[rows, prev])
+        self.late += int((~fresh).sum())
+
+        values = {}
+        for f in self.fields:
+            v = bars[f].to_numpy(dtype=np.float64) if f in bars.columns else np.full(len(bars), np.nan)
+            if f in CLEAN_COLS:
+                v = np.where((v == 0) | ~np.isfinite(v), np.nan, v)
+                last = np.where(has_prev, self.data[f][rows, prev], np.nan)
+                v = np.where(np.isnan(v), last, v)
+            values[f] = v
+        if 'close' in values:
+            fresh &= np.isfinite(values['close'])
+
+        rows, pos = rows[fresh], self.head[rows][fresh]
+        self.dates[rows, pos] = ts[fresh]
+        for f in self.fields:
+            self.data[f][rows, pos] = values[f][fresh]
+        self.head[rows] = (pos + 1) % self.capacity
+        self.count[rows] = np.minimum(self.count[rows] + 1, self.capacity)
+        return rows
+
+    def latest(self, rows):
+        """
+        指定股票最新的一根 K 线
+        :return: (bar, dates)，bar 为 字段 -> ndarray，dates 为 int64 纳秒时间戳
+        """
+        pos = (self.head[rows] - 1) % self.capacity
+        return {f: self.data[f][rows, pos] for f in self.fields}, self.dates[rows, pos]
+
+    def panel(self, rows, length=None):
+        """
+        把指定股票缓冲区里最近 length 根 K 线按时间顺序摊平成长表
+        :return: (df, is_last)，is_last 标记每只股票最新的那一行
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        k = np.arange(self.capacity)
+        count = np.minimum(self.count[rows], length or self.capacity)
+        # 第 j 根 (从旧到新) 在环里的位置 = head - count + j
+        ring = (self.head[rows, None] - count[:, None] + k[None, :]) % self.capacity
+        valid = k[None, :] < count[:, None]
+        r = np.broadcast_to(rows[:, None], ring.shape)[valid]
+        c = ring[valid]
+
+        df = pd.DataFrame({
+            'date': pd.to_datetime(self.dates[r, c]),
+            'asset': np.asarray(self.assets, dtype=object)[r],
+        })
+        for f in self.fields:
+            df[f] = self.data[f][r, c]
+        is_last = (k[None, :] == count[:, None] - 1)[valid]
+        return df, is_last
+
+
+class LatencyTracker:
+    """
+    最近 maxlen 次更新的耗时 (毫秒)，按需算分位数
+    """
+
+    def __init__(self, maxlen=10000):
+        self.samples = deque(maxlen=maxlen)
+        self.total = 0
+
+    def record(self, ms):
+        self.samples.append(ms)
+        self.total += 1
+
+    def summary(self) -> dict:
+        if not self.samples:
+            return {'count': 0}
+        x = np.fromiter(self.samples, dtype=np.float64)
+        p50, p90, p99 = np.percentile(x, [50, 90, 99])
+        return {'count': self.total, 'window': len(x), 'mean_ms': x.mean(),
+                'p50_ms': p50, 'p90_ms': p90, 'p99_ms': p99, 'max_ms': x.max()}
+
+
+def _ceil(stamps, step):
+    """int64 纳秒时间戳向上取整到 step (同 DatetimeIndex.ceil)"""
+    return -(-stamps // step) * step
+
+
+def closes_bar(stamps, freq, sessions=A_SHARE_SESSIONS) -> np.ndarray:
+    """
+    每个时刻是否是它所在 freq 大 K 线的最后一分钟 (下一分钟落进了另一根大 K 线)
+    下一分钟在时段内就是 +1 分钟；上午收盘跳到下午开盘后第一分钟；全天收盘后一定是新的 K 线
+    桶的切法与 resample_bars 一致 (ceil)，全程在 int64 纳秒上算，不构造 DatetimeIndex
+    """
+    stamps = np.asarray(stamps, dtype='datetime64[ns]').astype(np.int64)
+    step, minute = pd.Timedelta(freq).value, pd.Timedelta('1min').value
+    day = stamps - stamps % pd.Timedelta('1D').value
+    tod = stamps - day
+    nxt = stamps + minute
+    sessions = list(sessions.values())
+    for (_, end), (start, _) in zip(sessions[:-1], sessions[1:]):
+        at_end = tod == pd.Timedelta(end + ':00').value
+        nxt = np.where(at_end, day + pd.Timedelta(start + ':00').value + minute, nxt)
+    day_end = tod == pd.Timedelta(sessions[-1][1] + ':00').value
+    return day_end | (_ceil(stamps, step) != _ceil(nxt, step))
+
+
+class ResampledStream:
+    """
+    大周期因子的增量版本：分钟线在状态里聚合成 freq 大 K 线 (规则同 resample_bars)，
+    大 K 线走完的那一分钟把它喂给因子自己的 stream，其余分钟沿用上一根的结果 (同 align_to_grid)
+    缺了大 K 线的最后一分钟时，等下一根大 K 线的第一分钟再把它补喂进去 (比离线晚一分钟)
+    """
+
+    def __init__(self, update, freq, sessions=A_SHARE_SESSIONS):
+        self.inner = update
+        self.freq = freq
+        self.sessions = sessions
+        self.bucket = np.zeros(0, dtype=np.int64)   # 正在聚合的桶 (ceil 后的时间)，0 表示没有
+        self.agg = {}
+        self.value = np.full(0, np.nan)
+
+    def _emit(self, rows):
+        bar = {f: v[rows] for f, v in self.agg.items()}
+        self.value[rows] = self.inner(rows, bar)
+        self.bucket[rows] = 0
+
+    def __call__(self, rows, bar):
+        n = rows.max() + 1
+        self.bucket = grow_rows(self.bucket, n, 0)
+        self.value = grow_rows(self.value, n, np.nan)
+        for f in bar:
+            if f in agg_rules:
+                self.agg[f] = grow_rows(self.agg.get(f, np.full(0, np.nan)), n, np.nan)
+
+        stamps = np.asarray(bar['date'], dtype='datetime64[ns]').astype(np.int64)
+        bucket = _ceil(stamps, pd.Timedelta(self.freq).value)
+        stale = (self.bucket[rows] != 0) & (self.bucket[rows] != bucket)
+        if stale.any():
+            self._emit(rows[stale])
+
+        new = self.bucket[rows] != bucket
+        for f, acc in self.agg.items():
+            x, a = bar[f], acc[rows]
+            rule = agg_rules[f]
+            if rule == 'first':
+                acc[rows] = np.where(new | np.isnan(a), x, a)
+            elif rule == 'last':
+                acc[rows] = np.where(np.isnan(x) & ~new, a, x)
+            elif rule == 'max':
+                acc[rows] = np.where(new, x, np.fmax(a, x))
+            elif rule == 'min':
+                acc[rows] = np.where(new, x, np.fmin(a, x))
+            else:
+                acc[rows] = np.where(new, 0.0, a) + np.nan_to_num(x)
+        self.bucket[rows] = bucket
+
+        done = closes_bar(stamps, self.freq, self.sessions)
+        if done.any():
+            self._emit(rows[done])
+        return self.value[rows]
+
+
+class LiveAlphaEngine:
+    """
+    实时因子快照：每来一个时间戳的 K 线，更新一次最新截面
+    1. 写入环形缓冲区 (0 / inf 补值同 adapt_format)
+    2. 有增量版本的因子 (FactorBase.stream)：用这根 K 线更新每只股票的运行状态，O(1)
+       (滚动和 / 个数、MACD 的 EWM、PVT 的累计值都在状态里，累计型因子不受缓冲区长度限制)
+       大周期因子套一层 ResampledStream，在状态里聚合大 K 线
+    3. 没有增量版本的因子：按 lookback 分组，在缓冲区尾部重算
+       大周期的只在大 K 线走完的那一分钟重算 (尾部最后一根没走完的大 K 线不能用)，其余分钟沿用上次的结果
+    4. 按配置滞后 shift 根 (每只股票一个小环，和离线 fm.shift 一致)
+    5. 对这个截面做 FactorCleaner 的清洗，序列化后整体替换当前快照 (读快照的线程不加锁也不会读到半成品)
+    """
+
+    def __init__(self, names, streams, jobs, clean, fields, shifts=None):
+        """
+        :param names: 输出的因子列名 (顺序即快照的列顺序)
+        :param streams: {列名: update(rows, bar) -> ndarray}，增量因子 (FactorBase.stream() 的返回值)，
+                        bar 里除了行情字段还有 'date' 
+        :param jobs: [(lookback, compute, freq), ...] 尾部重算的因子组，compute(panel_df) -> FactorMatrix；
+                     freq 为空表示分钟线因子，每次都算；否则只在 freq 大 K 线走完时算
+        :param clean: clean(df, fm) -> FactorMatrix (截面清洗，df 只含最新截面)
+        :param fields: 需要缓存的行情字段
+        :param shifts: {列名: 滞后根数}
+        缓冲区长度取尾部重算各组 lookback 的最大值
+        """
+        self.names = list(names)
+        self.streams = dict(streams)
+        self.jobs = sorted(jobs, key=lambda job: job[0])
+        self.clean = clean
+        self.buffer = BarRingBuffer(fields, max([length for length, _, _ in self.jobs], default=1))
+        self.lags = {name: Lag(k) for name, k in (shifts or {}).items() if k > 0}
+        self.cache = {}               # 大周期因子组 -> 每只股票 (缓冲区行号) 上次算出的值
+        self.latency = LatencyTracker()
+        self.compute_latency = LatencyTracker()
+        self.seq = 0
+        self.snapshot = None          # 最新截面 DataFrame (asset × alpha)
+        self.snapshot_date = None
+        self.snapshot_json = b'{}'
+
+    def _recompute(self, rows, length, compute):
+        panel, is_last = self.buffer.panel(rows, length)
+        return compute(panel).take(is_last)
+
+    def update(self, bars: pd.DataFrame, received=None):
+        """
+        处理一个时间戳的 K 线
+        :param received: 收到这批数据时的 time.perf_counter()，用于统计端到端延迟
+        """
+        t0 = time.perf_counter()
+        received = t0 if received is None else received
+        rows = self.buffer.append(bars)
+        if len(rows) == 0:
+            return None
+
+        bar, stamps = self.buffer.latest(rows)
+        dates = pd.to_datetime(stamps)
+        fm = FactorMatrix(self.names, pd.RangeIndex(len(rows)))
+        inputs = dict(bar, date=dates.to_numpy())
+        for name, update in self.streams.items():
+            fm.set(name, update(rows, inputs))
+
+        for i, (length, compute, freq) in enumerate(self.jobs):
+            if freq is None:
+                part = self._recompute(rows, length, compute)
+                fm.values[:, fm.positions(part.names)] = part.values
+                continue
+            done = closes_bar(dates, freq)
+            if done.any():
+                part = self._recompute(rows[done], length, compute)
+                names, values = self.cache.get(i, (part.names, np.full((0, len(part)), np.nan)))
+                values = grow_rows(values, rows.max() + 1, np.nan)
+                values[rows[done]] = part.values
+                self.cache[i] = (names, values)
+            if i in self.cache:
+                names, values = self.cache[i]
+                values = grow_rows(values, rows.max() + 1, np.nan)
+                self.cache[i] = (names, values)
+                fm.values[:, fm.positions(names)] = values[rows]
+
+        for name, lag in self.lags.items():
+            fm.set(name, lag.update(rows, fm.column(name).copy()))
+
+        latest = pd.DataFrame({'date': dates, 'asset': np.asarray(self.buffer.assets, dtype=object)[rows], **bar})
+        fm = self.clean(latest, fm)
+
+        snap = pd.DataFrame(fm.values, index=latest['asset'].to_numpy(), columns=fm.names)
+        date = latest['date'].max()
+        self.seq += 1
+        body = '{"seq": %d, "date": "%s", "alphas": %s}' % (
+            self.seq, date.isoformat(), snap.to_json(orient='index', double_precision=6))
+        # 三个字段一起替换，HTTP 线程读到的总是某一次完整的快照
+        self.snapshot, self.snapshot_date, self.snapshot_json = snap, date, body.encode('utf-8')
+
+        t1 = time.perf_counter()
+        self.compute_latency.record((t1 - t0) * 1000)
+        self.latency.record((t1 - received) * 1000)
+        return snap
+
+    def stats(self) -> dict:
+        return {
+            'seq': self.seq,
+            'date': None if self.snapshot_date is None else self.snapshot_date.isoformat(),
+            'assets': len(self.buffer.assets),
+            'late_bars': self.buffer.late,
+            'end_to_end': self.latency.summary(),
+            'compute': self.compute_latency.summary(),
+        }
+
+
+# ==========================================
+# 数据源：追踪一个不断追加的 CSV 文件 (tail -f)
+# ==========================================
+def tail_csv_bars(path, poll_interval=0.2, flush_after=2.0, stop=None, from_start=True):
+    """
+    生成器：持续读取一个不断被追加的 CSV 文件，每凑齐一个时间戳就产出一批 K 线
+    - 出现更晚的时间戳，说明上一个时间戳的 K 线已经到齐
+    - 超过 flush_after 秒没有新行，也把手上这批先产出 (最后一分钟不用等下一分钟)；
+      之后才到的同一时间戳的行会单独成批，被缓冲区当作迟到 K 线丢弃并计数 (BarRingBuffer.late)
+    文件需带表头，列名与 adapt_format 之后一致 (date, asset, open, ...)
+    """
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        header = next(csv.reader([f.readline()]))
+        if not from_start:
+            f.seek(0, os.SEEK_END)
+        pending, current, partial = [], None, ''
+        last_read = time.monotonic()
+
+        def flush():
+            df = pd.DataFrame(pending, columns=header)
+            df['date'] = pd.to_datetime(df['date'])
+            for c in df.columns:
+                if c not in ('date', 'asset'):
+                    df[c] = pd.to_numeric(df[c], errors='coerce')
+            return df
+
+        while stop is None or not stop.is_set():
+            line = f.readline()
+            if not line or not line.endswith('\n'):
+                # 写到一半的行先攒着，等换行符到了再解析
+                partial += line
+                if pending and time.monotonic() - last_read > flush_after:
+                    yield flush()
+                    pending, current = [], None
+                time.sleep(poll_interval)
+                continue
+            line, partial = partial + line, ''
+            last_read = time.monotonic()
+            row = next(csv.reader([line]))
+            if len(row) != len(header):
+                continue
+            ts = row[header.index('date')]
+            if current is not None and ts != current and pending:
+                yield flush()
+                pending = []
+            current = ts
+            pending.append(row)
+        if pending:
+            yield flush()
+
+
+# ==========================================
+# 服务：后台线程处理行情，HTTP (TCP 或 Unix socket) 提供快照
+# ==========================================
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+
+        def address_string(self):
+            # Unix socket 没有客户端地址
+            return str(self.client_address or 'unix')
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, code, body, content_type='application/json'):
+            self.send_response(code)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, code, obj):
+            self._send(code, json.dumps(obj, default=float).encode('utf-8'))
+
+        def do_GET(self):
+            path = self.path.split('?')[0].rstrip('/')
+            if path == '/snapshot':
+                self._send(200, service.engine.snapshot_json)
+            elif path == '/latency':
+                self._send_json(200, service.engine.stats())
+            elif path == '/health':
+                self._send_json(200, {'ok': True, 'queued': service.q.qsize(), 'errors': len(service.errors),
+                                      'late_bars': service.engine.buffer.late})
+            else:
+                self._send_json(404, {'error': f'unknown path {self.path}'})
+
+        def do_POST(self):
+            if self.path.split('?')[0].rstrip('/') != '/bars':
+                self._send_json(404, {'error': f'unknown path {self.path}'})
+                return
+            received = time.perf_counter()
+            try:
+                raw = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                bars = pd.DataFrame(json.loads(raw))
+                bars['date'] = pd.to_datetime(bars['date'])
+            except Exception as e:
+                self._send_json(400, {'error': str(e)})
+                return
+            if service.submit(bars, received, block=False):
+                self._send_json(202, {'accepted': len(bars)})
+            else:
+                self._send_json(503, {'error': 'queue full'})
+
+    return Handler
+
+
+class LiveAlphaService:
+    """
+    实时因子服务
+    - 行情可以由 feed() 从数据源 (如 tail_csv_bars) 推入，也可以由客户端 POST /bars 推入
+    - 计算在单独的线程里串行进行，快照通过本机 HTTP 提供：
+        GET /snapshot  最新截面的 alpha (JSON)
+        GET /latency   更新延迟分位数 (p50/p90/p99)
+        GET /health
+        POST /bars     一个时间戳的 K 线，JSON 数组 [{"date":..., "asset":..., "close":...}, ...]
+    - 传 unix_path 时监听 Unix socket，否则监听 host:port
+    """
+
+    def __init__(self, engine, host='127.0.0.1', port=8765, unix_path=None, queue_size=64):
+        self.engine = engine
+        self.q = queue.Queue(maxsize=queue_size)
+        self.errors = []
+        self._stop = threading.Event()
+        handler = _make_handler(self)
+        if unix_path:
+            if os.path.exists(unix_path):
+                os.remove(unix_path)
+            self.server = _UnixHTTPServer(unix_path, handler)
+            self.address = unix_path
+        else:
+            self.server = ThreadingHTTPServer((host, port), handler)
+            self.server.daemon_threads = True
+            self.address = f'http://{host}:{self.server.server_address[1]}'
+        self.unix_path = unix_path
+        self._threads = []
+
+    def submit(self, bars, received=None, block=True) -> bool:
+        received = time.perf_counter() if received is None else received
+        while not self._stop.is_set():
+            try:
+                self.q.put((received, bars), block=block, timeout=0.1 if block else None)
+                return True
+            except queue.Full:
+                if not block:
+                    return False
+        return False
+
+    def _worker(self):
+        while not self._stop.is_set():
+            try:
+                received, bars = self.q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            try:
+                # 一批里混了多个时间戳时，按时间顺序逐个截面处理
+                for _, batch in bars.groupby('date', sort=True):
+                    self.engine.update(batch, received)
+            except Exception as e:
+                self.errors.append(e)
+                print(f"   ❌ [Live] 更新失败: {e}")
+
+    def start(self):
+        for target in (self._worker, self.server.serve_forever):
+            t = threading.Thread(target=target, daemon=True)
+            t.start()
+            self._threads.append(t)
+        print(f"   [Live] 服务已启动: {self.address}")
+        return self
+
+    def feed(self, source):
+        """把数据源里的每一批 K 线推进计算队列 (阻塞，直到数据源结束或服务停止)"""
+        for bars in source:
+            if not self.submit(bars):
+                break
+
+    def stop(self):
+        self._stop.set()
+        self.server.shutdown()
+        self.server.server_close()
+        if self.unix_path and os.path.exists(self.unix_path):
+            os.remove(self.unix_path)
+        for t in self._threads:
+            t.join(timeout=1)
@@ -0,0 +1,125 @@
+# 文件路径: src/processor/pipeline.py
+import queue
+import threading
+import time
+
+# 队列结束标记
+_DONE = object()
+
+
+class PipelineRunner:
+    """
+    三段流水线：读取 -> 计算 -> 写出
+    - 读取和写出各跑一个后台线程，计算在主线程
+    - 段与段之间用有界队列连接 (queue_size 控制最多缓存几块)，防止内存被撑爆
+    计算第 N 块时，第 N+1 块在后台解码，第 N-1 块在后台写盘
+    总耗时趋近于最慢那一段，而不是三段之和
+    """
+
+    def __init__(self, source, compute, sink, queue_size=2):
+        """
+        :param source: 可迭代对象，每次产出一块原始数据 (读取在迭代时发生)
+        :param compute: compute(chunk) -> 结果，返回 None 表示这块没有输出
+        :param sink: sink(result)，负责写出
+        """
+        self.source = source
+        self.compute = compute
+        self.sink = sink
+        self.q_in = queue.Queue(maxsize=queue_size)
+        self.q_out = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._errors = []
+        self.timings = {'load': 0.0, 'compute': 0.0, 'write': 0.0}
+
+    def _put(self, q, item):
+        # 带超时的 put：下游出错退出后，上游不会永远卡在满队列上
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        # 带超时的 get：上游出错时返回结束标记，而不是一直等
+        while True:
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return _DONE
+
+    def _load_worker(self):
+        try:
+            it = iter(self.source)
+            while not self._stop.is_set():
+                t0 = time.perf_counter()
+                try:
+                    chunk = next(it)
+                except StopIteration:
+                    break
+                self.timings['load'] += time.perf_counter() - t0
+                if not self._put(self.q_in, chunk):
+                    return
+        except Exception as e:
+            self._errors.append(e)
+            self._stop.set()
+        finally:
+            self._put(self.q_in, _DONE)
+
+    def _write_worker(self):
+        try:
+            while True:
+                item = self.q_out.get()
+                if item is _DONE:
+                    return
+                t0 = time.perf_counter()
+                self.sink(item)
+                self.timings['write'] += time.perf_counter() - t0
+        except Exception as e:
+            self._errors.append(e)
+            self._stop.set()
+
+    def run(self):
+        loader = threading.Thread(target=self._load_worker, name='pipeline-load', daemon=True)
+        writer = threading.Thread(target=self._write_worker, name='pipeline-write', daemon=True)
+        loader.start()
+        writer.start()
+
+        t_start = time.perf_counter()
+        n_chunks = 0
+        try:
+            while not self._stop.is_set():
+                chunk = self._get(self.q_in)
+                if chunk is _DONE:
+                    break
+                t0 = time.perf_counter()
+                result = self.compute(chunk)
+                self.timings['compute'] += time.perf_counter() - t0
+                n_chunks += 1
+                if result is not None and not self._put(self.q_out, result):
+                    break
+        except Exception:
+            self._stop.set()
+            raise
+        finally:
+            # 写线程一定要收到结束标记，保证已算完的块都落盘
+            while writer.is_alive():
+                try:
+                    self.q_out.put(_DONE, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            writer.join()
+            self._stop.set()
+            loader.join()
+
+        if self._errors:
+            raise self._errors[0]
+
+        wall = time.perf_counter() - t_start
+        print(f"   [Pipeline] {n_chunks} 块 | 总耗时 {wall:.1f}s | "
+              f"读取 {self.timings['load']:.1f}s / 计算 {self.timings['compute']:.1f}s / "
+              f"写出 {self.timings['write']:.1f}s")
+        return n_chunks
@@ -0,0 +1,43 @@
+# 文件路径: tests/conftest.py
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 与 main 一样把项目根目录加入搜索路径，测试里统一用 from src.xxx import ...
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+# A 股分钟线时刻 (09:31 ~ 11:30、13:01 ~ 15:00，每天 240 根)
+SESSION_MINUTES = list(pd.date_range('09:31', '11:30', freq='1min').time) + \
+                  list(pd.date_range('13:01', '15:00', freq='1min').time)
+
+
+def make_bars(n_assets=8, n_days=3, seed=0, sector=True):
+    """
+    合成分钟 K 线：每只股票一段几何随机游走，已按 ['asset', 'date'] 排序
+    """
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range('2025-01-02', periods=n_days)
+    ts = pd.DatetimeIndex([pd.Timestamp.combine(d, t) for d in days for t in SESSION_MINUTES])
+    out = []
+    for a in range(n_assets):
+        close = 10 * np.exp(np.cumsum(rng.normal(0, 0.001, len(ts))))
+        open_ = close * (1 + rng.normal(0, 0.0005, len(ts)))
+        high = np.maximum(close, open_) * (1 + np.abs(rng.normal(0, 0.0005, len(ts))))
+        low = np.minimum(close, open_) * (1 - np.abs(rng.normal(0, 0.0005, len(ts))))
+        volume = rng.integers(100, 10000, len(ts)).astype(np.float64)
+        bars = pd.DataFrame({'date': ts, 'asset': f'{a:06d}', 'open': open_, 'high': high, 'low': low,
+                             'close': close, 'volume': volume, 'turnover': volume * close})
+        if sector:
+            bars['sector'] = f'S{a % 3}'
+        out.append(bars)
+    return pd.concat(out, ignore_index=True)
+
+
+@pytest.fixture
+def bars():
+    return make_bars()
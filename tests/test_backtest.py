@@ -0,0 +1,57 @@
+# 文件路径: tests/test_backtest.py
+import numpy as np
+import pandas as pd
+
+from conftest import make_bars
+from src.processor.backtest import FactorBacktester
+
+
+def _qcut_weights(sub, col, n_bins):
+    """逐个截面 qcut 分组：最高一组等权做多、最低一组等权做空 (因子缺失的不参与)"""
+    rows = {}
+    for date, g in sub.groupby('date'):
+        v = g.set_index('asset')[col].dropna()
+        w = pd.Series(0.0, index=g['asset'])
+        if len(v) >= n_bins:
+            bucket = pd.qcut(v.rank(method='first'), n_bins, labels=False)
+            w[bucket.index[bucket == n_bins - 1]] = 1.0 / (bucket == n_bins - 1).sum()
+            w[bucket.index[bucket == 0]] = -1.0 / (bucket == 0).sum()
+        rows[date] = w
+    return pd.DataFrame(rows).T.fillna(0.0)
+
+
+def _reference(df, col, horizon, n_bins, cost_bps):
+    """逐期循环的朴素实现：权重透视成 (调仓日 × 股票) 再逐期相减"""
+    dates = np.sort(df['date'].unique())[::horizon]
+    sub = df[df['date'].isin(dates)]
+    W = _qcut_weights(sub, col, n_bins)
+    C = sub.pivot(index='date', columns='asset', values='close')
+    R = (C.shift(-1) / C - 1).fillna(0.0)
+    gross = (W * R).sum(axis=1)
+    turnover = W.diff().abs().sum(axis=1)
+    turnover.iloc[0] = W.iloc[0].abs().sum()
+    net = gross - turnover * cost_bps / 1e4
+    return gross.iloc[:-1], turnover.iloc[:-1], net.iloc[:-1]
+
+
+def test_backtest_matches_pivot_reference():
+    df = make_bars(n_assets=20, n_days=2)
+    rng = np.random.default_rng(1)
+    df['alpha_a'] = rng.normal(size=len(df))
+    df['alpha_b'] = df.groupby('asset')['close'].pct_change(5)
+    summary, net = FactorBacktester.run(df, ['alpha_a', 'alpha_b'], horizon=10, n_bins=5, cost_bps=3.0)
+    for col in ['alpha_a', 'alpha_b']:
+        gross, turnover, ref_net = _reference(df, col, 10, 5, 3.0)
+        np.testing.assert_allclose(net[col].to_numpy(), ref_net.to_numpy(), atol=1e-12)
+        np.testing.assert_allclose(summary.loc[col, 'Turnover'], turnover.mean())
+        np.testing.assert_allclose(summary.loc[col, 'Gross_Ret'], gross.mean())
+
+
+def test_constant_factor_only_trades_once():
+    # 因子排序不变：只在第一期建仓 (多空各 1 倍，换手 2)，之后换手为 0
+    df = make_bars(n_assets=10, n_days=1)
+    df['alpha_c'] = df['asset'].astype(int).astype(float)
+    _, net = FactorBacktester.run(df, ['alpha_c'], horizon=10, n_bins=5, cost_bps=10.0)
+    gross, turnover, _ = _reference(df, 'alpha_c', 10, 5, 10.0)
+    np.testing.assert_allclose(turnover.to_numpy(), np.r_[2.0, np.zeros(len(turnover) - 1)])
+    np.testing.assert_allclose(net['alpha_c'].iloc[0], gross.iloc[0] - 2.0 * 10.0 / 1e4)
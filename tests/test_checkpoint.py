@@ -0,0 +1,137 @@
+# 文件路径: tests/test_checkpoint.py
+import importlib
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_bars
+from src.processor.checkpoint import StageCheckpoint, make_key, factor_fingerprint, module_fingerprint
+from src.factor_mining_main import FactorMining_main as M
+
+
+def test_make_key_is_stable_and_order_insensitive():
+    assert make_key({'a': 1, 'b': [1, 2]}) == make_key({'b': [1, 2], 'a': 1})
+    assert make_key({'a': 1}) != make_key({'a': 2})
+
+
+def test_stage_roundtrip_and_invalidation(tmp_path):
+    df = pd.DataFrame({'x': np.arange(5.0)})
+    ckpt = StageCheckpoint(str(tmp_path))
+    ckpt.save('adapted', 'k1', df, quality={'rows': 5})
+    # manifest 落盘，新实例也能读到
+    ckpt = StageCheckpoint(str(tmp_path))
+    pd.testing.assert_frame_equal(ckpt.load('adapted', 'k1'), df)
+    assert ckpt.meta('adapted')['quality'] == {'rows': 5}
+    assert ckpt.load('adapted', 'k2') is None
+
+
+def test_column_stage_reuses_only_matching_keys(tmp_path):
+    ckpt = StageCheckpoint(str(tmp_path))
+    df = pd.DataFrame({'a': [1.0, 2.0], 'b': [3.0, 4.0]})
+    ckpt.save_columns('factors', {'a': 'ka', 'b': 'kb'}, df)
+    cached = ckpt.load_columns('factors', {'a': 'ka', 'b': 'kb-new', 'c': 'kc'})
+    assert list(cached.columns) == ['a']
+    assert ckpt.load_columns('factors', {'b': 'kb-new'}).empty
+
+
+def test_module_fingerprint_tracks_helper_changes(tmp_path, monkeypatch):
+    mod_file = tmp_path / 'fp_mod.py'
+    mod_file.write_text("def helper(x):\n    return x\n\ndef entry(x):\n    return helper(x)\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    mod = importlib.import_module('fp_mod')
+    before = module_fingerprint(mod.entry)
+    # 只改辅助函数，入口函数不变
+    mod_file.write_text("def helper(x):\n    return x + 1\n\ndef entry(x):\n    return helper(x)\n")
+    assert module_fingerprint(importlib.reload(mod).entry) != before
+    sys.modules.pop('fp_mod', None)
+
+
+def test_output_current_detects_edited_file(tmp_path):
+    ckpt = StageCheckpoint(str(tmp_path / 'ckpt'))
+    out = tmp_path / 'alpha.csv'
+    out.write_text('a\n1\n')
+    assert not ckpt.output_current('output', 'k', str(out))
+    ckpt.record_output('output', 'k', str(out))
+    assert ckpt.output_current('output', 'k', str(out))
+    assert not ckpt.output_current('output', 'k2', str(out))
+    out.write_text('a\n1\n2\n')
+    assert not ckpt.output_current('output', 'k', str(out))
+
+
+@pytest.fixture
+def data_env(tmp_path, monkeypatch):
+    """main 的 load_data 指向临时目录里的一份小数据 (缺几根 K 线，会生成体检明细)"""
+    df = make_bars(n_assets=3, n_days=2, sector=False).drop(index=[10, 11, 12])
+    path = tmp_path / 'raw.pq'
+    df.to_parquet(path, engine='fastparquet')
+    (tmp_path / 'data').mkdir()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(M, 'DATA_PATH', str(path))
+    monkeypatch.setattr(M, 'DEBUG_ROWS', None)
+    return StageCheckpoint(str(tmp_path / 'ckpt'))
+
+
+def test_load_data_restores_quality_report_from_checkpoint(data_env, capsys):
+    df1, key1 = M.load_data(data_env)
+    quality_csv = 'data/data_quality.csv'
+    first = pd.read_csv(quality_csv)
+    assert first['missing'].sum() == 3
+    os.remove(quality_csv)
+    capsys.readouterr()
+
+    # 命中断点时不再适配，但体检摘要和明细照样输出
+    df2, key2 = M.load_data(StageCheckpoint(data_env.root))
+    out = capsys.readouterr().out
+    assert 'adapt_format' not in out and '缺失 K 线 3' in out
+    assert key2 == key1
+    pd.testing.assert_frame_equal(df2, df1)
+    pd.testing.assert_frame_equal(pd.read_csv(quality_csv), first)
+
+
+def test_load_data_key_changes_with_adapter_code(data_env, monkeypatch):
+    _, key1 = M.load_data(data_env)
+    monkeypatch.setattr(M, 'module_fingerprint', lambda *objs: 'edited-adapter')
+    _, key2 = M.load_data(data_env)
+    assert key1 != key2
+    # 网格对齐打开后 key 也要变
+    monkeypatch.setitem(M.GRID_CONFIG, 'enabled', True)
+    _, key3 = M.load_data(data_env)
+    assert key3 not in (key1, key2)
+
+
+def test_factor_fingerprint_follows_helper_calls(tmp_path, monkeypatch):
+    mod_file = tmp_path / 'fp_factors.py'
+    src = ("def inner(x):\n    return x * {k}\n\n"
+           "def helper(x):\n    return inner(x)\n\n"
+           "def unrelated(x):\n    return x\n\n"
+           "class Base:\n    pass\n\n"
+           "class Alpha(Base):\n    def calculate(self, x):\n        return helper(x)\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    def fingerprint(text):
+        mod_file.write_text(text)
+        sys.modules.pop('fp_factors', None)
+        return factor_fingerprint(importlib.import_module('fp_factors').Alpha)
+
+    before = fingerprint(src.format(k=1))
+    # 间接调用的辅助函数改了，指纹要变；没调用到的函数改了，指纹不变
+    assert fingerprint(src.format(k=2)) != before
+    assert fingerprint(src.format(k=1).replace('return x\n', 'return -x\n')) == before
+    sys.modules.pop('fp_factors', None)
+
+
+def test_cached_keys_track_shared_code(data_env, monkeypatch):
+    df, data_key = M.load_data(data_env)
+    config = [{"name": "RSI", "params": {"window": 14}, "shift": 1}]
+    fm, factor_keys = M.compute_factors_cached(df, config, data_env, data_key)
+    _, alpha_keys = M.clean_factors_cached(df, fm, data_env, factor_keys)
+
+    # 滚动核心 / 清洗等公共模块改了 (module_fingerprint 变了)，因子列和 alpha 列都要重算
+    monkeypatch.setattr(M, 'module_fingerprint', lambda *objs: 'edited-shared-code')
+    fm2, factor_keys2 = M.compute_factors_cached(df, config, data_env, data_key)
+    assert set(factor_keys.values()).isdisjoint(factor_keys2.values())
+    _, alpha_keys2 = M.clean_factors_cached(df, fm2, data_env, factor_keys)
+    assert set(alpha_keys.values()).isdisjoint(alpha_keys2.values())
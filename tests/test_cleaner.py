@@ -0,0 +1,180 @@
+# 文件路径: tests/test_cleaner.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.factors.rolling import segment_starts, segment_rolling_mad
+from src.processor.cleaner import FactorCleaner
+
+
+def _cross_section(n_dates=6, n_assets=40, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'date': np.repeat(pd.date_range('2025-01-02 09:31', periods=n_dates, freq='1min'), n_assets),
+        'sector': np.tile(np.arange(n_assets) % 4, n_dates).astype(str),
+        'size': rng.normal(size=n_dates * n_assets),
+        'beta': rng.normal(size=n_dates * n_assets),
+    })
+    df['f1'] = 2 * df['size'] - df['beta'] + rng.normal(size=len(df))
+    df['f2'] = rng.normal(size=len(df))
+    return df
+
+
+def test_neutralize_regression_matches_per_date_lstsq():
+    df = _cross_section()
+    out = FactorCleaner.neutralize_regression(df, ['f1', 'f2'], 'sector', ['size', 'beta'])
+    for _, g in df.groupby('date'):
+        # 行业哑变量 (满秩，不含截距) + 暴露
+        X = np.column_stack([pd.get_dummies(g['sector']).to_numpy(dtype=float), g[['size', 'beta']]])
+        for col in ['f1', 'f2']:
+            y = g[col].to_numpy()
+            beta = np.linalg.lstsq(X, y, rcond=None)[0]
+            np.testing.assert_allclose(out.loc[g.index, col], y - X @ beta, atol=1e-10)
+
+
+def test_neutralize_regression_without_exposures_is_sector_demean():
+    df = _cross_section()
+    out = FactorCleaner.neutralize_regression(df, ['f1'], 'sector')
+    expected = df['f1'] - df.groupby(['date', 'sector'])['f1'].transform('mean')
+    np.testing.assert_allclose(out['f1'], expected, atol=1e-12)
+
+
+def test_neutralize_regression_singular_exposure():
+    # 暴露完全共线时 pinv 仍给出最小范数解，残差与只用一个暴露相同
+    df = _cross_section()
+    df['size2'] = 3 * df['size']
+    out = FactorCleaner.neutralize_regression(df, ['f1'], 'sector', ['size', 'size2'])
+    ref = FactorCleaner.neutralize_regression(df, ['f1'], 'sector', ['size'])
+    np.testing.assert_allclose(out['f1'], ref['f1'], atol=1e-9)
+
+
+def _with_gaps(seed=1):
+    df = _cross_section(seed=seed)
+    rng = np.random.default_rng(seed)
+    df.loc[rng.choice(len(df), 15, replace=False), 'f1'] = np.nan
+    df.loc[rng.choice(len(df), 3, replace=False), 'f2'] = np.inf
+    return df
+
+
+def test_process_factors_matches_per_date_reference():
+    # process_factor 是逐日 apply 的原始实现，作为参考 (无暴露时回归中性化 = 行业去均值)
+    df = _with_gaps()
+    flags = dict(winsorize=True, neutralize=True, standardize=True, sector_col='sector')
+    out = FactorCleaner.process_factors(df, ['f1', 'f2'], **flags)
+    for col in ['f1', 'f2']:
+        ref = FactorCleaner.process_factor(df, col, **flags)
+        np.testing.assert_allclose(out[col].to_numpy(), ref.sort_index().to_numpy(), atol=1e-12)
+
+
+def test_process_matrix_is_in_place_and_respects_cols():
+    df = _with_gaps()
+    values = np.asfortranarray(df[['f1', 'f2']].to_numpy(dtype=np.float64))
+    untouched = values[:, 1].copy()
+    out = FactorCleaner.process_matrix(values, df, cols=[0], standardize=True)
+    assert out is values
+    np.testing.assert_array_equal(values[:, 1], untouched)
+    ref = FactorCleaner.process_factors(df, ['f1'], standardize=True)['f1']
+    np.testing.assert_allclose(values[:, 0], ref.to_numpy(), atol=1e-12)
+    # 标准化后每个截面均值 0、标准差 1
+    by_date = pd.Series(values[:, 0]).groupby(df['date'].to_numpy())
+    np.testing.assert_allclose(by_date.mean(), 0, atol=1e-12)
+    np.testing.assert_allclose(by_date.std(), 1, atol=1e-12)
+
+
+def test_process_factors_with_exposures_uses_regression():
+    df = _cross_section()
+    out = FactorCleaner.process_factors(df, ['f1'], neutralize=True, exposure_cols=['size', 'beta'])
+    ref = FactorCleaner.neutralize_regression(df, ['f1'], 'sector', ['size', 'beta'])
+    np.testing.assert_allclose(out['f1'], ref['f1'], atol=1e-12)
+
+
+def _ts_panel(level=0.0, n_assets=3, n_bars=80, seed=2):
+    """按 ['asset', 'date'] 排好序的时序面板，f1 叠加在 level 上 (带缺失)"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'asset': np.repeat([f'A{i}' for i in range(n_assets)], n_bars),
+        'date': np.tile(pd.date_range('2025-01-02 09:31', periods=n_bars, freq='1min'), n_assets),
+    })
+    df['f1'] = level + rng.normal(size=len(df))
+    df['f2'] = rng.standard_t(3, size=len(df))
+    df.loc[rng.choice(len(df), 10, replace=False), 'f1'] = np.nan
+    return df
+
+
+def _per_asset(df, col, func):
+    return df.groupby('asset', group_keys=False)[col].apply(func).to_numpy()
+
+
+def test_ts_zscore_is_stable_at_large_levels():
+    # 1e7 的水平上叠加 O(1) 的波动：Σx² - (Σx)²/n 会把方差消成噪声
+    df = _ts_panel(level=1e7)
+    out = FactorCleaner.process_factors(df, ['f1'], standardize=True, mode='ts', ts_window=20)
+    roll = lambda s: (s - s.rolling(20).mean()) / s.rolling(20).std()
+    # 参考值也要先减去水平，否则 pandas 自己的误差更大
+    expected = _per_asset(df.assign(f1=df['f1'] - 1e7), 'f1', roll)
+    np.testing.assert_allclose(out['f1'].to_numpy(), expected, atol=1e-6, equal_nan=True)
+
+
+def _window_mad(s, w, min_periods):
+    """逐个窗口直接算：med = 窗口中位数，MAD = 同一窗口内 |x_i - med| 的中位数"""
+    med, mad = np.full(len(s), np.nan), np.full(len(s), np.nan)
+    for t in range(len(s)):
+        win = s[max(0, t - w + 1):t + 1]
+        win = win[~np.isnan(win)]
+        if len(win) >= min_periods:
+            med[t] = np.median(win)
+            mad[t] = np.median(np.abs(win - med[t]))
+    return med, mad
+
+
+def test_segment_rolling_mad_matches_per_window():
+    df = _ts_panel()
+    x = df[['f1', 'f2']].to_numpy()
+    starts = segment_starts(df['asset'])
+    # block_size 很小，逐块计算的拼接也覆盖到
+    med, mad = segment_rolling_mad(x, starts, 15, min_periods=10, block_size=100)
+    for j in range(2):
+        for _, idx in df.groupby('asset').indices.items():
+            ref_med, ref_mad = _window_mad(x[idx, j], 15, 10)
+            np.testing.assert_allclose(med[idx, j], ref_med, atol=1e-12, equal_nan=True)
+            np.testing.assert_allclose(mad[idx, j], ref_mad, atol=1e-12, equal_nan=True)
+
+
+def test_ts_percentile_and_mad_clip_match_reference():
+    df = _ts_panel()
+    w, k = 15, 2.0
+    out = FactorCleaner.process_factors(df, ['f1', 'f2'], winsorize=True, mode='ts',
+                                        ts_window=w, ts_mad_k=k)
+
+    def clip(s):
+        med, mad = _window_mad(s.to_numpy(), w, w)
+        band = k * 1.4826 * mad
+        return pd.Series(np.where(np.isnan(band), s, np.clip(s, med - band, med + band)), index=s.index)
+
+    for col in ['f1', 'f2']:
+        expected = _per_asset(df, col, clip)
+        np.testing.assert_allclose(out[col].to_numpy(), expected, atol=1e-12, equal_nan=True)
+    # 厚尾的 f2 确实被截断了
+    assert (out['f2'] != df['f2']).sum() > 5
+
+    out = FactorCleaner.process_factors(df, ['f2'], standardize=True, mode='ts',
+                                        ts_window=w, ts_scale='percentile')
+    expected = _per_asset(df, 'f2', lambda s: s.rolling(w).rank(pct=True))
+    np.testing.assert_allclose(out['f2'].to_numpy(), expected, atol=1e-12, equal_nan=True)
+
+
+def test_ts_mode_has_one_entry_point():
+    df = _ts_panel()
+    params = dict(winsorize=True, standardize=True, mode='ts', ts_window=10, ts_min_periods=5)
+    values = df[['f1', 'f2']].to_numpy(dtype=np.float64, copy=True)
+    FactorCleaner.process_matrix(values, df, **params)
+    out = FactorCleaner.process_factors(df, ['f1', 'f2'], **params)
+    np.testing.assert_array_equal(out.to_numpy(), values)
+    # 窗口不会跨到上一只股票：每只股票前 4 根历史不足
+    head = df.groupby('asset').cumcount().to_numpy() < 4
+    assert np.isnan(values[head]).all()
+    # process_factor 的 ts 模式转给 process_factors
+    single = FactorCleaner.process_factor(df, 'f1', **params)
+    np.testing.assert_array_equal(single.to_numpy(), values[:, 0])
+    with pytest.raises(ValueError, match='ts_scale'):
+        FactorCleaner.process_factors(df, ['f1'], standardize=True, mode='ts', ts_scale='rank')
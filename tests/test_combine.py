@@ -0,0 +1,109 @@
+# 文件路径: tests/test_combine.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.processor.combine import FactorCombiner
+from src.processor.evaluate import FactorEvaluator
+
+COLS = ['f1', 'f2', 'f3']
+PARAMS = dict(horizon=2, refit=10, window=3, ridge_lambda=0.5)
+
+
+@pytest.fixture(scope='module')
+def data():
+    """60 个时间点 × 25 只股票：f1 有预测力，f2 反向，f3 噪声 (带缺失)"""
+    rng = np.random.default_rng(0)
+    n_dates, n_assets = 60, 25
+    df = pd.DataFrame({
+        'date': np.repeat(pd.date_range('2025-01-02 09:31', periods=n_dates, freq='1min'), n_assets),
+        'asset': np.tile([f'A{i:02d}' for i in range(n_assets)], n_dates),
+    })
+    df['ret'] = rng.normal(0, 0.01, len(df))
+    df['f1'] = df['ret'] + rng.normal(0, 0.01, len(df))
+    df['f2'] = -df['ret'] + rng.normal(0, 0.02, len(df))
+    df['f3'] = rng.normal(size=len(df))
+    df.loc[rng.choice(len(df), 80, replace=False), 'f3'] = np.nan
+    return df
+
+
+def _visible_block(df, dates_of_rows, horizon, refit):
+    dates = np.sort(df['date'].unique())
+    return (np.searchsorted(dates, dates_of_rows) + horizon) // refit
+
+
+def test_cross_zscore_matches_groupby(data):
+    z = FactorCombiner.cross_zscore(data, COLS)
+    for j, col in enumerate(COLS):
+        g = data.groupby('date')[col]
+        expected = ((data[col] - g.transform('mean')) / g.transform('std')).fillna(0)
+        np.testing.assert_allclose(z[:, j], expected.to_numpy(), atol=1e-12)
+
+
+def test_ic_weights_match_brute_force(data):
+    weights = FactorCombiner.fit_weights(data, COLS, 'ret', methods=('equal', 'ic', 'icir'), **PARAMS)
+    ic = FactorEvaluator.calc_ic_matrix(data, COLS, 'ret')
+    kb = _visible_block(data, ic.index.to_numpy(), PARAMS['horizon'], PARAMS['refit'])
+    for b, start in enumerate(weights['ic'].index):
+        # 只用区间 [b - window, b - 1] 里已经可见的 IC
+        used = ic[(kb >= b - PARAMS['window']) & (kb < b)]
+        if len(used) < 2:
+            assert weights['ic'].loc[start].isna().all()
+            continue
+        mean, std = used.mean(), used.std()
+        for method, raw in [('ic', mean), ('icir', mean / std), ('equal', np.sign(mean))]:
+            expected = raw / raw.abs().sum()
+            np.testing.assert_allclose(weights[method].loc[start].to_numpy(), expected.to_numpy(),
+                                       atol=1e-10, err_msg=f'{method} @ {start}')
+    last = weights['ic'].iloc[-1]
+    assert last['f1'] > 0 > last['f2']
+
+
+def test_ridge_weights_match_brute_force(data):
+    weights = FactorCombiner.fit_weights(data, COLS, 'ret', methods=('ridge',), **PARAMS)['ridge']
+    z = FactorCombiner.cross_zscore(data, COLS)
+    y = (data['ret'] - data.groupby('date')['ret'].transform('mean')).to_numpy()
+    kb = _visible_block(data, data['date'].to_numpy(), PARAMS['horizon'], PARAMS['refit'])
+    for b, start in enumerate(weights.index):
+        rows = (kb >= b - PARAMS['window']) & (kb < b)
+        if not rows.any():
+            assert weights.loc[start].isna().all()
+            continue
+        X = z[rows]
+        gram = X.T @ X
+        penalty = PARAMS['ridge_lambda'] * np.trace(gram) / len(COLS) * np.eye(len(COLS))
+        expected = np.linalg.solve(gram + penalty, X.T @ y[rows])
+        np.testing.assert_allclose(weights.loc[start].to_numpy(), expected, rtol=1e-9)
+
+
+def test_weights_do_not_look_ahead(data):
+    """改掉某个区间开始后才可见的未来收益，这个区间及之前的权重不变"""
+    base = FactorCombiner.fit_weights(data, COLS, 'ret', **PARAMS)
+    dates = np.sort(data['date'].unique())
+    b = 3
+    # 位置 >= b * refit - horizon 的收益要到区间 b 开始之后才可见
+    cutoff = dates[b * PARAMS['refit'] - PARAMS['horizon']]
+    shuffled = data.copy()
+    late = shuffled['date'] >= cutoff
+    shuffled.loc[late, 'ret'] = np.random.default_rng(1).permutation(shuffled.loc[late, 'ret'].to_numpy())
+    moved = FactorCombiner.fit_weights(shuffled, COLS, 'ret', **PARAMS)
+    for method in FactorCombiner.METHODS:
+        pd.testing.assert_frame_equal(moved[method].iloc[:b + 1], base[method].iloc[:b + 1])
+    # 之后的区间确实用到了被改的收益 (等权只看符号，可能不变)
+    for method in ('ic', 'icir', 'ridge'):
+        assert not moved[method].iloc[b + 1:].equals(base[method].iloc[b + 1:])
+
+
+def test_combine_uses_block_weights(data):
+    weights = FactorCombiner.fit_weights(data, COLS, 'ret', **PARAMS)
+    out = FactorCombiner.combine(data, COLS, weights)
+    assert list(out.columns) == [f'alpha_combo_{m}' for m in FactorCombiner.METHODS]
+    z = FactorCombiner.cross_zscore(data, COLS)
+    for method, w in weights.items():
+        block = np.searchsorted(w.index.to_numpy(), data['date'].to_numpy(), side='right') - 1
+        w_rows = w.to_numpy()[block]
+        fitted = np.isfinite(w_rows).any(axis=1)
+        expected = np.where(fitted, (z * np.nan_to_num(w_rows)).sum(axis=1), np.nan)
+        np.testing.assert_allclose(out[f'alpha_combo_{method}'].to_numpy(), expected, equal_nan=True)
+        # 第一个区间没有历史，合成因子为 NaN
+        assert out.loc[block == 0, f'alpha_combo_{method}'].isna().all()
@@ -0,0 +1,83 @@
+# 文件路径: tests/test_data_check.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_bars
+from src.data.data_check import bars_per_day, check_df, format_report, is_sorted, validate_df
+
+
+def test_clean_data_passes_untouched(bars):
+    out, report = validate_df(bars)
+    pd.testing.assert_frame_equal(out, bars)
+    assert report['was_sorted'] and report['rows'] == len(bars)
+    assert (report['assets'], report['days']) == (8, 3)
+    assert report['duplicates'] == report['out_of_session'] == report['missing_bars'] == 0
+    assert report['by_asset'].empty
+
+
+def test_messy_data_matches_sort_and_drop_duplicates(bars):
+    rng = np.random.default_rng(0)
+    # 删掉 000001 的 5 根、000003 第二天整天，加 3 条重复 (值不同) 和 2 根午休时段的 K 线
+    gone = bars.index[(bars['asset'] == '000001')][[10, 50, 51, 200, 479]]
+    day2 = (bars['asset'] == '000003') & (bars['date'].dt.day == 3)
+    df = bars.drop(gone.append(bars.index[day2]))
+    dups = df.sample(3, random_state=1).assign(close=-1.0)
+    lunch = df.iloc[[0, 1]].assign(date=pd.to_datetime(['2025-01-02 12:00', '2025-01-02 12:01']))
+    df = pd.concat([df, dups, lunch]).iloc[rng.permutation(len(df) + 5)]
+
+    out, report = validate_df(df)
+    expected = df.sort_values(['asset', 'date'], kind='stable') \
+        .drop_duplicates(['asset', 'date'], keep='last').reset_index(drop=True)
+    pd.testing.assert_frame_equal(out, expected)
+    assert not report['was_sorted']
+    assert (report['duplicates'], report['out_of_session']) == (3, 2)
+    assert report['by_asset']['missing'].to_dict() == {'000003': 240, '000001': 5}
+    assert report['missing_bars'] == 245
+
+    # 重复里保留原表中靠后的那条
+    last, _ = validate_df(pd.concat([bars, dups]))
+    assert len(last) == len(bars) and (last['close'] == -1.0).sum() == 3
+    # 不去重时保留全部行，计数不变
+    kept, again = validate_df(df, drop_duplicates=False)
+    assert len(kept) == len(df) and again['duplicates'] == 3
+
+
+def test_is_sorted():
+    d = np.array(['2025-01-02T09:31', '2025-01-02T09:32', '2025-01-02T09:31'], dtype='datetime64[m]')
+    assert is_sorted(np.array([0, 0, 1]), d)
+    assert not is_sorted(np.array([0, 0, 0]), d)
+    assert not is_sorted(np.array([1, 1, 0]), d[[0, 1, 1]])
+    # 同一时刻的重复不算乱序
+    assert is_sorted(np.array([0, 0]), d[[0, 0]])
+    assert is_sorted(np.array([], dtype=np.int64), d[:0])
+
+
+def test_sessions_use_wall_time_and_can_be_skipped(bars):
+    tz = bars.assign(date=bars['date'].dt.tz_localize('Asia/Shanghai'))
+    _, report = validate_df(tz)
+    assert report['out_of_session'] == 0 and report['missing_bars'] == 0
+    # 按 30 分钟线推算每天根数
+    assert bars_per_day() == 240 and bars_per_day(freq='30min') == 8
+    _, report = validate_df(bars.iloc[::30], freq='30min')
+    assert report['missing_bars'] == 0
+    _, report = validate_df(bars.iloc[::2], sessions=None)
+    assert report['missing_bars'] == 0 and report['by_asset'].empty
+
+
+def test_validate_df_rejects_bad_input(bars):
+    with pytest.raises(ValueError, match='asset'):
+        validate_df(bars.drop(columns='asset'))
+    with pytest.raises(TypeError, match='datetime'):
+        validate_df(bars.assign(date=bars['date'].astype(str)))
+
+
+def test_check_df_prints_summary(bars, capsys):
+    df = bars.iloc[::-1].reset_index(drop=True)
+    out = check_df(df)
+    pd.testing.assert_frame_equal(out, bars)
+    line = capsys.readouterr().out.strip()
+    assert line.startswith('[Check]')
+    _, report = validate_df(df)
+    assert line == f"[Check] {format_report(report)}"
+    assert '已重新排序' in line and f"{len(bars)} 行" in line
@@ -0,0 +1,96 @@
+# 文件路径: tests/test_data_grid.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_bars
+from src.data.data_grid import align_to_calendar, session_grid
+
+
+def test_session_grid():
+    days = [pd.Timestamp('2025-01-02'), pd.Timestamp('2025-01-03 14:00')]
+    grid = session_grid(days)
+    assert len(grid) == 2 * 240
+    day = grid[:240]
+    assert [str(t.time()) for t in day[[0, 119, 120, 239]]] == ['09:31:00', '11:30:00', '13:01:00', '15:00:00']
+    # 第二天按日期归一化，不受传入的时刻影响
+    assert grid[240] == pd.Timestamp('2025-01-03 09:31')
+    half = session_grid(days[:1], freq='30min')
+    assert [t.strftime('%H:%M') for t in half] == ['10:00', '10:30', '11:00', '11:30',
+                                                  '13:30', '14:00', '14:30', '15:00']
+
+
+@pytest.fixture(scope='module')
+def gappy():
+    """有缺口的分钟线：零散缺失、一段 20 根的停牌、一只股票第二天才上市、一根午休时段的脏数据"""
+    df = make_bars(n_assets=4, n_days=3, seed=9)
+    rng = np.random.default_rng(9)
+    drop = list(rng.choice(len(df), 60, replace=False))
+    a1 = np.flatnonzero(df['asset'] == '000001')
+    drop += list(a1[300:320])
+    a2 = np.flatnonzero(df['asset'] == '000002')
+    drop += list(a2[:240])
+    df = df.drop(df.index[np.unique(drop)])
+    # 首尾的缺口不补 (区间从第一根到最后一根)，这里保证每只股票首尾都在
+    lunch = df.iloc[[5]].assign(date=pd.Timestamp('2025-01-02 12:00'))
+    return pd.concat([df, lunch]).sort_values(['asset', 'date'], kind='stable').reset_index(drop=True)
+
+
+def _reference(df, limit, end=None):
+    """逐只股票 reindex 到网格 + ffill(limit)"""
+    grid = session_grid(np.sort(df['date'].dt.normalize().unique()))
+    df = df[df['date'].isin(grid)]
+    out = []
+    for asset, g in df.groupby('asset', sort=False):
+        hi = max(g['date'].max(), end) if end is not None else g['date'].max()
+        span = grid[(grid >= g['date'].min()) & (grid <= hi)]
+        r = g.set_index('date').reindex(span)
+        valid = r['asset'].notna()
+        close = r['close'].ffill(limit=limit)
+        for col in ['open', 'high', 'low']:
+            r[col] = r[col].fillna(close.where(~valid))
+        for col in ['close', 'volume', 'turnover']:
+            r[col] = r[col].ffill(limit=limit)
+        r['sector'] = r['sector'].ffill()
+        r['asset'] = asset
+        out.append(r.rename_axis('date').reset_index().assign(is_valid=valid.to_numpy()))
+    return pd.concat(out, ignore_index=True)[list(df.columns) + ['is_valid']]
+
+
+@pytest.mark.parametrize('limit', [1, 5, None])
+def test_align_to_calendar_matches_reindex_ffill(gappy, limit):
+    out, report = align_to_calendar(gappy, ffill_limit=limit)
+    expected = _reference(gappy, limit)
+    pd.testing.assert_frame_equal(out, expected, check_dtype=False)
+
+    assert report['rows_in'] == len(gappy) and report['out_of_session'] == 1
+    assert report['rows_out'] == len(out)
+    assert out['is_valid'].sum() == len(gappy) - 1
+    assert report['filled'] == int((~out['is_valid'] & out['close'].notna()).sum())
+    assert report['missing'] == int(out['close'].isna().sum())
+    if limit is None:
+        assert report['missing'] == 0
+    # 网格是稠密的：每只股票的时刻连续
+    grid = session_grid(np.sort(gappy['date'].dt.normalize().unique()))
+    for _, g in out.groupby('asset'):
+        pos = grid.get_indexer(g['date'])
+        assert (np.diff(pos) == 1).all()
+
+
+def test_align_to_calendar_extends_to_end(gappy):
+    # 000003 在第三天 14:00 之后停牌，end 让它和其他股票一起补到最后
+    df = gappy[~((gappy['asset'] == '000003') & (gappy['date'] > '2025-01-06 14:00'))]
+    end = df['date'].max()
+    out, _ = align_to_calendar(df, ffill_limit=5, end=end)
+    pd.testing.assert_frame_equal(out, _reference(df, 5, end=end), check_dtype=False)
+    assert (out.groupby('asset')['date'].max() == end).all()
+    tail = out[(out['asset'] == '000003') & (out['date'] > '2025-01-06 14:00')]
+    assert not tail['is_valid'].any()
+    assert tail['close'].notna().sum() == 5
+
+
+def test_align_to_calendar_empty():
+    df = make_bars(n_assets=1, n_days=1).iloc[:0]
+    out, report = align_to_calendar(df, days=['2025-01-02'])
+    assert out.empty and 'is_valid' in out.columns
+    assert report == {'rows_in': 0, 'out_of_session': 0, 'rows_out': 0, 'filled': 0, 'missing': 0}
@@ -0,0 +1,155 @@
+# 文件路径: tests/test_evaluate.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_bars
+from src.processor.evaluate import FactorEvaluator
+
+
+@pytest.fixture(scope='module')
+def scored():
+    """带两个因子和未来收益的面板：一个有预测力、一个纯噪声 (带缺失)"""
+    df = make_bars(n_assets=30, n_days=2, seed=7)
+    df = FactorEvaluator.preprocess_data(df, ret_col='next_ret', horizon=10).reset_index(drop=True)
+    rng = np.random.default_rng(7)
+    df['alpha_good'] = df['next_ret'] + rng.normal(0, 0.003, len(df))
+    df['alpha_noise'] = rng.normal(size=len(df))
+    df.loc[rng.choice(len(df), 500, replace=False), 'alpha_noise'] = np.nan
+    return df
+
+
+def test_ic_matrix_matches_per_date_spearman(scored):
+    cols = ['alpha_good', 'alpha_noise']
+    ic = FactorEvaluator.calc_ic_matrix(scored, cols, 'next_ret')
+    for col in cols:
+        ref = FactorEvaluator.calc_ic_series(scored, col, 'next_ret')
+        np.testing.assert_allclose(ic[col].to_numpy(), ref.reindex(ic.index).to_numpy(),
+                                   atol=1e-12, equal_nan=True)
+    assert ic['alpha_good'].mean() > 0.3
+
+
+def test_ic_matrix_min_count():
+    df = pd.DataFrame({
+        'date': pd.to_datetime(['2025-01-02 09:31'] * 4 + ['2025-01-02 09:32'] * 6),
+        'f': np.arange(10.0), 'r': np.arange(10.0),
+    })
+    ic = FactorEvaluator.calc_ic_matrix(df, ['f'], 'r', min_count=5)
+    assert np.isnan(ic['f'].iloc[0])
+    assert ic['f'].iloc[1] == pytest.approx(1.0)
+
+
+def test_intraday_ic_aggregation(scored):
+    ic = FactorEvaluator.calc_ic_matrix(scored, ['alpha_good'], 'next_ret')
+    out = FactorEvaluator.calc_intraday_ic(ic)
+    idx = pd.DatetimeIndex(ic.index)
+    np.testing.assert_allclose(out['daily_ic']['alpha_good'].to_numpy(),
+                               ic['alpha_good'].groupby(idx.normalize()).mean().to_numpy())
+    assert len(out['minute_profile']) == len(pd.unique(idx.time))
+    # 尾盘 (14:30, 15:00] 的时段均值
+    tod = idx - idx.normalize()
+    close = (tod > pd.Timedelta('14:30:00')) & (tod <= pd.Timedelta('15:00:00'))
+    np.testing.assert_allclose(out['session'].loc[('IC_Mean', 'close'), 'alpha_good'],
+                               ic['alpha_good'][close].mean())
+
+
+def _ar1_ic(n=600, phi=0.9, seed=0):
+    """自相关的 IC 序列 (模拟重叠收益带来的相邻截面相关)，两列独立"""
+    rng = np.random.default_rng(seed)
+    e = rng.normal(0, 0.05, (n, 2))
+    x = np.zeros_like(e)
+    for t in range(1, n):
+        x[t] = phi * x[t - 1] + e[t]
+    dates = pd.date_range('2025-01-02 09:31', periods=n, freq='1min')
+    return pd.DataFrame(0.02 + x, index=dates, columns=['f1', 'f2'])
+
+
+def test_block_bootstrap_widens_interval_for_autocorrelated_ic():
+    ic = _ar1_ic()
+    iid = FactorEvaluator.bootstrap_ic(ic, n_boot=400, block_len=1)
+    block = FactorEvaluator.bootstrap_ic(ic, n_boot=400, block_len=30)
+    np.testing.assert_allclose(block['IC_Mean'], ic.mean())
+    width = lambda r: (r['IC_Hi'] - r['IC_Lo']).to_numpy()
+    # AR(1) 的长期方差约是 i.i.d. 的 (1 + phi) / (1 - phi) = 19 倍，区间宽约 4 倍以上
+    assert (width(block) > 2.5 * width(iid)).all()
+
+
+def test_block_bootstrap_coverage():
+    # 重复模拟：i.i.d. 区间对真实均值 0.02 的覆盖率远低于名义 95%，块 bootstrap 接近名义水平
+    def coverage(block_len):
+        hits = [FactorEvaluator.bootstrap_ic(_ar1_ic(seed=s), n_boot=200, block_len=block_len)
+                .pipe(lambda r: (r['IC_Lo'] < 0.02) & (0.02 < r['IC_Hi'])) for s in range(30)]
+        return pd.concat(hits).mean()
+
+    assert coverage(1) < 0.5
+    assert coverage(40) > 0.75
+
+
+@pytest.mark.filterwarnings('ignore:All-NaN slice')
+def test_bootstrap_ic_handles_gaps_and_short_series():
+    ic = _ar1_ic(n=25)
+    ic.iloc[[3, 4, 5], 0] = np.nan
+    out = FactorEvaluator.bootstrap_ic(ic, n_boot=50, block_len=5)
+    assert out['N_Dates'].tolist() == [22, 25]
+    assert (out['IC_Lo'] < out['IC_Mean']).all() and (out['IC_Mean'] < out['IC_Hi']).all()
+    # 块长超过序列长度时截到 n：每次都抽到整条序列 (循环平移)，区间退化为点估计
+    whole = FactorEvaluator.bootstrap_ic(ic, n_boot=50, block_len=100)
+    np.testing.assert_allclose(whole['IC_Lo'], whole['IC_Mean'])
+    np.testing.assert_allclose(whole['IC_Hi'], whole['IC_Mean'])
+    empty = FactorEvaluator.bootstrap_ic(ic.iloc[:0], n_boot=10)
+    assert empty['N_Dates'].tolist() == [0, 0] and empty['IC_Lo'].isna().all()
+
+
+def test_sample_dates_covers_every_day(scored):
+    dates = scored['date'].unique()
+    picked = pd.DatetimeIndex(FactorEvaluator.sample_dates(dates, frac=0.1, seed=3))
+    per_day = picked.normalize().value_counts()
+    full = pd.DatetimeIndex(dates).normalize().value_counts()
+    assert set(per_day.index) == set(full.index)
+    np.testing.assert_array_equal(per_day.reindex(full.index), np.ceil(full * 0.1))
+    assert picked.isin(dates).all() and picked.is_unique
+    # 比例很小时每天至少 1 个
+    assert len(FactorEvaluator.sample_dates(dates, frac=1e-6)) == len(full)
+
+
+def test_screen_keeps_predictive_factor(scored):
+    out = FactorEvaluator.screen(scored, ['alpha_good', 'alpha_noise'], 'next_ret',
+                                 frac=0.2, min_abs_ic=0.05, min_abs_icir=0.5, n_boot=200)
+    assert out.loc['alpha_good', 'Passed'] and not out.loc['alpha_noise', 'Passed']
+    # 有预测力的因子区间在 0 之上
+    assert out.loc['alpha_good', 'IC_Lo'] > 0
+
+
+def test_breakdown_matches_slicing(scored):
+    cols = ['alpha_good', 'alpha_noise']
+    out = FactorEvaluator.calc_breakdown(scored, cols, 'next_ret', ['sector', 'month', 'no_such_col'])
+    assert set(out['Dimension']) == {'sector', 'month'}
+    # 按列的维度 = 在每个分组的子表上单独算
+    for sector, sub in scored.groupby('sector'):
+        ic = FactorEvaluator.calc_ic_matrix(sub, cols, 'next_ret')
+        ls = FactorEvaluator.calc_ls_matrix(sub, cols, 'next_ret')
+        rows = out[(out['Dimension'] == 'sector') & (out['Bucket'] == sector)].set_index('Factor_Name')
+        np.testing.assert_allclose(rows.loc[cols, 'IC_Mean'], ic.mean(), atol=1e-12)
+        np.testing.assert_allclose(rows.loc[cols, 'ICIR'], ic.mean() / ic.std(), atol=1e-10)
+        np.testing.assert_allclose(rows.loc[cols, 'Win_Rate'], (ic > 0).where(ic.notna()).mean(), atol=1e-12)
+        np.testing.assert_allclose(rows.loc[cols, 'LS_Mean'], ls.mean(), atol=1e-12)
+        np.testing.assert_array_equal(rows.loc[cols, 'N_Periods'], ic.count())
+    # 时间维度复用全市场 IC
+    ic = FactorEvaluator.calc_ic_matrix(scored, cols, 'next_ret')
+    month = out[out['Dimension'] == 'month'].set_index('Factor_Name')
+    assert month['Bucket'].unique().tolist() == ['2025-01']
+    np.testing.assert_allclose(month.loc[cols, 'IC_Mean'], ic.mean(), atol=1e-12)
+    assert FactorEvaluator.calc_breakdown(scored, cols, 'next_ret', ['no_such_col']).empty
+
+
+def test_liquidity_bucket_matches_groupby_rolling(scored):
+    window, n_bins = 30, 3
+    out = FactorEvaluator.liquidity_bucket(scored, 'turnover', window, n_bins)
+    liq = scored.groupby('asset')['turnover'].transform(lambda s: s.rolling(window).mean())
+    pct = liq.groupby(scored['date']).rank(pct=True)
+    expected = (np.ceil(pct * n_bins).clip(lower=1) - 1).astype('Int64')
+    pd.testing.assert_series_equal(out, expected, check_names=False)
+    # 历史不足 window 根的不分组，其余每个截面分成大小相同的 n_bins 组
+    assert out[scored.groupby('asset').cumcount() < window - 1].isna().all()
+    sizes = out.dropna().groupby(scored['date']).value_counts().unstack()
+    assert (sizes == 10).all().all()
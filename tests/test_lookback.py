@@ -0,0 +1,67 @@
+# 文件路径: tests/test_lookback.py
+import numpy as np
+import pytest
+
+from conftest import make_bars
+from src.factor_mining_main import FactorMining_main as M
+
+CONFIGS = [c for c in M.FACTOR_CONFIG if c['name'] in M.FACTOR_REGISTRY]
+
+
+def test_config_bars_uses_trading_session_length():
+    assert M.config_bars({}, 20) == 20
+    assert M.config_bars({'freq': '5min'}, 20) == 21 * 5
+    # 日线：一天 240 根分钟线，不是 1440 分钟
+    assert M.config_bars({'freq': '1D'}, 5) == 6 * 240
+    assert M.config_bars({'freq': '2D'}, 5) == 6 * 480
+    # 日内大周期最多一天的根数
+    assert M.config_bars({'freq': '4h'}, 5) == 6 * 240
+
+
+@pytest.fixture(scope='module')
+def panel():
+    return make_bars(n_assets=4, n_days=4, seed=5)
+
+
+@pytest.mark.parametrize('config', [c for c in CONFIGS if M.config_lookback(c) is not None],
+                         ids=M.factor_col_name)
+def test_lookback_is_enough_history(panel, config):
+    """只用每只股票最后 lookback 根 K 线算出的最新值，应与全量计算一致"""
+    lookback = M.config_lookback(config)
+    if lookback >= panel.groupby('asset').size().min():
+        pytest.skip('not enough bars for this lookback')
+    name = M.factor_col_name(config)
+    full = M.compute_factors(panel, [config], verbose=False).frame()[name]
+    tail = panel.groupby('asset').tail(lookback).reset_index(drop=True)
+    part = M.compute_factors(tail, [config], verbose=False).frame()[name]
+
+    last_full = full.groupby(panel['asset']).last()
+    last_part = part.groupby(tail['asset']).last()
+    np.testing.assert_allclose(last_part.to_numpy(), last_full.to_numpy(), rtol=1e-5, atol=1e-8)
+
+
+@pytest.mark.parametrize('config', CONFIGS, ids=M.factor_col_name)
+def test_values_available_after_warmup(panel, config):
+    name = M.factor_col_name(config)
+    values = M.compute_factors(panel, [config], verbose=False).frame()[name]
+    warmup = M.config_warmup(config)
+    pos = panel.groupby('asset').cumcount()
+    # 预热期之后每只股票都有值
+    assert values[pos >= warmup].notna().all()
+
+
+def test_required_halo_covers_every_factor(monkeypatch):
+    factor_halo = max(M.config_lookback(c) or 1 for c in CONFIGS)
+    monkeypatch.setitem(M.BREAKDOWN_CONFIG, 'dims', ['month'])
+    assert M.required_halo(CONFIGS) == factor_halo
+    # 累计型因子只需盖住 shift 和第一根的差分 (跨块靠锚点接上)
+    assert M.required_halo([{"name": "PVT", "params": {}, "shift": 1}]) == 3
+    assert M.required_halo([{"name": "PVT", "params": {}, "freq": "5min"}]) == 11
+    # 流动性分组的滚动窗口也要预热 (取最大值，不叠加)
+    monkeypatch.setitem(M.BREAKDOWN_CONFIG, 'dims', ['month', 'liquidity'])
+    monkeypatch.setitem(M.BREAKDOWN_CONFIG, 'liq_window', factor_halo + 100)
+    assert M.required_halo(CONFIGS) == factor_halo + 100
+    assert M.required_halo(CONFIGS[:1]) == factor_halo + 100
+    # 时序清洗在算好的因子上再看 ts_window 根，叠加
+    monkeypatch.setitem(M.CLEAN_CONFIG, 'mode', 'ts')
+    assert M.required_halo(CONFIGS) == factor_halo + 100 + M.CLEAN_CONFIG['ts_window']
@@ -0,0 +1,39 @@
+# 文件路径: tests/test_market_factors.py
+import numpy as np
+import pandas as pd
+
+from conftest import make_bars
+from src.factors.base import FACTOR_REGISTRY
+import src.factors.definitions  # noqa: F401  触发注册
+
+
+def test_market_regression_matches_rolling_ols():
+    df = make_bars(n_assets=5, n_days=1)
+    w = 20
+    out = {name: FACTOR_REGISTRY[name]({'window': w}).calculate(df) for name in ['Beta', 'Alpha', 'Idio_VOL']}
+
+    ret = df.groupby('asset')['close'].pct_change()
+    mkt = ret.groupby(df['date']).transform('mean')
+    rng = np.random.default_rng(0)
+    for asset, g in df.groupby('asset'):
+        r, m = ret[g.index].to_numpy(), mkt[g.index].to_numpy()
+        for t in rng.integers(w, len(g), 10):
+            y, x = r[t - w + 1:t + 1], m[t - w + 1:t + 1]
+            (b, a), res = np.polyfit(x, y, 1, full=True)[:2]
+            i = g.index[t]
+            np.testing.assert_allclose(out['Beta'][i], b, rtol=1e-8)
+            np.testing.assert_allclose(out['Alpha'][i], a, rtol=1e-6, atol=1e-12)
+            np.testing.assert_allclose(out['Idio_VOL'][i], np.sqrt(res[0] / (w - 2)), rtol=1e-6)
+        # 窗口没填满 (第一根没有收益率，要到第 w + 1 根才满)
+        assert out['Beta'][g.index[:w]].isna().all()
+
+
+def test_market_return_uses_index_column():
+    df = make_bars(n_assets=3, n_days=1)
+    df['index_close'] = np.tile(np.linspace(100, 101, df['date'].nunique()), 3)
+    beta = FACTOR_REGISTRY['Beta']({'window': 20, 'index_col': 'index_close'}).calculate(df)
+    # 以指数为市场时，指数自身的 beta 为 1
+    df['close'] = df['index_close']
+    self_beta = FACTOR_REGISTRY['Beta']({'window': 20, 'index_col': 'index_close'}).calculate(df)
+    assert beta.notna().any()
+    np.testing.assert_allclose(self_beta.dropna(), 1.0, rtol=1e-8)
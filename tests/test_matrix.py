@@ -0,0 +1,45 @@
+# 文件路径: tests/test_matrix.py
+import numpy as np
+import pandas as pd
+
+from conftest import make_bars
+from src.factors.matrix import FactorMatrix
+from src.factors.rolling import segment_starts
+
+
+def test_shift_matches_groupby_shift():
+    df = make_bars(n_assets=3, n_days=1)
+    fm = FactorMatrix(['a'], df.index)
+    fm.set('a', df['close'])
+    fm.shift('a', 2, segment_starts(df['asset']))
+    expected = df.groupby('asset')['close'].shift(2)
+    np.testing.assert_array_equal(fm.column('a'), expected.to_numpy())
+
+
+def test_set_aligns_series_by_index():
+    index = pd.RangeIndex(4)
+    fm = FactorMatrix(['a', 'b'], index)
+    fm.set('a', pd.Series([3.0, 1.0], index=[3, 1]))
+    np.testing.assert_array_equal(fm.column('a'), [np.nan, 1.0, np.nan, 3.0])
+    assert fm.values.flags['F_CONTIGUOUS']
+
+
+def test_frame_is_zero_copy_and_take_copies():
+    fm = FactorMatrix(['a', 'b'], pd.RangeIndex(3))
+    frame = fm.frame()
+    fm.column('b')[:] = 7.0
+    assert (frame['b'] == 7.0).all()
+
+    part = fm.take(np.array([True, False, True]))
+    part.column('b')[:] = 0.0
+    assert list(part.index) == [0, 2]
+    assert (fm.column('b') == 7.0).all()
+
+
+def test_rename_and_select():
+    fm = FactorMatrix(['factor_a', 'factor_b'], pd.RangeIndex(2))
+    fm.set('factor_b', [1.0, 2.0])
+    fm.rename(lambda c: c.replace('factor_', 'alpha_'))
+    assert 'alpha_b' in fm and 'factor_b' not in fm
+    sub = fm.select(['alpha_b'])
+    np.testing.assert_array_equal(sub.column('alpha_b'), [1.0, 2.0])
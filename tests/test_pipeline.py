@@ -0,0 +1,121 @@
+# 文件路径: tests/test_pipeline.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_bars
+from src.data.data_chunk import iter_parquet_chunks
+from src.processor.pipeline import PipelineRunner
+from src.factor_mining_main import FactorMining_main as M
+
+# 流水线 / 串行对比用的小配置 (PVT 是累计型，靠跨块锚点接上)
+CONFIG = [
+    {"name": "PVT", "params": {}, "shift": 1},
+    {"name": "RSI", "params": {"window": 14}, "shift": 1},
+    {"name": "BIAS", "params": {"window": 20}, "shift": 1},
+    {"name": "Beta", "params": {"window": 20}, "shift": 1},
+    {"name": "ATR", "params": {"window": 14}, "shift": 1, "freq": "5min"},
+]
+
+
+def _raw_parquet(path, n_assets=4, n_days=4, drop=None):
+    """写成原始格式：Date (int) + Time (int)，与券商导出的分钟线一致"""
+    df = make_bars(n_assets=n_assets, n_days=n_days, sector=False)
+    if drop is not None:
+        df = df.drop(df.index[drop]).reset_index(drop=True)
+    raw = df.rename(columns={'asset': 'code', 'close': 'Close'})
+    raw['Time'] = raw['date'].dt.strftime('%H%M').astype(int)
+    raw['Date'] = raw['date'].dt.strftime('%Y%m%d').astype(int)
+    raw = raw.drop(columns='date')
+    raw.to_parquet(path, engine='fastparquet', row_group_offsets=2000)
+    return df
+
+
+def test_iter_parquet_chunks_resolves_raw_date_column(tmp_path):
+    path = tmp_path / 'raw.pq'
+    df = _raw_parquet(path, n_days=5)
+    chunks = list(iter_parquet_chunks(path, chunk_days=2))
+    assert [c['Date'].nunique() for c in chunks] == [2, 2, 1]
+    assert sum(len(c) for c in chunks) == len(df)
+
+
+def test_iter_parquet_chunks_without_date_column(tmp_path):
+    path = tmp_path / 'bad.pq'
+    pd.DataFrame({'x': [1.0]}).to_parquet(path, engine='fastparquet')
+    with pytest.raises(ValueError):
+        next(iter_parquet_chunks(path))
+
+
+def test_pipeline_runner_keeps_order_and_reraises():
+    out = []
+    PipelineRunner(range(10), lambda x: x * 2, out.append).run()
+    assert out == [x * 2 for x in range(10)]
+
+    def boom(x):
+        if x == 3:
+            raise RuntimeError('compute failed')
+        return x
+    with pytest.raises(RuntimeError):
+        PipelineRunner(range(10), boom, lambda x: None).run()
+
+
+def test_run_pipeline_matches_serial(tmp_path, monkeypatch):
+    path = tmp_path / 'raw.pq'
+    _raw_parquet(path)
+    # 运行时修改的配置要生效 (不能在定义时绑定成默认参数)
+    seen = {}
+
+    def spy(*args, **kwargs):
+        seen.update(kwargs)
+        return iter_parquet_chunks(*args, **kwargs)
+    monkeypatch.setattr(M, 'PIPELINE_CHUNK_DAYS', 1)
+    monkeypatch.setattr(M, 'iter_parquet_chunks', spy)
+
+    out_path = tmp_path / 'alpha.csv'
+    piped = M.run_pipeline(str(path), CONFIG, str(out_path))
+    assert seen['chunk_days'] == 1
+
+    df = M.check_df(M.adapt_format(pd.read_parquet(path, engine='fastparquet')))
+    fm = M.clean_factors(df, M.compute_factors(df, CONFIG, verbose=False), verbose=False)
+    serial = pd.concat([df[M.key_columns(df)], M.breakdown_keys(df), fm.frame()], axis=1)
+
+    assert list(piped.columns) == list(serial.columns)
+    assert len(piped) == len(serial)
+    alpha_cols = [c for c in serial.columns if c.startswith('alpha_')]
+    np.testing.assert_allclose(piped[alpha_cols].to_numpy(), serial[alpha_cols].to_numpy(),
+                               rtol=1e-9, atol=1e-12, equal_nan=True)
+    # 流动性分组要看过去 liq_window 根 (比因子的 lookback 长)，预热按它算才与串行一致
+    assert serial['liquidity'].notna().any()
+    pd.testing.assert_series_equal(piped['liquidity'], serial['liquidity'])
+
+    # 写出的文件与串行模式同格式：没有行号列
+    written = pd.read_csv(out_path)
+    assert list(written.columns) == list(serial.columns)
+    assert len(written) == len(serial)
+
+
+def test_run_pipeline_matches_serial_on_grid(tmp_path, monkeypatch):
+    """对齐网格时，跨块的停牌缺口 (前一块末尾 + 后一块开头) 与整表对齐的结果一致"""
+    path = tmp_path / 'raw.pq'
+    # 000001 第一天最后 3 根 + 第二天前 4 根缺失 (超过 ffill_limit)，000002 第二天后半段停牌
+    a1 = np.arange(240 * 4, 240 * 8)
+    a2 = np.arange(240 * 8, 240 * 12)
+    drop = np.r_[a1[237:244], a2[400:480], np.random.default_rng(2).choice(240 * 16, 40, replace=False)]
+    _raw_parquet(path, drop=np.unique(drop))
+    monkeypatch.setitem(M.GRID_CONFIG, 'enabled', True)
+    monkeypatch.setitem(M.GRID_CONFIG, 'ffill_limit', 5)
+    monkeypatch.setattr(M, 'PIPELINE_CHUNK_DAYS', 1)
+
+    piped = M.run_pipeline(str(path), CONFIG, str(tmp_path / 'alpha.csv'))
+
+    df = M.align_grid(M.check_df(M.adapt_format(pd.read_parquet(path, engine='fastparquet'))), verbose=False)
+    fm = M.clean_factors(df, M.compute_factors(df, CONFIG, verbose=False), verbose=False)
+    serial = pd.concat([df[M.key_columns(df)], M.breakdown_keys(df), fm.frame()], axis=1)
+
+    assert 'is_valid' in piped.columns and not serial['is_valid'].all()
+    pd.testing.assert_frame_equal(piped[['date', 'asset', 'is_valid']], serial[['date', 'asset', 'is_valid']],
+                                  check_dtype=False)
+    alpha_cols = [c for c in serial.columns if c.startswith('alpha_')]
+    np.testing.assert_allclose(piped[alpha_cols + ['close']].to_numpy(dtype=np.float64),
+                               serial[alpha_cols + ['close']].to_numpy(dtype=np.float64),
+                               rtol=1e-9, atol=1e-12, equal_nan=True)
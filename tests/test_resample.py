@@ -0,0 +1,63 @@
+# 文件路径: tests/test_resample.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_bars
+from src.data.data_resample import resample_bars, align_to_grid, ResampleCache
+
+
+@pytest.mark.parametrize('freq', ['5min', '30min', '1D'])
+def test_resample_bars_matches_per_asset_resample(bars, freq):
+    out = resample_bars(bars, freq)
+    for asset, g in bars.groupby('asset'):
+        ref = g.set_index('date').resample(freq, closed='right', label='right').agg(
+            {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'})
+        ref = ref.dropna(subset=['close'])
+        got = out[out['asset'] == asset]
+        np.testing.assert_allclose(got[['open', 'high', 'low', 'close', 'volume']].to_numpy(),
+                                   ref.to_numpy())
+        # 大 K 线的时间是桶内最后一根分钟
+        last = g.groupby(g['date'].dt.ceil(freq))['date'].max().to_numpy()
+        np.testing.assert_array_equal(got['date'].to_numpy(), last)
+
+
+def test_align_to_grid_uses_only_finished_bars():
+    df = make_bars(n_assets=3, n_days=2)
+    freq = '15min'
+    bars = resample_bars(df, freq)
+    out = align_to_grid(df, bars, np.arange(len(bars), dtype=float), freq)
+
+    # 参考：同一只股票中 "date <= 当前分钟" 的最后一根大 K 线
+    for asset, g in df.groupby('asset'):
+        b = bars[bars['asset'] == asset]
+        pos = np.searchsorted(b['date'].to_numpy(), g['date'].to_numpy(), side='right') - 1
+        expected = np.where(pos >= 0, b.index.to_numpy()[np.maximum(pos, 0)], np.nan)
+        np.testing.assert_array_equal(out[g.index].to_numpy(), expected)
+
+
+def test_resample_cache_builds_each_freq_once(bars, monkeypatch):
+    from src.data import data_resample
+    from src.factor_mining_main import FactorMining_main as M
+    built = []
+
+    def counting(df, freq):
+        built.append(freq)
+        return resample_bars(df, freq)
+    monkeypatch.setattr(data_resample, 'resample_bars', counting)
+
+    # 同一周期上的多个因子共用一次重采样
+    configs = [
+        {"name": "ATR", "params": {"window": 5}, "freq": "5min"},
+        {"name": "RSI", "params": {"window": 5}, "freq": "5min"},
+        {"name": "BIAS", "params": {"window": 3}, "freq": "30min"},
+        {"name": "ATR", "params": {"window": 3}, "freq": "30min"},
+        {"name": "RSI", "params": {"window": 14}},
+    ]
+    M.compute_factors(bars, configs, verbose=False)
+    assert sorted(built) == ['30min', '5min']
+
+    cache = ResampleCache(bars, verbose=False)
+    built.clear()
+    assert cache.get('5min') is cache.get('5min')
+    assert built == ['5min']